@@ -1,8 +1,27 @@
+import binascii
+import datetime
+import json
+from base64 import b64decode, b64encode
 from collections import OrderedDict
 
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, FloatField
 from rest_framework import serializers
-from rest_framework.pagination import LimitOffsetPagination as _LimitOffsetPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination as _LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """Keep microseconds, which DjangoJSONEncoder cuts down to milliseconds."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
 
 
 def get_paginated_response(*, pagination_class, serializer_class, queryset, request, view):
@@ -67,3 +86,180 @@ class PaginatedSerializer(serializers.Serializer):
     count = serializers.IntegerField()
     next = serializers.CharField(allow_null=True , required=False)
     previous = serializers.CharField(allow_null=True , required=False)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over the ordering of the given queryset.
+
+    The page boundary is encoded in an opaque cursor and turned into a
+    `WHERE (ordering fields) > (last row)` filter, so every page costs the
+    same regardless of depth and no COUNT(*) is issued. `id` is appended to
+    the ordering as a tiebreaker. Only non-null, exactly comparable model
+    fields can be keyed on; querysets ordered by anything else (annotations
+    such as search ranks, expressions, related fields) are paginated by
+    offset with `fallback_class` instead. An estimate of the total taken from
+    the planner statistics can be requested with `estimated_count=true`.
+    """
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    estimated_count_query_param = "estimated_count"
+    default_limit = 10
+    max_limit = 50
+    default_ordering = ("-id",)
+    fallback_class = LimitOffsetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        if self.ordering is None:
+            self.fallback = self.fallback_class()
+            self.fallback.default_limit = self.default_limit
+            self.fallback.max_limit = self.max_limit
+            return self.fallback.paginate_queryset(queryset, request, view=view)
+        self.fallback = None
+        self.limit = self.get_limit(request)
+        self.count = self.get_estimated_count(queryset) if self.is_estimated_count_requested(request) else None
+
+        cursor = self.decode_cursor(request)
+        self.is_reversed = bool(cursor and cursor.get("r"))
+        ordering = self.reverse_ordering(self.ordering) if self.is_reversed else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, cursor["v"], queryset.model))
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if self.is_reversed:
+            results.reverse()
+
+        self.has_next = has_more if not self.is_reversed else cursor is not None
+        self.has_previous = cursor is not None if not self.is_reversed else has_more
+        self.page = results
+        return results
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_ordering(self, queryset):
+        """
+        The ordering to key pages on, with the `id` tiebreaker, or None if the
+        queryset is not ordered by plain model fields only.
+        """
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering) or list(self.default_ordering)
+        if not all(self.is_keyset_field(queryset, field) for field in ordering):
+            return None
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        return ordering
+
+    @staticmethod
+    def is_keyset_field(queryset, field):
+        if not isinstance(field, str):
+            return False
+        name = field[1:] if field.startswith("-") else field
+        if name in ("id", "pk"):
+            return True
+        if name in queryset.query.annotations:
+            return False
+        try:
+            model_field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        # Floats do not survive the JSON round trip of the cursor exactly, so
+        # rows at page boundaries would repeat or be skipped.
+        return (model_field.concrete and not model_field.is_relation and not model_field.null
+                and not isinstance(model_field, FloatField))
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+    @staticmethod
+    def get_keyset_filter(ordering, values, model):
+        names = [field.lstrip("-") for field in ordering]
+        values = [KeysetPagination.to_python(model, name, value) for name, value in zip(names, values)]
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{names[index]}__{lookup}": values[index]})
+            for name, value in zip(names[:index], values[:index]):
+                condition &= Q(**{name: value})
+            keyset_filter |= condition
+        return keyset_filter
+
+    @staticmethod
+    def to_python(model, name, value):
+        try:
+            return model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            return value
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode()).decode())
+            if len(cursor["v"]) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound("cursor نامعتبر است.")
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        names = [field.lstrip("-") for field in self.ordering]
+        values = [getattr(instance, "id" if name == "pk" else name) for name in names]
+        cursor = {"v": values, "r": reverse}
+        encoded = b64encode(json.dumps(cursor, cls=CursorJSONEncoder).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def is_estimated_count_requested(self, request):
+        return request.query_params.get(self.estimated_count_query_param, "").lower() in ("1", "true")
+
+    @staticmethod
+    def get_estimated_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return queryset.count()
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('limit', self.limit),
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class KeysetPaginatedSerializer(serializers.Serializer):
+    limit = serializers.IntegerField()
+    count = serializers.IntegerField(allow_null=True, required=False)
+    next = serializers.CharField(allow_null=True, required=False)
+    previous = serializers.CharField(allow_null=True, required=False)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+from cheatgame.common.images import image_srcset
+from cheatgame.common.utils import media_url
+
 
 def create_serializer_class(name, fields):
     return type(name, (serializers.Serializer, ), fields)
@@ -12,3 +15,23 @@ def inline_serializer(*, fields, data=None, **kwargs):
         return serializer_class(data=data, **kwargs)
 
     return serializer_class(**kwargs)
+
+
+class MediaUrlField(serializers.FileField):
+    def to_representation(self, value):
+        return media_url(file=value)
+
+
+class ImageSrcsetField(serializers.Field):
+    """
+    Read-only `{format: {width: url}}` map of the resized variants of the
+    `image_field` of the serialized instance.
+    """
+
+    def __init__(self, *, image_field: str, **kwargs):
+        self.image_field = image_field
+        kwargs.update(source="*", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return image_srcset(instance=instance, field_name=self.image_field)
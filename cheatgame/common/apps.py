@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cheatgame.common'
+
+    def ready(self):
+        from cheatgame.common import lookups  # noqa: F401
@@ -0,0 +1,57 @@
+import hashlib
+import zlib
+from typing import Optional
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+FILE_CONTENT_MAX_SIZE = 512 * 1024
+FILE_CONTENT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def file_content_cache_key(*, name: str) -> str:
+    return f"content:{hashlib.md5(name.encode()).hexdigest()}"
+
+
+def _load_file_content(*, name: str) -> dict:
+    # Files over the cap, or missing ones, are remembered as empty entries so
+    # clients fall back to the file URL without storage being hit every time.
+    try:
+        if default_storage.size(name) > FILE_CONTENT_MAX_SIZE:
+            return {"hash": None, "data": None}
+        with default_storage.open(name, "rb") as file:
+            content = file.read(FILE_CONTENT_MAX_SIZE + 1)
+    except (OSError, ValueError):
+        return {"hash": None, "data": None}
+    if len(content) > FILE_CONTENT_MAX_SIZE:
+        return {"hash": None, "data": None}
+    return {"hash": hashlib.md5(content).hexdigest(), "data": zlib.compress(content)}
+
+
+def get_file_content_entry(*, name: Optional[str]) -> Optional[dict]:
+    """
+    The cached `{"hash", "data"}` entry of a stored text file, with `data`
+    zlib-compressed, reading the file from storage on the first request only.
+    """
+    if not name:
+        return None
+    key = file_content_cache_key(name=name)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _load_file_content(name=name)
+        cache.set(key, entry, FILE_CONTENT_CACHE_TIMEOUT)
+    return entry
+
+
+def decode_file_content(*, entry: Optional[dict]) -> Optional[str]:
+    if entry is None or entry["data"] is None:
+        return None
+    return zlib.decompress(entry["data"]).decode("utf-8", errors="replace")
+
+
+def get_file_content(*, name: Optional[str]) -> Optional[str]:
+    return decode_file_content(entry=get_file_content_entry(name=name))
+
+
+def delete_file_content(*, names) -> None:
+    cache.delete_many([file_content_cache_key(name=name) for name in names if name])
@@ -0,0 +1,94 @@
+import os
+from io import BytesIO
+from typing import Iterable, Optional
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from cheatgame.common.utils import build_media_url
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024)
+IMAGE_VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def image_variant_name(*, name: str, width: int, extension: str) -> str:
+    root, _ = os.path.splitext(name)
+    return f"{root}_{width}w.{extension}"
+
+
+def build_image_variants(*, name: str) -> dict:
+    """
+    Renders the stored image `name` at every variant width narrower than the
+    original, in every variant format, and saves the results next to it.
+    """
+    with default_storage.open(name, "rb") as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+
+    variants = {"source": name}
+    for extension, options in IMAGE_VARIANT_FORMATS.items():
+        variants[extension] = {}
+        for width in IMAGE_VARIANT_WIDTHS:
+            if width >= original.width:
+                continue
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.LANCZOS)
+            if options["format"] == "JPEG" and resized.mode != "RGB":
+                resized = resized.convert("RGB")
+            elif resized.mode not in ("RGB", "RGBA"):
+                resized = resized.convert("RGBA")
+
+            content = BytesIO()
+            resized.save(content, **options)
+            variant_name = image_variant_name(name=name, width=width, extension=extension)
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            variants[extension][str(width)] = default_storage.save(variant_name, ContentFile(content.getvalue()))
+    return variants
+
+
+def refresh_image_variants(*, instance: models.Model, field_names: Iterable[str]) -> bool:
+    """
+    Builds variants for every image field of `instance` whose file has no
+    variants yet and stores them in `instance.image_variants`. Returns whether
+    anything changed.
+    """
+    image_variants = dict(instance.image_variants or {})
+    changed = False
+    for field_name in field_names:
+        file = getattr(instance, field_name)
+        if not file:
+            changed |= image_variants.pop(field_name, None) is not None
+            continue
+        if image_variants.get(field_name, {}).get("source") == file.name:
+            continue
+        try:
+            image_variants[field_name] = build_image_variants(name=file.name)
+        except (UnidentifiedImageError, OSError):
+            image_variants[field_name] = {"source": file.name}
+        changed = True
+
+    if changed:
+        instance.image_variants = image_variants
+        type(instance).objects.filter(pk=instance.pk).update(image_variants=image_variants)
+    return changed
+
+
+def image_srcset(*, instance: models.Model, field_name: str) -> Optional[dict]:
+    """
+    Public URLs of the variants of an image field keyed by format and width,
+    or None while they are missing or belong to a replaced file.
+    """
+    file = getattr(instance, field_name)
+    variants = (instance.image_variants or {}).get(field_name)
+    if not file or not variants or variants.get("source") != file.name:
+        return None
+    return {
+        extension: {width: build_media_url(name) for width, name in variants.get(extension, {}).items()}
+        for extension in IMAGE_VARIANT_FORMATS
+    }
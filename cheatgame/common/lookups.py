@@ -0,0 +1,21 @@
+from django.db import models
+
+
+@models.CharField.register_lookup
+class ILikeContains(models.Lookup):
+    """
+    `field__ilike_contains=value`: a case-insensitive substring match written
+    as `field ILIKE '%value%'`, which a gin_trgm_ops index on the column can
+    serve, unlike the `UPPER(field::text) LIKE` that `icontains` compiles to.
+    """
+    lookup_name = "ilike_contains"
+    prepare_rhs = False
+
+    def process_rhs(self, compiler, connection):
+        rhs, params = super().process_rhs(compiler, connection)
+        return rhs, [f"%{connection.ops.prep_for_like_query(param)}%" for param in params]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", lhs_params + rhs_params
@@ -1,5 +1,10 @@
+from functools import lru_cache
+from typing import Optional
+
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
+from django.utils.encoding import filepath_to_uri
 from django.http import Http404
 from django.core.exceptions import ImproperlyConfigured
 
@@ -61,3 +66,36 @@ def assert_settings(required_settings, error_message_prefix=""):
 def reformat_url(*, url:str) -> str:
     index = url.find("?")
     return url[:index] if index != -1 else url
+
+
+@lru_cache(maxsize=1)
+def get_media_base_url() -> Optional[str]:
+    """
+    Public base URL of the S3 bucket, or None when files are not stored on S3.
+    """
+    if not settings.DEFAULT_FILE_STORAGE.endswith("S3Boto3Storage"):
+        return None
+    location = getattr(settings, "AWS_LOCATION", "").strip("/")
+    location = f"{location}/" if location else ""
+    custom_domain = getattr(settings, "AWS_S3_CUSTOM_DOMAIN", None)
+    if custom_domain:
+        return f"https://{custom_domain}/{location}"
+    return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{settings.AWS_STORAGE_BUCKET_NAME}/{location}"
+
+
+@lru_cache(maxsize=4096)
+def build_media_url(name: str) -> str:
+    base_url = get_media_base_url()
+    if base_url is None:
+        return reformat_url(url=default_storage.url(name))
+    return f"{base_url}{filepath_to_uri(name)}"
+
+
+def media_url(*, file) -> Optional[str]:
+    """
+    Unsigned public URL of a stored file, built from the storage settings
+    instead of `file.url`, which presigns every URL on S3.
+    """
+    if not file:
+        return None
+    return build_media_url(file.name)
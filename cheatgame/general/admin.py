@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from cheatgame.general.models import BlogCategory, Blog, Story, Slider, Banner, Message, UserMessage
+from cheatgame.general.services import schedule_general_image_variants
 
 
 class BlogCategoryInLine(admin.TabularInline):
@@ -33,6 +34,10 @@ class StoryAdmin(admin.ModelAdmin):
         "title", "link", "picture", "content_picture"
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_general_image_variants(instance=obj)
+
 
 @admin.register(Slider)
 class SliderAdmin(admin.ModelAdmin):
@@ -42,6 +47,10 @@ class SliderAdmin(admin.ModelAdmin):
         "laptop_picture", "link", "middle_picture", "mobile_picture",
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_general_image_variants(instance=obj)
+
 
 @admin.register(Banner)
 class BannerAdmin(admin.ModelAdmin):
@@ -50,6 +59,10 @@ class BannerAdmin(admin.ModelAdmin):
         "link", "location", "picture"
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_general_image_variants(instance=obj)
+
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     fields = ("title"  , "passage")
@@ -6,19 +6,23 @@ from rest_framework.views import APIView
 from storages.backends.s3boto3 import S3Boto3Storage
 
 from cheatgame.api.mixins import ApiAuthMixin
-from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer
-from cheatgame.api.utils import inline_serializer
-from cheatgame.common.utils import reformat_url
+from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer, \
+    KeysetPagination
+from cheatgame.api.utils import inline_serializer, ImageSrcsetField
+from cheatgame.common.content import get_file_content
+from cheatgame.common.utils import media_url, build_media_url
+from cheatgame.core.exceptions import ApplicationError
 from cheatgame.general.models import Story, Slider, BannerLocations, Banner, Blog, BlogCategory, Message, UserMessage, \
-    CommonQuestionLocation, CommonQuestion, Comment
+    CommonQuestionLocation, CommonQuestion, Comment, UploadPurpose
 from cheatgame.general.selectors import get_stories, get_sliders, get_banners, blog_list, get_blog, \
     get_user_message_list, get_message_list, get_common_question_list, get_comment_list_blog
 from cheatgame.general.services import create_story, update_story, delete_story, create_slider, update_slider, \
     delete_slider, create_banner, update_banner, delete_banner, create_blog, update_blog, delete_blog, \
     create_blog_category, update_blog_category, delete_blog_category, create_message, update_message, delete_message, \
     create_user_message, seen_user_message, create_common_question, update_common_question, delete_common_question, \
-    create_blog_comment, check_comment_exists, check_commnent_exists_id, update_comment, delete_comment
-from cheatgame.product.models import CategoryType, Category
+    create_blog_comment, check_comment_exists, check_commnent_exists_id, update_comment, delete_comment, \
+    create_presigned_upload, attach_presigned_upload
+from cheatgame.product.models import CategoryType, Category, Product
 from cheatgame.product.permissions import AdminOrManagerPermission, CustomerPermission, BlogCommentIsOwnerCustomer
 from cheatgame.product.selectors.product import products_numbers
 from cheatgame.users.models import BaseUser, UserTypes
@@ -39,10 +43,10 @@ class StoryAdminApi(ApiAuthMixin, APIView):
         content_picture = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url = obj.content_picture.url)
+            return media_url(file=obj.content_picture)
 
         def get_content_picture(self, obj):
-            return reformat_url(url = obj.content_picture.url)
+            return media_url(file=obj.content_picture)
 
         class Meta:
             model = Story
@@ -68,15 +72,18 @@ class StoryListApi(APIView):
     class StoryListOutPutSerializer(serializers.ModelSerializer):
         picture = serializers.SerializerMethodField()
         content_picture = serializers.SerializerMethodField()
+        picture_srcset = ImageSrcsetField(image_field="picture")
+        content_picture_srcset = ImageSrcsetField(image_field="content_picture")
 
         def get_picture(self, obj):
-            return reformat_url(url = obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_content_picture(self, obj):
-            return reformat_url(url = obj.content_picture.url)
+            return media_url(file=obj.content_picture)
         class Meta:
             model = Story
-            fields = ("id", "title", "picture", "link", "content_picture",)
+            fields = ("id", "title", "picture", "link", "content_picture", "picture_srcset",
+                      "content_picture_srcset",)
 
     @extend_schema(responses=StoryListOutPutSerializer)
     def get(self, request):
@@ -99,15 +106,18 @@ class StoryDetailApi(ApiAuthMixin, APIView):
     class StoryDetailOutPutSerializer(serializers.ModelSerializer):
         picture = serializers.SerializerMethodField()
         content_picture = serializers.SerializerMethodField()
+        picture_srcset = ImageSrcsetField(image_field="picture")
+        content_picture_srcset = ImageSrcsetField(image_field="content_picture")
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.content_picture.url)
+            return media_url(file=obj.content_picture)
 
         def get_content_picture(self, obj):
-            return reformat_url(url=obj.content_picture.url)
+            return media_url(file=obj.content_picture)
         class Meta:
             model = Story
-            fields = ("id", "title", "picture", "link", "content_picture",)
+            fields = ("id", "title", "picture", "link", "content_picture", "picture_srcset",
+                      "content_picture_srcset",)
 
     @extend_schema(request=StoryDetailInPutSerializer, responses={status.HTTP_200_OK: StoryDetailOutPutSerializer})
     def put(self, request, id: int):
@@ -149,13 +159,13 @@ class SliderAdminApi(ApiAuthMixin, APIView):
         mobile_picture = serializers.SerializerMethodField()
 
         def get_laptop_picture(self, obj):
-            return reformat_url(url=obj.laptop_picture.url)
+            return media_url(file=obj.laptop_picture)
 
         def get_middle_picture(self, obj):
-            return reformat_url(url=obj.middle_picture.url)
+            return media_url(file=obj.middle_picture)
 
         def get_mobile_picture(self, obj):
-            return reformat_url(url=obj.mobile_picture.url)
+            return media_url(file=obj.mobile_picture)
         class Meta:
             model = Slider
             fields = ("id", "laptop_picture", "link", "mobile_picture", "middle_picture")
@@ -181,20 +191,24 @@ class SliderListApi(APIView):
         laptop_picture = serializers.SerializerMethodField()
         middle_picture = serializers.SerializerMethodField()
         mobile_picture = serializers.SerializerMethodField()
+        laptop_picture_srcset = ImageSrcsetField(image_field="laptop_picture")
+        middle_picture_srcset = ImageSrcsetField(image_field="middle_picture")
+        mobile_picture_srcset = ImageSrcsetField(image_field="mobile_picture")
 
 
         def get_laptop_picture(self, obj):
-            return reformat_url(url = obj.laptop_picture.url)
+            return media_url(file=obj.laptop_picture)
 
         def get_middle_picture(self, obj):
-            return reformat_url(url=obj.middle_picture.url)
+            return media_url(file=obj.middle_picture)
 
         def get_mobile_picture(self, obj):
-            return reformat_url(url=obj.mobile_picture.url)
+            return media_url(file=obj.mobile_picture)
 
         class Meta:
             model = Slider
-            fields = ("id", "laptop_picture", "link", "middle_picture", "mobile_picture")
+            fields = ("id", "laptop_picture", "link", "middle_picture", "mobile_picture", "laptop_picture_srcset",
+                      "middle_picture_srcset", "mobile_picture_srcset")
 
     @extend_schema(responses=SliderListOutPutSerializer)
     def get(self, request):
@@ -220,13 +234,13 @@ class SliderDetailApi(ApiAuthMixin, APIView):
         mobile_picture = serializers.SerializerMethodField()
 
         def get_laptop_picture(self, obj):
-            return reformat_url(url=obj.laptop_picture.url)
+            return media_url(file=obj.laptop_picture)
 
         def get_middle_picture(self, obj):
-            return reformat_url(url=obj.middle_picture.url)
+            return media_url(file=obj.middle_picture)
 
         def get_mobile_picture(self, obj):
-            return reformat_url(url=obj.mobile_picture.url)
+            return media_url(file=obj.mobile_picture)
         class Meta:
             model = Slider
             fields = ("id", "laptop_picture", "link", "middle_picture", "mobile_picture")
@@ -268,7 +282,7 @@ class BannerAdminApi(ApiAuthMixin, APIView):
         picture = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url = obj.picture.url)
+            return media_url(file=obj.picture)
         class Meta:
             model = Banner
             fields = ("id", "picture", "link", "location")
@@ -291,12 +305,13 @@ class BannerAdminApi(ApiAuthMixin, APIView):
 class BannerListApi(APIView):
     class BannerListOutPutSerializer(serializers.ModelSerializer):
         picture = serializers.SerializerMethodField()
+        picture_srcset = ImageSrcsetField(image_field="picture")
 
         def get_picture(self, obj):
-            return reformat_url(url = obj.picture.url)
+            return media_url(file=obj.picture)
         class Meta:
             model = Banner
-            fields = ("id", "picture", "link", "location")
+            fields = ("id", "picture", "link", "location", "picture_srcset")
 
     @extend_schema(responses=BannerListOutPutSerializer)
     def get(self, request):
@@ -319,7 +334,7 @@ class BannerApi(ApiAuthMixin, APIView):
         picture = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
         class Meta:
             model = Banner
             fields = ("id", "picture", "link", "location")
@@ -361,10 +376,10 @@ class BlogAdminApi(ApiAuthMixin, APIView):
         content = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_content(self, obj):
-            return reformat_url(url=obj.content.url)
+            return media_url(file=obj.content)
 
         class Meta:
             model = Blog
@@ -478,10 +493,10 @@ class BlogDetailApi(ApiAuthMixin, APIView):
         content = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_content(self, obj):
-            return reformat_url(url=obj.content.url)
+            return media_url(file=obj.content)
 
         class Meta:
             model = Blog
@@ -516,7 +531,7 @@ class BlogListOutPutSerializer(serializers.ModelSerializer):
     picture = serializers.SerializerMethodField()
 
     def get_picture(self, obj):
-        return reformat_url(url=obj.picture.url)
+        return media_url(file=obj.picture)
 
 
     def get_comments_number(self, blog: Blog) -> int:
@@ -531,6 +546,9 @@ class BlogListApi(APIView):
     class Pagination(LimitOffsetPagination):
         default_limit = 10
 
+    class CursorPagination(KeysetPagination):
+        default_limit = 10
+
     class FilterBlogSerializer(serializers.Serializer):
         categories__in = serializers.CharField(required=False, max_length=200)
         search = serializers.CharField(required=False, max_length=100)
@@ -539,6 +557,8 @@ class BlogListApi(APIView):
     class PaginationParameterSerializer(serializers.Serializer):
         limit = serializers.IntegerField(required=False)
         offset = serializers.IntegerField(required=False)
+        cursor = serializers.CharField(required=False, allow_blank=True)
+        estimated_count = serializers.BooleanField(required=False)
 
     class PaginatedBlogListSerializer(PaginatedSerializer):
         results = BlogListOutPutSerializer(many=True)
@@ -553,8 +573,10 @@ class BlogListApi(APIView):
         except Exception as error:
             return Response(
                 {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        pagination_class = self.CursorPagination if KeysetPagination.cursor_query_param in request.query_params \
+            else self.Pagination
         return get_paginated_response(
-            pagination_class=self.Pagination,
+            pagination_class=pagination_class,
             serializer_class=BlogListOutPutSerializer,
             queryset=query_set,
             view=self,
@@ -576,10 +598,10 @@ class BlogDetailUserApi(APIView):
         content = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_content(self, obj):
-            return reformat_url(url=obj.content.url)
+            return media_url(file=obj.content)
 
         class BlogCommentOutPutSerializer(serializers.Serializer):
             user = inline_serializer(fields={
@@ -602,11 +624,19 @@ class BlogDetailUserApi(APIView):
             model = Blog
             fields = ("id", "title", "category_list", "slug", "content", "picture", "created_at", "comments")
 
-    @extend_schema(responses=BlogDetailUserOutPutSerializer)
+    class BlogDetailParameterSerializer(serializers.Serializer):
+        include_content = serializers.BooleanField(required=False, default=False)
+
+    @extend_schema(parameters=[BlogDetailParameterSerializer], responses=BlogDetailUserOutPutSerializer)
     def get(self, request, slug: str):
+        parameters = self.BlogDetailParameterSerializer(data=request.query_params)
+        parameters.is_valid(raise_exception=True)
         try:
             blog = get_blog(slug=slug)
-            return Response(self.BlogDetailUserOutPutSerializer(blog).data, status=status.HTTP_200_OK)
+            data = self.BlogDetailUserOutPutSerializer(blog).data
+            if parameters.validated_data.get("include_content"):
+                data["content_html"] = get_file_content(name=blog.content.name)
+            return Response(data, status=status.HTTP_200_OK)
         except Exception as error:
             return Response(
                 {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
@@ -691,13 +721,81 @@ class UploadFileS3ApiView(ApiAuthMixin, APIView):
             file = self.request.FILES.get("file")
             storage = S3Boto3Storage()
             file_path = storage.save(file.name, file)
-            file_url = storage.url(file_path)
-            file_url = reformat_url(url = file_url)
+            file_url = build_media_url(file_path)
             return Response({"url": file_url}, status=status.HTTP_201_CREATED)
         except Exception as error:
             return Response({"error": "فایل آپلود نشد."}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PresignedUploadApi(ApiAuthMixin, APIView):
+    permission_classes = (AdminOrManagerPermission,)
+
+    class PresignedUploadInPutSerializer(serializers.Serializer):
+        purpose = serializers.ChoiceField(choices=UploadPurpose.choices())
+        filename = serializers.CharField(max_length=200)
+        content_type = serializers.CharField(max_length=100)
+        size = serializers.IntegerField(min_value=1)
+
+    class PresignedUploadOutPutSerializer(serializers.Serializer):
+        url = serializers.URLField()
+        fields = serializers.DictField(child=serializers.CharField())
+        name = serializers.CharField()
+        token = serializers.CharField()
+        expires_in = serializers.IntegerField()
+
+    @extend_schema(request=PresignedUploadInPutSerializer,
+                   responses={status.HTTP_201_CREATED: PresignedUploadOutPutSerializer})
+    def post(self, request):
+        serializer = self.PresignedUploadInPutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = create_presigned_upload(
+                purpose=serializer.validated_data.get("purpose"),
+                filename=serializer.validated_data.get("filename"),
+                content_type=serializer.validated_data.get("content_type"),
+                size=serializer.validated_data.get("size"),
+            )
+            return Response(self.PresignedUploadOutPutSerializer(upload).data, status=status.HTTP_201_CREATED)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PresignedUploadConfirmApi(ApiAuthMixin, APIView):
+    permission_classes = (AdminOrManagerPermission,)
+
+    class PresignedUploadConfirmInPutSerializer(serializers.Serializer):
+        purpose = serializers.ChoiceField(choices=UploadPurpose.choices())
+        token = serializers.CharField()
+        product = serializers.PrimaryKeyRelatedField(required=False, queryset=Product.objects.all())
+
+    class PresignedUploadConfirmOutPutSerializer(serializers.Serializer):
+        id = serializers.IntegerField(allow_null=True)
+        name = serializers.CharField()
+        url = serializers.SerializerMethodField()
+
+        def get_url(self, upload):
+            return build_media_url(upload["name"])
+
+    @extend_schema(request=PresignedUploadConfirmInPutSerializer,
+                   responses={status.HTTP_200_OK: PresignedUploadConfirmOutPutSerializer})
+    def post(self, request):
+        serializer = self.PresignedUploadConfirmInPutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = attach_presigned_upload(
+                token=serializer.validated_data.get("token"),
+                purpose=serializer.validated_data.get("purpose"),
+                product=serializer.validated_data.get("product", None),
+            )
+            return Response(self.PresignedUploadConfirmOutPutSerializer(upload).data, status=status.HTTP_200_OK)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class HomePageReportApi(APIView):
     class HomePageReportOutPutSerializer(serializers.Serializer):
         products = serializers.IntegerField()
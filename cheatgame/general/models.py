@@ -23,11 +23,23 @@ class BannerLocations(IntEnum):
         return [(key.value, key.name) for key in cls]
 
 
+class UploadPurpose(IntEnum):
+    MEDIA = 1
+    PRODUCT_MAIN_IMAGE = 2
+    PRODUCT_IMAGE = 3
+    PRODUCT_DESCRIPTION = 4
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
 class Story(models.Model):
     picture = models.FileField()
     content_picture = models.FileField()
     link = models.URLField()
     title = models.CharField(max_length=50, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Slider(models.Model):
@@ -35,12 +47,14 @@ class Slider(models.Model):
     middle_picture = models.FileField(null=True, blank=True)
     mobile_picture = models.FileField(null=True, blank=True)
     link = models.URLField()
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Banner(models.Model):
     picture = models.FileField()
     link = models.URLField()
     location = models.IntegerField(choices=BannerLocations.choices(), unique=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Blog(BaseModel):
@@ -1,21 +1,41 @@
 import decimal
+import posixpath
+from collections import namedtuple
+from typing import Optional
+from uuid import uuid4
 
+from django.core import signing
+from django.db import models, transaction
 from django.db.models import QuerySet
-from django.utils.text import slugify
+from django.utils.text import slugify, get_valid_filename
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from cheatgame.common.content import delete_file_content
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.general.tasks import generate_general_image_variants
 from cheatgame.general.models import Story, Slider, Banner, Blog, BlogCategory, Message, UserMessage, CommonQuestion, \
-    Comment
+    Comment, UploadPurpose
 from cheatgame.issue.models import Issue
-from cheatgame.product.models import Category
+from cheatgame.product.models import Category, Product
+from cheatgame.product.services.image import create_image
+from cheatgame.product.services.product import attach_product_file
 from cheatgame.users.models import BaseUser
 
 
+def schedule_general_image_variants(*, instance: models.Model) -> None:
+    model_name = instance._meta.model_name
+    transaction.on_commit(lambda: generate_general_image_variants.delay(model_name=model_name, pk=instance.pk))
+
+
 def create_story(*, title: str, link: str, content_picture: str, picture: str) -> Story:
-    return Story.objects.create(
+    story = Story.objects.create(
         title=title,
         link=link,
         content_picture=content_picture,
         picture=picture
     )
+    schedule_general_image_variants(instance=story)
+    return story
 
 
 def update_story(*, story_id: int, title: str, link: str, content_picture: str = None, picture: str = None) -> Story:
@@ -27,6 +47,8 @@ def update_story(*, story_id: int, title: str, link: str, content_picture: str =
         story.picture = picture
     story.link = link
     story.save()
+    if content_picture is not None or picture is not None:
+        schedule_general_image_variants(instance=story)
     return story
 
 
@@ -35,12 +57,14 @@ def delete_story(*, story_id: int) -> None:
 
 
 def create_slider(*, link: str, laptop_picture: str, middle_picture: str, mobile_picture: str) -> Slider:
-    return Slider.objects.create(
+    slider = Slider.objects.create(
         link=link,
         laptop_picture=laptop_picture,
         middle_picture=middle_picture,
         mobile_picture=mobile_picture
     )
+    schedule_general_image_variants(instance=slider)
+    return slider
 
 
 def update_slider(*, slider_id: int, link: str, laptop_picture: str=None, middle_picture: str=None,
@@ -54,6 +78,8 @@ def update_slider(*, slider_id: int, link: str, laptop_picture: str=None, middle
     if mobile_picture is not None:
         slider.mobile_picture = mobile_picture
     slider.save()
+    if laptop_picture is not None or middle_picture is not None or mobile_picture is not None:
+        schedule_general_image_variants(instance=slider)
     return slider
 
 
@@ -61,6 +87,7 @@ def check_issue_exists(*  , issue_id: int) -> bool:
     return Issue.objects.filter(id=issue_id).exists()
 def update_issue(*, issue_id: int, picture: str=None, title: str, description:str=None, min_price: decimal, max_price: decimal) -> Issue:
     issue = Issue.objects.get(id=issue_id)
+    old_description = issue.description.name
     issue.title = title
     if picture is not None:
         issue.picture = picture
@@ -70,6 +97,8 @@ def update_issue(*, issue_id: int, picture: str=None, title: str, description:st
     issue.min_price = min_price
     issue.max_price = max_price
     issue.save()
+    if description is not None:
+        delete_file_content(names=[old_description, issue.description.name])
     return issue
 
 def delete_issue(* , issue_id: int) -> None:
@@ -86,11 +115,13 @@ def check_banner_exists(*, location: int) -> bool:
 
 
 def create_banner(*, picture: str, link: str, location: int) -> Banner:
-    return Banner.objects.create(
+    banner = Banner.objects.create(
         picture=picture,
         link=link,
         location=location
     )
+    schedule_general_image_variants(instance=banner)
+    return banner
 
 
 def update_banner(*, banner_id: int, picture: str = None, link: str, location: int) -> Banner:
@@ -100,6 +131,8 @@ def update_banner(*, banner_id: int, picture: str = None, link: str, location: i
     banner.location = location
     banner.link = link
     banner.save()
+    if picture is not None:
+        schedule_general_image_variants(instance=banner)
     return banner
 
 
@@ -118,6 +151,7 @@ def create_blog(*, title: str, content: str, picture: str) -> Blog:
 
 def update_blog(*, blog_id: int, title: str, content: str = None, picture: str = None) -> Blog:
     blog = Blog.objects.get(id=blog_id)
+    old_content = blog.content.name
     blog.title = title
     if content is not None:
         blog.content = content
@@ -125,6 +159,8 @@ def update_blog(*, blog_id: int, title: str, content: str = None, picture: str =
         blog.picture = picture
     blog.slug = slugify(title, allow_unicode=True)
     blog.save()
+    if content is not None:
+        delete_file_content(names=[old_content, blog.content.name])
     return blog
 
 
@@ -218,3 +254,81 @@ def update_comment(* , comment_id:int , content:str) -> Comment:
 
 def delete_comment(* , comment_id:int) -> None:
     comment = Comment.objects.filter(id=comment_id).delete()
+
+
+UploadRule = namedtuple("UploadRule", ["prefix", "content_type", "max_size"])
+
+UPLOAD_RULES = {
+    UploadPurpose.MEDIA: UploadRule("uploads/", "", 100 * 1024 * 1024),
+    UploadPurpose.PRODUCT_MAIN_IMAGE: UploadRule("product/main_images/", "image/", 20 * 1024 * 1024),
+    UploadPurpose.PRODUCT_IMAGE: UploadRule("product_images/", "image/", 20 * 1024 * 1024),
+    UploadPurpose.PRODUCT_DESCRIPTION: UploadRule("product/descriptions/", "", 20 * 1024 * 1024),
+}
+PRESIGNED_UPLOAD_EXPIRES_IN = 60 * 15
+# A token stays confirmable for a while after its upload URL expired, so slow
+# uploads that started in time can still be attached.
+PRESIGNED_UPLOAD_TOKEN_MAX_AGE = 60 * 60 * 6
+PRESIGNED_UPLOAD_SALT = "general.presigned-upload"
+
+
+def create_presigned_upload(*, purpose: int, filename: str, content_type: str, size: int) -> dict:
+    """
+    Issues a presigned S3 POST so the client uploads the file straight to the
+    bucket, plus a signed token to hand to `confirm_presigned_upload` afterwards.
+    """
+    rule = UPLOAD_RULES[UploadPurpose(purpose)]
+    if not content_type.startswith(rule.content_type):
+        raise ApplicationError("نوع فایل مجاز نیست.")
+    if size > rule.max_size:
+        raise ApplicationError("حجم فایل بیش از حد مجاز است.")
+
+    storage = S3Boto3Storage()
+    name = f"{rule.prefix}{uuid4().hex}/{get_valid_filename(filename)}"
+    key = posixpath.join(storage.location, name) if storage.location else name
+    presigned_post = storage.connection.meta.client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, rule.max_size]],
+        ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_IN,
+    )
+    return {
+        "url": presigned_post["url"],
+        "fields": presigned_post["fields"],
+        "name": name,
+        "token": signing.dumps({"name": name, "purpose": int(purpose)}, salt=PRESIGNED_UPLOAD_SALT),
+        "expires_in": PRESIGNED_UPLOAD_EXPIRES_IN,
+    }
+
+
+def confirm_presigned_upload(*, token: str, purpose: int) -> str:
+    """
+    Returns the storage name of the uploaded object of a token issued by
+    `create_presigned_upload`, once the object is present in the bucket.
+    """
+    try:
+        data = signing.loads(token, salt=PRESIGNED_UPLOAD_SALT, max_age=PRESIGNED_UPLOAD_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        raise ApplicationError("توکن آپلود نامعتبر است.")
+    if data["purpose"] != purpose:
+        raise ApplicationError("توکن آپلود نامعتبر است.")
+    if not S3Boto3Storage().exists(data["name"]):
+        raise ApplicationError("فایل هنوز آپلود نشده است.")
+    return data["name"]
+
+
+@transaction.atomic
+def attach_presigned_upload(*, token: str, purpose: int, product: Optional[Product] = None) -> dict:
+    name = confirm_presigned_upload(token=token, purpose=purpose)
+    result = {"name": name, "id": None}
+    if purpose == UploadPurpose.MEDIA:
+        return result
+    if product is None:
+        raise ApplicationError("محصول مشخص نشده است.")
+    if purpose == UploadPurpose.PRODUCT_IMAGE:
+        result["id"] = create_image(proudct=product, image=name).id
+    elif purpose == UploadPurpose.PRODUCT_MAIN_IMAGE:
+        result["id"] = attach_product_file(product_id=product.id, field_name="main_image", name=name).id
+    elif purpose == UploadPurpose.PRODUCT_DESCRIPTION:
+        result["id"] = attach_product_file(product_id=product.id, field_name="description", name=name).id
+    return result
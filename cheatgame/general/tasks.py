@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from cheatgame.common.images import refresh_image_variants
+from cheatgame.general.models import Story, Slider, Banner
+
+GENERAL_IMAGE_FIELDS = {
+    Story: ("picture", "content_picture"),
+    Slider: ("laptop_picture", "middle_picture", "mobile_picture"),
+    Banner: ("picture",),
+}
+
+
+@shared_task
+def generate_general_image_variants(model_name: str, pk: int) -> None:
+    model = next(model for model in GENERAL_IMAGE_FIELDS if model._meta.model_name == model_name)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is not None:
+        refresh_image_variants(instance=instance, field_names=GENERAL_IMAGE_FIELDS[model])
@@ -4,6 +4,7 @@ from django.urls.converters import SlugConverter
 from cheatgame.general.apis import StoryAdminApi, StoryDetailApi, StoryListApi, SliderAdminApi, SliderListApi, \
     SliderDetailApi, BannerAdminApi, BannerApi, BannerListApi, BlogAdminApi, BlogDetailApi, BlogListApi, \
     BlogDetailUserApi, BlogCategoryAdminApi, BlogCategoryDetailApi, UploadFileS3ApiView, HomePageReportApi, \
+    PresignedUploadApi, PresignedUploadConfirmApi, \
     CreateMessageAdminApi, MessageDetailAdminApi, CreateUserMessageList, MessageListUserOutPutSerializer, \
     UserMessageListApi, UserMessageSeenApi, MessageListApi, CommonQuestionAdminApi, CommonQuestionDetialAdminApi, \
     CommonQuestionListApi, BlogCommentCreateApi, BlogCommentDetailApi
@@ -33,6 +34,8 @@ urlpatterns = [
     path("leave-comment-blog/" , BlogCommentCreateApi.as_view() , name="leave-comment"),
     path("blog-comment-detail/<int:id>/" , BlogCommentDetailApi.as_view(), name="blog-comment-detail"),
     path("upload-file/", UploadFileS3ApiView.as_view(), name="upload-file-admin"),
+    path("presigned-upload/", PresignedUploadApi.as_view(), name="presigned-upload-admin"),
+    path("presigned-upload/confirm/", PresignedUploadConfirmApi.as_view(), name="presigned-upload-confirm-admin"),
     path("home-page-report/", HomePageReportApi.as_view(), name="home-page-report"),
     path("create-message/" , CreateMessageAdminApi.as_view() , name= "create-message-admin"),
     path("message-detail/<int:id>/" , MessageDetailAdminApi.as_view() , name ="message-detail-api"),
@@ -5,11 +5,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from cheatgame.api.mixins import ApiAuthMixin
-from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer
+from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer, \
+    KeysetPagination
 from cheatgame.api.utils import inline_serializer
-from cheatgame.common.utils import reformat_url
+from cheatgame.common.content import get_file_content
+from cheatgame.common.utils import media_url
 from cheatgame.general.services import update_issue, check_issue_exists, delete_issue
-from cheatgame.issue.filter import IssueReportFilter
 from cheatgame.issue.models import Issue, Tag, IssueType, IssueReport, IssueCategory, IssueTag
 from cheatgame.issue.selectors import issue_list, get_tag_list, issue_report_user, issue_report_list, \
     get_tag_list_of_issue
@@ -27,10 +28,10 @@ class IssueListOutPutSerializer(serializers.ModelSerializer):
     tags = serializers.SerializerMethodField()
 
     def get_picture(self, obj):
-        return reformat_url(url=obj.picture.url)
+        return media_url(file=obj.picture)
 
     def get_description(self, obj):
-        return reformat_url(url=obj.description.url)
+        return media_url(file=obj.description)
 
     def get_tags(self, obj):
         return obj.tags.all().values("id")
@@ -50,6 +51,9 @@ class IssueListApi(APIView):
     class Pagination(LimitOffsetPagination):
         default_limit = 10
 
+    class CursorPagination(KeysetPagination):
+        default_limit = 10
+
     class FilterIssueSerializer(serializers.Serializer):
         categories__in = serializers.CharField(required=False, max_length=200)
         search = serializers.CharField(required=False, max_length=100)
@@ -59,6 +63,8 @@ class IssueListApi(APIView):
     class PaginationParameterSerializer(serializers.Serializer):
         limit = serializers.IntegerField(required=False)
         offset = serializers.IntegerField(required=False)
+        cursor = serializers.CharField(required=False, allow_blank=True)
+        estimated_count = serializers.BooleanField(required=False)
 
     class PaginatedIssueSerializer(PaginatedSerializer):
         results = IssueListOutPutSerializer(many=True)
@@ -73,8 +79,10 @@ class IssueListApi(APIView):
         except Exception as error:
             return Response(
                 {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        pagination_class = self.CursorPagination if KeysetPagination.cursor_query_param in request.query_params \
+            else self.Pagination
         return get_paginated_response(
-            pagination_class=self.Pagination,
+            pagination_class=pagination_class,
             serializer_class=IssueListOutPutSerializer,
             queryset=query_set,
             view=self,
@@ -292,10 +300,10 @@ class issueDetailUserApi(APIView):
         description = serializers.SerializerMethodField()
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_description(self, obj):
-            return reformat_url(url=obj.description.url)
+            return media_url(file=obj.description)
 
 
 
@@ -313,13 +321,21 @@ class issueDetailUserApi(APIView):
             model = Issue
             fields = ("id" , "title", "category_list", "tag_list", "description", "picture", "max_price" , "min_price" )
 
-    @extend_schema(responses=IssueDetailUserOutPutSerializer)
+    class IssueDetailParameterSerializer(serializers.Serializer):
+        include_content = serializers.BooleanField(required=False, default=False)
+
+    @extend_schema(parameters=[IssueDetailParameterSerializer], responses=IssueDetailUserOutPutSerializer)
     def get(self, request,id):
+        parameters = self.IssueDetailParameterSerializer(data=request.query_params)
+        parameters.is_valid(raise_exception=True)
         try:
             if not check_issue_exists(issue_id=id):
                 return Response({"error": "آیتم مورد نظر یافت نشد."} , status=status.HTTP_404_NOT_FOUND)
             issue = get_issue(issue_id= id)
-            return Response(self.IssueDetailUserOutPutSerializer(issue).data, status=status.HTTP_200_OK)
+            data = self.IssueDetailUserOutPutSerializer(issue).data
+            if parameters.validated_data.get("include_content"):
+                data["description_html"] = get_file_content(name=issue.description.name)
+            return Response(data, status=status.HTTP_200_OK)
         except Exception as error:
             return Response(
                 {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
@@ -347,10 +363,10 @@ class IssueDetailApi(ApiAuthMixin, APIView):
 
 
         def get_picture(self, obj):
-            return reformat_url(url=obj.picture.url)
+            return media_url(file=obj.picture)
 
         def get_description(self, obj):
-            return reformat_url(url=obj.description.url)
+            return media_url(file=obj.description)
         class Meta:
             model = Issue
             fields = ("id", "picture", "title", "description", "max_price" , "min_price")
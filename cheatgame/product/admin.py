@@ -1,4 +1,9 @@
 from django.contrib import admin
+
+from cheatgame.product.cache import bump_catalog_version, bump_category_version
+from cheatgame.product.documents import schedule_product_document_rebuild, delete_product_document
+from cheatgame.product.services.image import schedule_product_image_variants, schedule_gallery_image_variants
+from cheatgame.product.services.reviews import apply_review_rating_change
 from cheatgame.product.models import Product, Image, Question, Category, Feature, Attachment, Label, \
     SuggestionProduct, ProductCategory, ValuesList, ProductLabel, ProductNote , Reviews
 
@@ -46,6 +51,26 @@ class ProductAdmin(admin.ModelAdmin):
         NoteInLine
     )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        bump_catalog_version()
+        schedule_product_document_rebuild(product_ids=[form.instance.id])
+        schedule_product_image_variants(product_id=form.instance.id)
+        for image_id in form.instance.images.values_list("id", flat=True):
+            schedule_gallery_image_variants(image_id=image_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        delete_product_document(slug=obj.slug)
+        bump_catalog_version()
+
+    def delete_queryset(self, request, queryset):
+        slugs = list(queryset.values_list("slug", flat=True))
+        super().delete_queryset(request, queryset)
+        for slug in slugs:
+            delete_product_document(slug=slug)
+        bump_catalog_version()
+
 
 admin.site.register(Product, ProductAdmin)
 
@@ -59,6 +84,10 @@ class ImageAdmin(admin.ModelAdmin):
     )
     list_filter = ("product",)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_gallery_image_variants(image_id=obj.id)
+
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
@@ -70,6 +99,19 @@ class QuestionAdmin(admin.ModelAdmin):
     )
     list_filter = ("product", "sender", "answered", "accepted")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_product_document_rebuild(product_ids=[obj.product_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        schedule_product_document_rebuild(product_ids=[obj.product_id])
+
+    def delete_queryset(self, request, queryset):
+        product_ids = list(queryset.values_list("product_id", flat=True))
+        super().delete_queryset(request, queryset)
+        schedule_product_document_rebuild(product_ids=product_ids)
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -81,6 +123,21 @@ class CategoryAdmin(admin.ModelAdmin):
     )
     list_filter = ("parent", "category_type")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_catalog_version()
+        bump_category_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog_version()
+        bump_category_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_version()
+        bump_category_version()
+
 
 @admin.register(Feature)
 class FeatureAdmin(admin.ModelAdmin):
@@ -129,4 +186,17 @@ class SuggestionProductAdmin(admin.ModelAdmin):
 @admin.register(Reviews)
 class ReviewAdmin(admin.ModelAdmin):
     fields = ("user" , "product" , "comment" , "rating" , "accepted")
-    list_display = ("user" , "product" , "comment" , "rating" , "accepted")
\ No newline at end of file
+    list_display = ("user" , "product" , "comment" , "rating" , "accepted")
+
+    def save_model(self, request, obj, form, change):
+        previous = Reviews.objects.filter(pk=obj.pk).first() if change else None
+        super().save_model(request, obj, form, change)
+        apply_review_rating_change(previous=previous, current=obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        apply_review_rating_change(previous=obj, current=None)
+
+    def delete_queryset(self, request, queryset):
+        for review in queryset:
+            self.delete_model(request, review)
@@ -2,11 +2,12 @@ from drf_spectacular.utils import extend_schema
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.utils.cache import patch_cache_control
 
 from cheatgame.api.mixins import ApiAuthMixin
 from cheatgame.product.models import CategoryType, Category, ProductCategory, Product
 from cheatgame.product.permissions import AdminOrManagerPermission
-from cheatgame.product.selectors.category import get_category_list, get_all_categories
+from cheatgame.product.selectors.category import get_category_list, get_all_categories, get_category_tree
 from cheatgame.product.services.category import create_category, create_product_categories, update_category, \
     delete_category, update_product_category, delete_product_category
 
@@ -100,6 +101,19 @@ class CategoryListApi(APIView):
         except Exception as error:
             return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
 
+class CategoryTreeApi(APIView):
+
+    @extend_schema(responses={status.HTTP_200_OK: CategoryListOutPutSerializer(many=True)})
+    def get(self, request, category_type):
+        try:
+            tree = get_category_tree(category_type=category_type)
+        except Exception:
+            return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(tree, status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+
+
 class CategoryListAdminApi(APIView):
     permission_classes = [AdminOrManagerPermission ,]
 
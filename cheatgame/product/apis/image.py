@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import serializers, status
 from cheatgame.api.mixins import ApiAuthMixin
-from cheatgame.common.utils import reformat_url
+from cheatgame.common.utils import media_url
 from cheatgame.product.models import Image, Product
 from cheatgame.product.services.image import create_image, update_image, delete_image
 
@@ -20,7 +20,7 @@ class ImageAdminApi(ApiAuthMixin, APIView):
         file = serializers.SerializerMethodField()
 
         def get_file(self , obj):
-            return reformat_url(url = obj.file.url)
+            return media_url(file=obj.file)
         class Meta:
             model = Image
             fields = ("id", "product", "file")
@@ -47,7 +47,7 @@ class ImageDetailAdminApi(ApiAuthMixin, APIView):
         file = serializers.SerializerMethodField()
 
         def get_file(self , obj):
-            return reformat_url(url = obj.file.url)
+            return media_url(file=obj.file)
         class Meta:
             model = Image
             fields = ("id", "product", "file")
@@ -1,48 +1,49 @@
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from rest_framework import serializers, status
-from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 
 from cheatgame.api.mixins import ApiAuthMixin
-from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer
-from cheatgame.api.utils import inline_serializer
-from cheatgame.common.utils import reformat_url
-from cheatgame.product.models import ProductType, Product, ProductOrderBy, Image, Category, Feature, ValuesList, \
-    Attachment, Question, Label, ProductNote
+from cheatgame.api.pagination import LimitOffsetPagination, get_paginated_response, PaginatedSerializer, \
+    KeysetPagination
+from cheatgame.api.utils import inline_serializer, ImageSrcsetField
+from cheatgame.common.content import get_file_content_entry, decode_file_content
+from cheatgame.common.utils import media_url
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.general.models import UploadPurpose
+from cheatgame.general.services import confirm_presigned_upload
+from cheatgame.product.cache import make_catalog_cache_key, PRODUCT_LIST_CACHE_TIMEOUT, catalog_cache_timeout
+from cheatgame.product.documents import get_product_document, build_product_document, ProductDocumentSerializer, \
+    ProductDetailProductSerializer
+from cheatgame.product.models import ProductType, Product, ProductOrderBy, Image, ValuesList, Attachment, \
+    ProductNote
 from cheatgame.product.permissions import AdminOrManagerPermission
-from cheatgame.product.selectors.product import product_list, product_detail
+from cheatgame.product.selectors.product import product_list, product_autocomplete, product_facets
 from cheatgame.product.services.product import create_product, create_product_note, update_product_note, \
     delete_product_note, update_product, check_product_exists, delete_product
-from cheatgame.users.models import BaseUser
-
-
-class ProductDetailProductSerializer(serializers.ModelSerializer):
-    main_image = serializers.SerializerMethodField()
-
-    def get_main_image(self, obj):
-        return reformat_url(url=obj.main_image.url)
-
-    class Meta:
-        model = Product
-        fields = ("id", "product_type", "title", "slug", "main_image", "price", "off_price", "quantity", "device_model")
 
 
 class ProductAdminApi(ApiAuthMixin, APIView):
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     permission_classes = (AdminOrManagerPermission,)
 
     class ProductCreateInputSerializer(serializers.Serializer):
         product_type = serializers.ChoiceField(choices=ProductType.choices())
         title = serializers.CharField(max_length=100)
-        main_image = serializers.FileField(required=True)
+        main_image = serializers.FileField(required=False)
+        main_image_token = serializers.CharField(required=False)
         price = serializers.DecimalField(max_digits=15, decimal_places=0)
         off_price = serializers.DecimalField(max_digits=15, decimal_places=0)
         quantity = serializers.IntegerField(required=True)
         discount_end_time = serializers.DateTimeField(required=False)
-        description = serializers.FileField()
+        description = serializers.FileField(required=False)
+        description_token = serializers.CharField(required=False)
         order_limit = serializers.IntegerField(required=False)
         device_model = serializers.CharField(max_length=100, required=False, allow_blank=True)
         included_products = serializers.PrimaryKeyRelatedField(required=False, many=True,
@@ -54,15 +55,23 @@ class ProductAdminApi(ApiAuthMixin, APIView):
                 raise serializers.ValidationError("حداکثر تعداد محصول مجاز ۵ عدد می باشد.")
             return included_products
 
+        def validate(self, data):
+            # Files are either sent in the request or uploaded to S3 beforehand
+            # through a presigned upload whose token is sent instead.
+            for field in ("main_image", "description"):
+                if field not in data and f"{field}_token" not in data:
+                    raise serializers.ValidationError({field: "این فیلد الزامی است."})
+            return data
+
     class ProuductCreateOutputSerializer(serializers.ModelSerializer):
         main_image = serializers.SerializerMethodField()
         description = serializers.SerializerMethodField()
 
         def get_main_image(self, obj):
-            return reformat_url(url=obj.main_image.url)
+            return media_url(file=obj.main_image)
 
         def get_description(self, obj):
-            return reformat_url(url=obj.description.url)
+            return media_url(file=obj.description)
 
         class Meta:
             model = Product
@@ -77,20 +86,26 @@ class ProductAdminApi(ApiAuthMixin, APIView):
         serializer = self.ProductCreateInputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
+            main_image = request.FILES.get("main_image") or confirm_presigned_upload(
+                token=serializer.validated_data.get("main_image_token"), purpose=UploadPurpose.PRODUCT_MAIN_IMAGE)
+            description = serializer.validated_data.get("description") or confirm_presigned_upload(
+                token=serializer.validated_data.get("description_token"), purpose=UploadPurpose.PRODUCT_DESCRIPTION)
             product = create_product(
                 product_type=serializer.validated_data.get("product_type"),
                 title=serializer.validated_data.get("title"),
-                main_image=request.FILES.get("main_image"),
+                main_image=main_image,
                 price=serializer.validated_data.get("price"),
                 off_price=serializer.validated_data.get("off_price"),
                 quantity=serializer.validated_data.get("quantity"),
                 discount_end_time=serializer.validated_data.get("discount_end_time", None),
-                description=serializer.validated_data.get("description"),
+                description=description,
                 included_products=serializer.validated_data.get("included_products", None),
                 order_limit=serializer.validated_data.get("order_limit", None),
                 device_model=serializer.validated_data.get("device_model", None)
             )
             return Response(self.ProuductCreateOutputSerializer(product).data, status=status.HTTP_201_CREATED)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as ex:
             return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -116,10 +131,10 @@ class ProductDetailAdminApi(ApiAuthMixin, APIView):
         description = serializers.SerializerMethodField()
 
         def get_main_image(self, obj):
-            return reformat_url(url=obj.main_image.url)
+            return media_url(file=obj.main_image)
 
         def get_description(self, obj):
-            return reformat_url(url=obj.description.url)
+            return media_url(file=obj.description)
 
         class Meta:
             model = Product
@@ -167,9 +182,10 @@ class ProductDetailAdminApi(ApiAuthMixin, APIView):
 class ProudctOutPutSerializer(serializers.ModelSerializer):
     included_products = ProductDetailProductSerializer(many=True)
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = ImageSrcsetField(image_field="main_image")
 
     def get_main_image(self, obj):
-        return reformat_url(url=obj.main_image.url)
+        return media_url(file=obj.main_image)
 
     attachments = inline_serializer(many=True,
                                     fields={
@@ -184,9 +200,10 @@ class ProudctOutPutSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ("id", "product_type", "title", "slug", "main_image",
+        fields = ("id", "product_type", "title", "slug", "main_image", "main_image_srcset",
                   "price", "off_price", "discount_end_time",
-                  "included_products", "order_limit", "device_model", "attachments" , "score"
+                  "included_products", "order_limit", "device_model", "attachments" , "score",
+                  "rating_avg", "rating_count"
                   )
 
 
@@ -194,13 +211,18 @@ class ProudctApi(APIView):
     class Pagination(LimitOffsetPagination):
         default_limit = 10
 
+    class CursorPagination(KeysetPagination):
+        default_limit = 10
+
     class FilterProductSerializer(serializers.Serializer):
         product_type = serializers.ChoiceField(required=False, choices=ProductType.choices())
         search = serializers.CharField(required=False, max_length=100)
+        fuzzy_search = serializers.CharField(required=False, max_length=100)
         off_price__range = serializers.CharField(required=False, max_length=100)
         created_at__range = serializers.CharField(required=False, max_length=100)
         has_discount = serializers.CharField(required=False)
         categories__in = serializers.CharField(required=False, max_length=200)
+        include_descendants = serializers.BooleanField(required=False)
         labels__in = serializers.CharField(required=False, max_length=100)
         is_exists = serializers.CharField(required=False)
         order_by = serializers.ChoiceField(required=False, choices=ProductOrderBy.choices())
@@ -211,164 +233,133 @@ class ProudctApi(APIView):
     class PaginationParameterSerializer(serializers.Serializer):
         limit = serializers.IntegerField(required=False)
         offset = serializers.IntegerField(required=False)
+        cursor = serializers.CharField(required=False, allow_blank=True)
+        estimated_count = serializers.BooleanField(required=False)
 
     @extend_schema(parameters=[FilterProductSerializer, PaginationParameterSerializer],
                    responses=PaginatedProductSerializer, )
     def get(self, request):
         filters_serializer = self.FilterProductSerializer(data=request.query_params)
         filters_serializer.is_valid(raise_exception=True)
+        pagination_serializer = self.PaginationParameterSerializer(data=request.query_params)
+        pagination_serializer.is_valid(raise_exception=True)
+        cache_key = make_catalog_cache_key(prefix="list", params={
+            "url": request.build_absolute_uri(request.path),
+            "filters": filters_serializer.validated_data,
+            "pagination": pagination_serializer.validated_data,
+        })
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
         try:
             query = product_list(filters=filters_serializer.validated_data)
         except Exception as error:
             return Response(
                 {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
-        return get_paginated_response(
-            pagination_class=self.Pagination,
+        pagination_class = self.CursorPagination if KeysetPagination.cursor_query_param in request.query_params \
+            else self.Pagination
+        response = get_paginated_response(
+            pagination_class=pagination_class,
             serializer_class=ProudctOutPutSerializer,
             queryset=query,
             view=self,
             request=request
         )
+        cache.set(cache_key, response.data, catalog_cache_timeout(filters=filters_serializer.validated_data,
+                                                                  timeout=PRODUCT_LIST_CACHE_TIMEOUT))
+        return response
 
 
-class ProductDetailCategorySerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Category
-        fields = ("name",)
-
-
-class ProductDetailFeatureSerializer(serializers.ModelSerializer):
-    category = ProductDetailCategorySerializer(read_only=True)
+class ProductFacetsApi(APIView):
+    class FacetsOutPutSerializer(serializers.Serializer):
+        labels = inline_serializer(many=True, fields={
+            "id": serializers.IntegerField(),
+            "name": serializers.CharField(),
+            "label_type": serializers.IntegerField(),
+            "count": serializers.IntegerField(),
+        })
+        categories = inline_serializer(many=True, fields={
+            "id": serializers.IntegerField(),
+            "name": serializers.CharField(),
+            "category_type": serializers.IntegerField(),
+            "count": serializers.IntegerField(),
+        })
+        prices = inline_serializer(many=True, fields={
+            "min": serializers.IntegerField(),
+            "max": serializers.IntegerField(allow_null=True),
+            "count": serializers.IntegerField(),
+        })
 
-    class Meta:
-        model = Feature
-        fields = ("name", "category")
+    @extend_schema(parameters=[ProudctApi.FilterProductSerializer], responses=FacetsOutPutSerializer)
+    def get(self, request):
+        filters_serializer = ProudctApi.FilterProductSerializer(data=request.query_params)
+        filters_serializer.is_valid(raise_exception=True)
+        filters = {key: value for key, value in filters_serializer.validated_data.items() if key != "order_by"}
+        try:
+            facets = product_facets(filters=filters)
+        except Exception:
+            return Response(
+                {"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.FacetsOutPutSerializer(facets).data, status=status.HTTP_200_OK)
 
 
-class ProductDetailLabelSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Label
-        fields = ("name", "label_type",)
+class ProductAutocompleteApi(APIView):
+    class AutocompleteInputSerializer(serializers.Serializer):
+        q = serializers.CharField(min_length=2, max_length=100)
+        limit = serializers.IntegerField(required=False, min_value=1, max_value=20, default=10)
 
+    class AutocompleteOutPutSerializer(serializers.Serializer):
+        id = serializers.IntegerField()
+        title = serializers.CharField()
+        slug = serializers.CharField()
 
-class ProductDetailUserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = BaseUser
-        fields = ("firstname", "lastname",)
+    @extend_schema(parameters=[AutocompleteInputSerializer], responses=AutocompleteOutPutSerializer(many=True))
+    def get(self, request):
+        serializer = self.AutocompleteInputSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            products = product_autocomplete(
+                query=serializer.validated_data.get("q"),
+                limit=serializer.validated_data.get("limit")
+            )
+        except Exception:
+            return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(self.AutocompleteOutPutSerializer(products, many=True).data, status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=60)
+        return response
 
 
 class ProductDetailApi(APIView):
-    class ProductDetailOutPutSerializer(serializers.Serializer):
-
-        comments_count = serializers.SerializerMethodField()
-
-        images = inline_serializer(many=True,
-                                   fields={
-                                       "id": serializers.CharField(required=False),
-                                       "file": serializers.FileField(required=False)
-                                   })
-        included_products = inline_serializer(many=True,
-                                              fields={
-                                                  "id": serializers.CharField(required=False),
-                                                  "product_type": serializers.IntegerField(required=False),
-                                                  "title": serializers.CharField(required=False),
-                                                  "main_image": serializers.FileField(required=False),
-                                              })
-        valueslist = inline_serializer(many=True,
-                                       fields={
-                                           "id": serializers.CharField(required=False),
-                                           "feature": ProductDetailFeatureSerializer(required=False),
-                                           "value": serializers.CharField(required=False),
-                                       })
-        attachments = inline_serializer(many=True,
-                                        fields={
-                                            "id": serializers.CharField(required=False),
-                                            "title": serializers.CharField(required=False),
-                                            "attachment_type": serializers.IntegerField(required=False),
-                                            "price": serializers.DecimalField(max_digits=15, decimal_places=0,
-                                                                              required=False),
-                                            "is_force_attachment": serializers.BooleanField(required=False),
-                                            "description": serializers.CharField(max_length=250)
-                                        })
-        suggestions = inline_serializer(many=True, fields={
-            "id": serializers.CharField(required=False),
-            "suggested": ProductDetailProductSerializer(required=False),
-        })
-        labels = inline_serializer(many=True, fields={
-            "id": serializers.CharField(required=False),
-            "label": ProductDetailLabelSerializer(required=False)
-        })
-
-        reviews = inline_serializer(many=True, fields={
-            "id": serializers.CharField(required=False),
-            "user": ProductDetailUserSerializer(required=False),
-            "comment": serializers.CharField(required=False),
-            "created_at": serializers.DateTimeField(required=False),
-        })
+    ProductDetailOutPutSerializer = ProductDocumentSerializer
 
-        questions = inline_serializer(many=True, fields={
-            "id": serializers.CharField(required=False),
-            "sender": ProductDetailUserSerializer(required=False),
-            "question": serializers.CharField(required=False),
-            "answer": serializers.CharField(required=False)
-        })
+    class ProductDetailParameterSerializer(serializers.Serializer):
+        include_content = serializers.BooleanField(required=False, default=False)
 
-        notes = inline_serializer(many=True, fields={
-            "id": serializers.CharField(required=False),
-            "title": serializers.CharField(max_length=100),
-        })
-        product_type = serializers.IntegerField()
-        title = serializers.CharField()
-        slug = serializers.SlugField()
-        main_image = serializers.SerializerMethodField()
-        price = serializers.DecimalField(decimal_places=0, max_digits=15)
-        off_price = serializers.DecimalField(decimal_places=0, max_digits=15)
-        quantity = serializers.IntegerField()
-        device_model = serializers.CharField()
-        id = serializers.IntegerField()
-        description = serializers.FileField()
-        discount_end_time = serializers.DateTimeField()
-        score = serializers.DecimalField(decimal_places=1, max_digits=4)
-        created_at = serializers.DateTimeField(required=False)
-        updated_at = serializers.DateTimeField(required=False)
-        def to_representation(self, instance):
-            representation = super().to_representation(instance)
-            images_data = representation["images"]
-            included_products_data = representation["included_products"]
-            print(f"{images_data=}")
-            for image_data in images_data:
-                image_data["file"] = reformat_url(url =image_data["file"])
-
-            for included_product in included_products_data:
-                included_product["main_image"] = reformat_url(url = included_product["main_image"])
-            representation["included_products"] = included_products_data
-            representation["images"] = images_data
-            return representation
-
-
-
-        def get_comments_count(self, product: Product) -> int:
-            return Question.objects.filter(accepted=True, product=product).count()
-
-        def get_main_image(self , obj):
-            return reformat_url(url = obj.main_image.url)
-
-        def get_description(self , obj):
-            return reformat_url(url = obj.description.url)
-        
-        
-        
-
-    @extend_schema(responses=ProductDetailOutPutSerializer)
+    @extend_schema(parameters=[ProductDetailParameterSerializer], responses=ProductDetailOutPutSerializer)
     def get(self, request, slug: str):
+        parameters = self.ProductDetailParameterSerializer(data=request.query_params)
+        parameters.is_valid(raise_exception=True)
         try:
-            product = product_detail(
-                slug=slug
-            )
-            serializer = self.ProductDetailOutPutSerializer(instance=product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            document = get_product_document(slug=slug) or build_product_document(slug=slug)
+            if document is None:
+                return Response({"error": "محصول موجود نیست"}, status=status.HTTP_400_BAD_REQUEST)
+            etag, data = document["etag"], document["data"]
+            if parameters.validated_data.get("include_content"):
+                content = get_file_content_entry(name=document.get("description"))
+                # The description file may be overwritten in place, so the
+                # content hash is part of the validator of this variant.
+                content_hash = content["hash"] if content else None
+                etag = f'{etag[:-1]}-{content_hash or "none"}"'
+                data = {**data, "description_html": decode_file_content(entry=content)}
         except Exception as error:
             return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        if_none_match = [etag.removeprefix("W/") for etag in parse_etags(request.headers.get("If-None-Match", ""))]
+        if etag in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        return response
 
 
 class ProductNoteAdminApi(ApiAuthMixin, APIView):
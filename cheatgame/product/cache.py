@@ -0,0 +1,64 @@
+import hashlib
+import json
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+from cheatgame.product.models import ProductOrderBy
+
+CATALOG_VERSION_KEY = "product:catalog:version"
+CATEGORY_VERSION_KEY = "product:category:version"
+PRODUCT_LIST_CACHE_TIMEOUT = 60 * 15
+# Favourite and sales counters change on every favourite and paid order, and
+# discounts lapse with time, all without a catalog version bump; responses
+# that depend on them are only cached this long.
+VOLATILE_CATALOG_CACHE_TIMEOUT = 60
+VOLATILE_PRODUCT_ORDERINGS = (ProductOrderBy.FAVOURITE, ProductOrderBy.BESTSELLING)
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Seeding from the clock keeps a fresh counter (after eviction or a flush)
+        # ahead of the versions baked into entries that may still be cached.
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key, int(time.time()))
+    return version
+
+
+def _incr_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time()), None)
+
+
+def get_catalog_version() -> int:
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> None:
+    transaction.on_commit(partial(_incr_version, CATALOG_VERSION_KEY))
+
+
+def get_category_version() -> int:
+    return _get_version(CATEGORY_VERSION_KEY)
+
+
+def bump_category_version() -> None:
+    transaction.on_commit(partial(_incr_version, CATEGORY_VERSION_KEY))
+
+
+def make_catalog_cache_key(*, prefix: str, params: dict) -> str:
+    normalized = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return f"product:{prefix}:{get_catalog_version()}:{digest}"
+
+
+def catalog_cache_timeout(*, filters: dict, timeout: int) -> int:
+    order_by = filters.get("order_by")
+    if "has_discount" in filters or (order_by is not None and int(order_by) in VOLATILE_PRODUCT_ORDERINGS):
+        return min(timeout, VOLATILE_CATALOG_CACHE_TIMEOUT)
+    return timeout
@@ -0,0 +1,205 @@
+import hashlib
+import json
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from cheatgame.api.utils import inline_serializer, MediaUrlField, ImageSrcsetField
+from cheatgame.common.utils import media_url
+from cheatgame.product.models import Product, SuggestionProduct, Category, Feature, Label, RATING_COUNT_FIELDS
+from cheatgame.product.selectors.product import product_detail
+from cheatgame.users.models import BaseUser
+
+PRODUCT_DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class ProductDetailProductSerializer(serializers.ModelSerializer):
+    main_image = serializers.SerializerMethodField()
+    main_image_srcset = ImageSrcsetField(image_field="main_image")
+
+    def get_main_image(self, obj):
+        return media_url(file=obj.main_image)
+
+    class Meta:
+        model = Product
+        fields = ("id", "product_type", "title", "slug", "main_image", "main_image_srcset", "price", "off_price",
+                  "quantity", "device_model")
+
+
+class ProductDetailCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ("name",)
+
+
+class ProductDetailFeatureSerializer(serializers.ModelSerializer):
+    category = ProductDetailCategorySerializer(read_only=True)
+
+    class Meta:
+        model = Feature
+        fields = ("name", "category")
+
+
+class ProductDetailLabelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Label
+        fields = ("name", "label_type",)
+
+
+class ProductDetailUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BaseUser
+        fields = ("firstname", "lastname",)
+
+
+class ProductDocumentSerializer(serializers.Serializer):
+
+    comments_count = serializers.SerializerMethodField()
+
+    images = inline_serializer(many=True,
+                               fields={
+                                   "id": serializers.CharField(required=False),
+                                   "file": MediaUrlField(required=False),
+                                   "srcset": ImageSrcsetField(image_field="file"),
+                               })
+    included_products = inline_serializer(many=True,
+                                          fields={
+                                              "id": serializers.CharField(required=False),
+                                              "product_type": serializers.IntegerField(required=False),
+                                              "title": serializers.CharField(required=False),
+                                              "main_image": MediaUrlField(required=False),
+                                              "main_image_srcset": ImageSrcsetField(image_field="main_image"),
+                                          })
+    valueslist = inline_serializer(many=True,
+                                   fields={
+                                       "id": serializers.CharField(required=False),
+                                       "feature": ProductDetailFeatureSerializer(required=False),
+                                       "value": serializers.CharField(required=False),
+                                   })
+    attachments = inline_serializer(many=True,
+                                    fields={
+                                        "id": serializers.CharField(required=False),
+                                        "title": serializers.CharField(required=False),
+                                        "attachment_type": serializers.IntegerField(required=False),
+                                        "price": serializers.DecimalField(max_digits=15, decimal_places=0,
+                                                                          required=False),
+                                        "is_force_attachment": serializers.BooleanField(required=False),
+                                        "description": serializers.CharField(max_length=250)
+                                    })
+    suggestions = inline_serializer(many=True, fields={
+        "id": serializers.CharField(required=False),
+        "suggested": ProductDetailProductSerializer(required=False),
+    })
+    labels = inline_serializer(many=True, fields={
+        "id": serializers.CharField(required=False),
+        "label": ProductDetailLabelSerializer(required=False)
+    })
+
+    reviews = inline_serializer(many=True, fields={
+        "id": serializers.CharField(required=False),
+        "user": ProductDetailUserSerializer(required=False),
+        "comment": serializers.CharField(required=False),
+        "created_at": serializers.DateTimeField(required=False),
+    })
+
+    questions = inline_serializer(many=True, fields={
+        "id": serializers.CharField(required=False),
+        "sender": ProductDetailUserSerializer(required=False),
+        "question": serializers.CharField(required=False),
+        "answer": serializers.CharField(required=False)
+    })
+
+    notes = inline_serializer(many=True, fields={
+        "id": serializers.CharField(required=False),
+        "title": serializers.CharField(max_length=100),
+    })
+    product_type = serializers.IntegerField()
+    title = serializers.CharField()
+    slug = serializers.SlugField()
+    main_image = serializers.SerializerMethodField()
+    main_image_srcset = ImageSrcsetField(image_field="main_image")
+    price = serializers.DecimalField(decimal_places=0, max_digits=15)
+    off_price = serializers.DecimalField(decimal_places=0, max_digits=15)
+    quantity = serializers.IntegerField()
+    device_model = serializers.CharField()
+    id = serializers.IntegerField()
+    description = MediaUrlField()
+    discount_end_time = serializers.DateTimeField()
+    score = serializers.DecimalField(decimal_places=1, max_digits=4)
+    rating_avg = serializers.DecimalField(decimal_places=2, max_digits=3)
+    rating_count = serializers.IntegerField()
+    rating_histogram = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField(required=False)
+    updated_at = serializers.DateTimeField(required=False)
+
+
+    def get_comments_count(self, product: Product) -> int:
+        # `questions` is prefetched with only the accepted ones by `product_detail`.
+        return len(product.questions.all())
+
+    def get_main_image(self , obj):
+        return media_url(file=obj.main_image)
+
+    def get_rating_histogram(self, product: Product) -> dict:
+        return {rating: getattr(product, field) for rating, field in RATING_COUNT_FIELDS.items()}
+
+
+def product_document_cache_key(*, slug: str) -> str:
+    return f"product:document:v2:{slug}"
+
+
+def get_product_document(*, slug: str) -> Optional[dict]:
+    return cache.get(product_document_cache_key(slug=slug))
+
+
+def set_product_document(*, slug: str, data: dict, description: Optional[str] = None) -> dict:
+    content = JSONRenderer().render(data)
+    document = {
+        "etag": f'"{hashlib.md5(content).hexdigest()}"',
+        "data": json.loads(content),
+        "description": description,
+    }
+    cache.set(product_document_cache_key(slug=slug), document, PRODUCT_DOCUMENT_CACHE_TIMEOUT)
+    return document
+
+
+def build_product_document(*, slug: str) -> Optional[dict]:
+    """
+    Serializes the product detail of `slug` and caches it as its document,
+    along with the name of its description file; None if there is no such
+    product.
+    """
+    product = product_detail(slug=slug)
+    if product is None:
+        return None
+    return set_product_document(slug=slug, data=ProductDocumentSerializer(instance=product).data,
+                                description=product.description.name or None)
+
+
+def delete_product_document(*, slug: str) -> None:
+    cache.delete(product_document_cache_key(slug=slug))
+
+
+def get_document_dependent_product_ids(*, product_ids: Iterable[int]) -> set[int]:
+    """
+    Products whose document embeds one of the given products, through
+    suggestions or package contents, besides the given products themselves.
+    """
+    product_ids = list(product_ids)
+    dependent_ids = set(product_ids)
+    dependent_ids.update(
+        SuggestionProduct.objects.filter(suggested_id__in=product_ids).values_list("product_id", flat=True))
+    dependent_ids.update(
+        Product.objects.filter(included_products__in=product_ids).values_list("id", flat=True))
+    return dependent_ids
+
+
+def schedule_product_document_rebuild(*, product_ids: Iterable[int]) -> None:
+    from cheatgame.product.tasks import rebuild_product_documents
+
+    product_ids = [product_id for product_id in set(product_ids) if product_id is not None]
+    if product_ids:
+        transaction.on_commit(lambda: rebuild_product_documents.delay(product_ids=product_ids))
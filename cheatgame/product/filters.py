@@ -1,21 +1,26 @@
 from django_filters import (
+    BooleanFilter,
     CharFilter,
     FilterSet,
 
 )
-from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q, Exists, OuterRef
 from django.utils import timezone
-from cheatgame.product.models import Product, ProductOrderBy, Question, Reviews
+from cheatgame.product.models import Product, ProductOrderBy, Question, Reviews, ProductCategory
+from cheatgame.product.selectors.category import get_category_ranges
 from rest_framework.exceptions import APIException
 
 
 class ProductFilter(FilterSet):
     product_type = CharFilter(method="filter_product_type")
     search = CharFilter(method="filter_search")
+    fuzzy_search = CharFilter(method="filter_fuzzy_search")
     off_price__range = CharFilter(method="filter_off_price__range")
     created_at__range = CharFilter(method="filter_created_at__range")
     has_discount = CharFilter(method="filter_has_discount")
     categories__in = CharFilter(method="filter_categories__in")
+    include_descendants = BooleanFilter(method="filter_include_descendants")
     labels__in = CharFilter(method="filter_labels__in")
     is_exists = CharFilter(method="filter_is_exists")
     order_by = CharFilter(method="filter_order_by")
@@ -24,15 +29,43 @@ class ProductFilter(FilterSet):
         return queryset.filter(product_type=int(value))
 
     def filter_search(self, queryset, name, value):
-        return queryset.annotate(search=SearchVector("title")).filter(search=value)
+        query = SearchQuery(value)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        ).order_by("-rank")
+
+    def filter_fuzzy_search(self, queryset, name, value):
+        return queryset.filter(
+            Q(title__ilike_contains=value) | Q(title__trigram_word_similar=value)
+        ).annotate(
+            similarity=TrigramWordSimilarity(value, "title")
+        ).order_by("-similarity")
 
     def filter_categories__in(self, queryset, name, value):
         limit = 10
         categories = value.split(",")
         if len(categories) > limit:
             raise APIException(f"you cannot add more than {len(categories)} categories")
+        if self.form.cleaned_data.get("include_descendants"):
+            return self.filter_category_subtrees(queryset, categories)
         return queryset.filter(categories__category__in=categories).distinct()
 
+    def filter_include_descendants(self, queryset, name, value):
+        # Applied by `filter_categories__in`.
+        return queryset
+
+    def filter_category_subtrees(self, queryset, categories):
+        category_ranges = get_category_ranges()
+        subtrees = Q()
+        for category_id in categories:
+            if not category_id.isdigit() or int(category_id) not in category_ranges:
+                continue
+            tree_id, lft, rght = category_ranges[int(category_id)]
+            subtrees |= Q(category__tree_id=tree_id, category__lft__gte=lft, category__rght__lte=rght)
+        if not subtrees:
+            return queryset.none()
+        return queryset.filter(Exists(ProductCategory.objects.filter(subtrees, product=OuterRef("pk"))))
+
     def filter_labels__in(self, queryset, name, value):
         limit = 10
         labels = value.split(",")
@@ -86,6 +119,12 @@ class ProductFilter(FilterSet):
             return queryset.order_by("off_price")
         elif value == ProductOrderBy.NEWEST:
             return queryset.order_by("-created_at")
+        elif value == ProductOrderBy.FAVOURITE:
+            return queryset.order_by("-favorite_count", "-id")
+        elif value == ProductOrderBy.TOPRATED:
+            return queryset.order_by("-rating_avg", "-rating_count", "-id")
+        elif value == ProductOrderBy.BESTSELLING:
+            return queryset.order_by("-sales_count", "-id")
         return queryset
 
     class Meta:
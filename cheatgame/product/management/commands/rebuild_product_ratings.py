@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cheatgame.product.services.reviews import rebuild_product_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating aggregates of every product from its accepted reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_product_ratings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates of {count} products."))
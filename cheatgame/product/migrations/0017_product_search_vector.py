@@ -0,0 +1,46 @@
+# Generated by Django 4.0.7 on 2026-10-18 18:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vector(apps, schema_editor):
+    Product = apps.get_model("product", "Product")
+    ProductLabel = apps.get_model("product", "ProductLabel")
+    ProductCategory = apps.get_model("product", "ProductCategory")
+    label_names = ProductLabel.objects.filter(product=OuterRef("pk")).values("product").annotate(
+        names=StringAgg("label__name", delimiter=" ")).values("names")
+    category_names = ProductCategory.objects.filter(product=OuterRef("pk")).values("product").annotate(
+        names=StringAgg("category__name", delimiter=" ")).values("names")
+    Product.objects.update(
+        search_vector=(
+                SearchVector("title", weight="A")
+                + SearchVector("device_model", weight="B")
+                + SearchVector(Subquery(label_names), weight="C")
+                + SearchVector(Subquery(category_names), weight="C")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_attachment_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.0.7 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Count, F, Value, Case, When, DecimalField
+from django.db.models.functions import Coalesce, Cast
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("product", "Product")
+    Reviews = apps.get_model("product", "Reviews")
+
+    def accepted_count(**filters):
+        return Coalesce(Subquery(
+            Reviews.objects.filter(product=OuterRef("pk"), accepted=True, **filters).values("product")
+            .annotate(total=Count("id")).values("total")
+        ), Value(0))
+
+    Product.objects.update(
+        rating_count=accepted_count(),
+        **{f"rating_{rating}_count": accepted_count(rating=rating) for rating in RATINGS},
+    )
+    rating_total = sum(F(f"rating_{rating}_count") * rating for rating in RATINGS)
+    rating_avg = Case(
+        When(rating_count=0, then=Value(0)),
+        default=Cast(rating_total, DecimalField(max_digits=15, decimal_places=2)) / F("rating_count"),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+    Product.objects.update(rating_avg=rating_avg, score=Case(When(rating_count=0, then=F("score")), default=rating_avg))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0018_product_title_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-rating_avg', '-rating_count', '-id'], name='product_rating_idx'),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
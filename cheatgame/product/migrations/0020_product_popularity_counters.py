@@ -0,0 +1,52 @@
+# Generated by Django 4.0.7 on 2026-10-18 18:44
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+PAID = 3
+
+
+def populate_popularity_counters(apps, schema_editor):
+    Product = apps.get_model("product", "Product")
+    FavoriteProduct = apps.get_model("users", "FavoriteProduct")
+    OrderItem = apps.get_model("shop", "OrderItem")
+    favorites = FavoriteProduct.objects.filter(product=OuterRef("pk")).values("product").annotate(
+        total=Count("id")).values("total")
+    sales = OrderItem.objects.filter(product=OuterRef("pk"), order__payment_status=PAID).values("product").annotate(
+        total=Sum("quantity")).values("total")
+    Product.objects.update(
+        favorite_count=Coalesce(Subquery(favorites), Value(0)),
+        sales_count=Coalesce(Subquery(sales), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0019_product_rating_aggregates'),
+        ('users', '0010_alter_address_postal_code'),
+        ('shop', '0010_alter_cartitem_price_alter_discount_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-favorite_count', '-id'], name='product_favorite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-sales_count', '-id'], name='product_sales_idx'),
+        ),
+        migrations.RunPython(populate_popularity_counters, migrations.RunPython.noop),
+    ]
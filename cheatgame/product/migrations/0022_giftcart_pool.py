@@ -0,0 +1,29 @@
+# Generated by Django 4.0.7 on 2026-10-18 19:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_discount_campaign'),
+        ('product', '0021_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='giftcartdata',
+            name='order_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='gift_cart_codes', to='shop.orderitem'),
+        ),
+        migrations.AlterField(
+            model_name='giftcartdata',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='gift_cart_codes', to='shop.order'),
+        ),
+        migrations.AddIndex(
+            model_name='giftcartdata',
+            index=models.Index(condition=models.Q(('order_item__isnull', True)), fields=['product', 'id'], name='giftcart_unassigned_idx'),
+        ),
+    ]
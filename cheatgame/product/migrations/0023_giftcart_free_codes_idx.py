@@ -0,0 +1,21 @@
+# Generated by Django 4.0.7 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0022_giftcart_pool'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='giftcartdata',
+            name='giftcart_unassigned_idx',
+        ),
+        migrations.AddIndex(
+            model_name='giftcartdata',
+            index=models.Index(condition=models.Q(('order__isnull', True), ('order_item__isnull', True)), fields=['product', 'id'], name='giftcart_unassigned_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from enum import IntEnum
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 
 from cheatgame.common.models import BaseModel
@@ -24,6 +26,8 @@ class ProductOrderBy(IntEnum):
     INEXPENSIVE = 2
     NEWEST = 3
     FAVOURITE = 4
+    TOPRATED = 5
+    BESTSELLING = 6
 
     @classmethod
     def choices(cls):
@@ -97,6 +101,9 @@ class RatingChoices(IntEnum):
         return [(key.value, key.name) for key in cls]
 
 
+RATING_COUNT_FIELDS = {rating.value: f"rating_{rating.value}_count" for rating in RatingChoices}
+
+
 class DirectionType(IntEnum):
     SEND = 1
     RECIEVE = 2
@@ -143,6 +150,26 @@ class Product(BaseModel):
     )
     device_model = models.CharField(max_length=100, null=True, blank=True)
     score = models.DecimalField(max_digits=4 , decimal_places=2, default=4.8)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.PositiveIntegerField(default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-favorite_count", "-id"], name="product_favorite_idx"),
+            models.Index(fields=["-sales_count", "-id"], name="product_sales_idx"),
+            models.Index(fields=["-rating_avg", "-rating_count", "-id"], name="product_rating_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(fields=["title"], name="product_title_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.title
@@ -155,7 +182,16 @@ class Product(BaseModel):
 class GiftCartData(BaseModel):
     product = models.ForeignKey("product.Product", on_delete=models.SET_NULL , null=True , blank=True)
     code = models.CharField(max_length=20)
-    order = models.OneToOneField("shop.Order" , on_delete=models.CASCADE , null=True , blank=True)
+    order = models.ForeignKey("shop.Order", on_delete=models.CASCADE, null=True, blank=True,
+                              related_name="gift_cart_codes")
+    order_item = models.ForeignKey("shop.OrderItem", on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name="gift_cart_codes")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "id"], name="giftcart_unassigned_idx",
+                         condition=models.Q(order_item__isnull=True, order__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.product.title}-code"
@@ -168,6 +204,7 @@ class Image(BaseModel):
                                 )
     file = models.FileField(upload_to='product_images/',
                             )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Question(BaseModel):
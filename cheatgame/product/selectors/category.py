@@ -1,7 +1,16 @@
+from django.core.cache import cache
 from django.db.models import QuerySet
 
+from cheatgame.product.cache import get_category_version
 from cheatgame.product.models import Category
 
+# Per-process copy of the (tree_id, lft, rght) range of every category. It is
+# reloaded only when the shared category version moves, so resolving a
+# category subtree does not hit the database.
+_category_ranges = {"version": None, "ranges": {}}
+
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 def get_category_list(*, category_type: int) -> QuerySet[Category]:
     return Category.objects.filter(category_type=category_type, parent__isnull=True)
@@ -9,3 +18,50 @@ def get_category_list(*, category_type: int) -> QuerySet[Category]:
 
 def get_all_categories() -> QuerySet[Category]:
     return Category.objects.all()
+
+
+def get_category_ranges() -> dict[int, tuple[int, int, int]]:
+    version = get_category_version()
+    if _category_ranges["version"] != version:
+        _category_ranges["ranges"] = {
+            category_id: (tree_id, lft, rght)
+            for category_id, tree_id, lft, rght in Category.objects.values_list("id", "tree_id", "lft", "rght")
+        }
+        _category_ranges["version"] = version
+    return _category_ranges["ranges"]
+
+
+def get_category_tree(*, category_type: int) -> list[dict]:
+    cache_key = f"product:category-tree:{get_category_version()}:{category_type}"
+    tree = cache.get(cache_key)
+    if tree is None:
+        tree = _build_category_tree(category_type=category_type)
+        cache.set(cache_key, tree, CATEGORY_TREE_CACHE_TIMEOUT)
+    return tree
+
+
+def _build_category_tree(*, category_type: int) -> list[dict]:
+    """
+    Builds the nested trees rooted at the categories of `category_type` from
+    a single query ordered by (tree_id, lft), which lists every node right
+    after its ancestors.
+    """
+    tree_ids = Category.objects.filter(category_type=category_type, parent__isnull=True).values("tree_id")
+    categories = Category.objects.filter(tree_id__in=tree_ids).order_by("tree_id", "lft").values(
+        "id", "name", "category_type", "parent", "tree_id", "lft", "rght")
+
+    roots = []
+    ancestors = []
+    for category in categories:
+        while ancestors and (ancestors[-1][0] != category["tree_id"] or ancestors[-1][1] < category["lft"]):
+            ancestors.pop()
+        node = {
+            "id": category["id"],
+            "name": category["name"],
+            "category_type": category["category_type"],
+            "parent": category["parent"],
+            "children": [],
+        }
+        (ancestors[-1][2]["children"] if ancestors else roots).append(node)
+        ancestors.append((category["tree_id"], category["rght"], node))
+    return roots
@@ -1,7 +1,12 @@
-from django.db.models import QuerySet, Prefetch
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db.models import QuerySet, Prefetch, Q, Case, When, Value, IntegerField, F, Count, BigIntegerField, \
+    CharField
 
+from cheatgame.product.cache import make_catalog_cache_key, catalog_cache_timeout
 from cheatgame.product.filters import ProductFilter
-from cheatgame.product.models import Product, Question, Reviews, Label, LabelType, SuggestionProduct
+from cheatgame.product.models import Product, Question, Reviews, Label, LabelType, SuggestionProduct, ValuesList, \
+    ProductLabel, ProductCategory
 
 
 def product_list(*, filters=None) -> QuerySet[Product]:
@@ -10,6 +15,76 @@ def product_list(*, filters=None) -> QuerySet[Product]:
     return ProductFilter(filters, qs).qs.prefetch_related("attachments")
 
 
+AUTOCOMPLETE_CACHE_TIMEOUT = 60 * 5
+
+
+def product_autocomplete(*, query: str, limit: int = 10) -> list[dict]:
+    query = " ".join(query.split()).lower()
+    cache_key = make_catalog_cache_key(prefix="autocomplete", params={"query": query, "limit": limit})
+    result = cache.get(cache_key)
+    if result is None:
+        qs = Product.objects.filter(
+            Q(title__ilike_contains=query) | Q(title__trigram_word_similar=query)
+        ).annotate(
+            is_prefix=Case(When(title__istartswith=query, then=Value(1)), default=Value(0),
+                           output_field=IntegerField()),
+            similarity=TrigramWordSimilarity(query, "title"),
+        ).order_by("-is_prefix", "-similarity", "title").values("id", "title", "slug")[:limit]
+        result = list(qs)
+        cache.set(cache_key, result, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return result
+
+
+FACETS_CACHE_TIMEOUT = 60 * 15
+PRICE_FACET_BOUNDARIES = (1_000_000, 5_000_000, 10_000_000, 20_000_000, 50_000_000)
+
+
+def product_facets(*, filters=None) -> dict:
+    filters = filters or {}
+    cache_key = make_catalog_cache_key(prefix="facets", params=filters)
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = _product_facets(filters=filters)
+        cache.set(cache_key, facets, catalog_cache_timeout(filters=filters, timeout=FACETS_CACHE_TIMEOUT))
+    return facets
+
+
+def _product_facets(*, filters: dict) -> dict:
+    product_ids = ProductFilter(filters, Product.objects.all()).qs.order_by().values("id")
+    label_counts = ProductLabel.objects.filter(product__in=product_ids).annotate(
+        facet=Value("label"), key=F("label_id"), name=F("label__name"), kind=F("label__label_type"),
+    ).values("facet", "key", "name", "kind").annotate(count=Count("product_id", distinct=True))
+    category_counts = ProductCategory.objects.filter(product__in=product_ids).annotate(
+        facet=Value("category"), key=F("category_id"), name=F("category__name"), kind=F("category__category_type"),
+    ).values("facet", "key", "name", "kind").annotate(count=Count("product_id", distinct=True))
+    price_bucket = Case(
+        *[When(off_price__lt=boundary, then=Value(index)) for index, boundary in enumerate(PRICE_FACET_BOUNDARIES)],
+        default=Value(len(PRICE_FACET_BOUNDARIES)),
+        output_field=BigIntegerField(),
+    )
+    price_counts = Product.objects.filter(id__in=product_ids).annotate(
+        facet=Value("price"), key=price_bucket, name=Value("", output_field=CharField()),
+        kind=Value(0, output_field=IntegerField()),
+    ).values("facet", "key", "name", "kind").annotate(count=Count("id"))
+
+    facets = {"labels": [], "categories": [], "prices": []}
+    bounds = (0, *PRICE_FACET_BOUNDARIES, None)
+    for row in label_counts.union(category_counts, price_counts, all=True):
+        if row["facet"] == "label":
+            facets["labels"].append(
+                {"id": row["key"], "name": row["name"], "label_type": row["kind"], "count": row["count"]})
+        elif row["facet"] == "category":
+            facets["categories"].append(
+                {"id": row["key"], "name": row["name"], "category_type": row["kind"], "count": row["count"]})
+        else:
+            facets["prices"].append(
+                {"min": bounds[row["key"]], "max": bounds[row["key"] + 1], "count": row["count"]})
+    facets["labels"].sort(key=lambda item: -item["count"])
+    facets["categories"].sort(key=lambda item: -item["count"])
+    facets["prices"].sort(key=lambda item: item["min"])
+    return facets
+
+
 def products_numbers() -> int:
     return Product.objects.all().count()
 
@@ -17,13 +92,13 @@ def products_numbers() -> int:
 def product_detail(*, slug: str) -> Product:
     return Product.objects.filter(slug=slug).prefetch_related(
         "images",
-        "categories",
-        "valueslist",
+        "included_products",
+        Prefetch("valueslist", queryset=ValuesList.objects.select_related("feature__category")),
         "attachments",
-        "suggestions",
-        "labels",
-        Prefetch("reviews", queryset=Reviews.objects.filter(accepted=True)),
-        Prefetch("questions", queryset=Question.objects.filter(accepted=True)),
+        Prefetch("suggestions", queryset=SuggestionProduct.objects.select_related("suggested")),
+        Prefetch("labels", queryset=ProductLabel.objects.select_related("label")),
+        Prefetch("reviews", queryset=Reviews.objects.filter(accepted=True).select_related("user")),
+        Prefetch("questions", queryset=Question.objects.filter(accepted=True).select_related("sender")),
         "notes"
     ).first()
 
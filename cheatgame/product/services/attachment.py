@@ -1,11 +1,13 @@
 import decimal
 
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Product, Attachment
 
 
 def create_attchement(*, attachment_type: int, title: str, price: decimal, is_force_attachment: bool,
                       product: Product , description:str) -> Attachment:
-    return Attachment.objects.create(
+    attachment = Attachment.objects.create(
         attachment_type=attachment_type,
         title=title,
         price=price,
@@ -13,11 +15,15 @@ def create_attchement(*, attachment_type: int, title: str, price: decimal, is_fo
         product=product,
         description=description
     )
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[product.id])
+    return attachment
 
 
 def update_attachment(*, attachment_type: int, title: str, price: decimal, is_force_attachment: bool,
                       product: Product, attachment_id: int , description: str) -> Attachment:
     attachment = Attachment.objects.get(id=attachment_id)
+    old_product_id = attachment.product_id
     attachment.attachment_type = attachment_type
     attachment.title = title
     attachment.price = price
@@ -25,8 +31,13 @@ def update_attachment(*, attachment_type: int, title: str, price: decimal, is_fo
     attachment.product = product
     attachment.description = description
     attachment.save()
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[old_product_id, product.id])
     return attachment
 
 
 def delete_attachment(*, attachment_id: int) -> None:
-    Attachment.objects.get(id=attachment_id).delete()
+    attachment = Attachment.objects.get(id=attachment_id)
+    attachment.delete()
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[attachment.product_id])
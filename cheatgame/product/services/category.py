@@ -1,16 +1,22 @@
 from django.db.models import QuerySet
 
-from cheatgame.product.models import Category, ProductCategory, Product
+from cheatgame.product.cache import bump_catalog_version, bump_category_version
+from cheatgame.product.documents import schedule_product_document_rebuild
+from cheatgame.product.models import Category, ProductCategory, Product, ValuesList
+from cheatgame.product.services.product import update_product_search_vector
 from django.utils.text import slugify
 
 
 def create_category(*, name: str, category_type: int, parent: Category) -> Category:
-    return Category.objects.create(
+    category = Category.objects.create(
         name=name,
         slug=slugify(name, allow_unicode=True),
         category_type=category_type,
         parent=parent
     )
+    bump_catalog_version()
+    bump_category_version()
+    return category
 
 
 def update_category(*, category_id: int, name: str, category_type: int, parent: Category) -> Category:
@@ -20,24 +26,50 @@ def update_category(*, category_id: int, name: str, category_type: int, parent:
     category.parent = parent
     category.slug = slugify(name, allow_unicode=True)
     category.save()
+    update_product_search_vector(product_ids=ProductCategory.objects.filter(category=category).values("product_id"))
+    bump_catalog_version()
+    bump_category_version()
+    schedule_product_document_rebuild(
+        product_ids=ValuesList.objects.filter(feature__category=category).values_list("product_id", flat=True))
     return category
 
 
 def delete_category(category_id: int) -> None:
-    Category.objects.get(id=category_id).delete()
+    category = Category.objects.get(id=category_id)
+    categories = category.get_descendants(include_self=True)
+    product_ids = list(ProductCategory.objects.filter(
+        category__in=categories
+    ).values_list("product_id", flat=True).distinct())
+    document_product_ids = list(ValuesList.objects.filter(
+        feature__category__in=categories
+    ).values_list("product_id", flat=True).distinct())
+    category.delete()
+    update_product_search_vector(product_ids=product_ids)
+    bump_catalog_version()
+    bump_category_version()
+    schedule_product_document_rebuild(product_ids=document_product_ids)
 
 
 def create_product_categories(*, product_category: list[ProductCategory]) -> QuerySet[ProductCategory]:
-    return ProductCategory.objects.bulk_create(product_category)
+    product_categories = ProductCategory.objects.bulk_create(product_category)
+    update_product_search_vector(product_ids={item.product_id for item in product_categories})
+    bump_catalog_version()
+    return product_categories
 
 
 def update_product_category(*, product_category_id: int, product: Product, category: Category) -> ProductCategory:
     product_category = ProductCategory.objects.get(id=product_category_id)
+    old_product_id = product_category.product_id
     product_category.product = product
     product_category.category = category
     product_category.save()
+    update_product_search_vector(product_ids=[old_product_id, product.id])
+    bump_catalog_version()
     return product_category
 
 
 def delete_product_category(*, product_category_id) -> None:
-    ProductCategory.objects.get(id=product_category_id).delete()
+    product_category = ProductCategory.objects.get(id=product_category_id)
+    product_category.delete()
+    update_product_search_vector(product_ids=[product_category.product_id])
+    bump_catalog_version()
@@ -1,3 +1,4 @@
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Category, Feature, Product, ValuesList
 
 
@@ -10,11 +11,13 @@ def create_feature(*, name: str, feature_type: int, category: Category) -> Featu
 
 
 def create_product_feature(*, value: str, product: Product, feature: Feature) -> ValuesList:
-    return ValuesList.objects.create(
+    values_list = ValuesList.objects.create(
         value=value,
         product=product,
         feature=feature
     )
+    schedule_product_document_rebuild(product_ids=[product.id])
+    return values_list
 
 
 def update_feature(*, feature_id: int, name: str, feature_type: int, category: Category) -> Feature:
@@ -23,21 +26,30 @@ def update_feature(*, feature_id: int, name: str, feature_type: int, category: C
     feature.feature_type = feature_type
     feature.category = category
     feature.save()
+    schedule_product_document_rebuild(
+        product_ids=ValuesList.objects.filter(feature=feature).values_list("product_id", flat=True))
     return feature
 
 
 def delete_feature(*, feature_id: int) -> None:
-    Feature.objects.get(id=feature_id).delete()
+    feature = Feature.objects.get(id=feature_id)
+    product_ids = list(ValuesList.objects.filter(feature=feature).values_list("product_id", flat=True))
+    feature.delete()
+    schedule_product_document_rebuild(product_ids=product_ids)
 
 
 def update_product_feature(*, product_feature_id: int, value: str, product: Product, feature: Feature) -> ValuesList:
     values_list = ValuesList.objects.get(id=product_feature_id)
+    old_product_id = values_list.product_id
     values_list.value = value
     values_list.product = product
     values_list.feature = feature
     values_list.save()
+    schedule_product_document_rebuild(product_ids=[old_product_id, product.id])
     return values_list
 
 
 def delete_product_feature(*, product_feature_id) -> None:
-    ValuesList.objects.get(id=product_feature_id).delete()
+    values_list = ValuesList.objects.get(id=product_feature_id)
+    values_list.delete()
+    schedule_product_document_rebuild(product_ids=[values_list.product_id])
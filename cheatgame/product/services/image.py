@@ -1,20 +1,44 @@
+from django.db import transaction
+
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Image, Product
 
 
+def schedule_product_image_variants(*, product_id: int) -> None:
+    from cheatgame.product.tasks import generate_product_image_variants
+
+    transaction.on_commit(lambda: generate_product_image_variants.delay(product_id=product_id))
+
+
+def schedule_gallery_image_variants(*, image_id: int) -> None:
+    from cheatgame.product.tasks import generate_gallery_image_variants
+
+    transaction.on_commit(lambda: generate_gallery_image_variants.delay(image_id=image_id))
+
+
 def create_image(*, proudct: Product, image) -> Image:
-    return Image.objects.create(product=proudct,
-                                file=image)
+    image = Image.objects.create(product=proudct,
+                                 file=image)
+    schedule_product_document_rebuild(product_ids=[proudct.id])
+    schedule_gallery_image_variants(image_id=image.id)
+    return image
 
 
 def update_image(*, image_id: int, product: Product, image=None) -> Image:
     file = Image.objects.get(id=image_id)
+    old_product_id = file.product_id
     if image is not None:
         file.file = image
     file.product = product
     file.save()
+    schedule_product_document_rebuild(product_ids=[old_product_id, product.id])
+    if image is not None:
+        schedule_gallery_image_variants(image_id=file.id)
     return file
 
 
 def delete_image(*, image_id: int) -> None:
-    Image.objects.get(id=image_id).delete()
+    image = Image.objects.get(id=image_id)
+    image.delete()
+    schedule_product_document_rebuild(product_ids=[image.product_id])
     print("error")
@@ -1,11 +1,16 @@
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Label, Product, ProductLabel
+from cheatgame.product.services.product import update_product_search_vector
 
 
 def create_label(*, label_type: int, name: str) -> Label:
-    return Label.objects.create(
+    label = Label.objects.create(
         label_type=label_type,
         name=name
     )
+    bump_catalog_version()
+    return label
 
 
 def update_label(*, label_id: int, label_type: int, name: str) -> Label:
@@ -13,27 +18,48 @@ def update_label(*, label_id: int, label_type: int, name: str) -> Label:
     label.label_type = label_type
     label.name = name
     label.save()
+    product_ids = list(ProductLabel.objects.filter(label=label).values_list("product_id", flat=True))
+    update_product_search_vector(product_ids=product_ids)
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=product_ids)
     return label
 
 
 def delete_label(*, label_id=int) -> None:
-    Label.objects.get(id=label_id).delete()
+    label = Label.objects.get(id=label_id)
+    product_ids = list(ProductLabel.objects.filter(label=label).values_list("product_id", flat=True))
+    label.delete()
+    update_product_search_vector(product_ids=product_ids)
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=product_ids)
 
 
 def create_product_label(*, label: Label, product: Product) -> ProductLabel:
-    return ProductLabel.objects.create(
+    product_label = ProductLabel.objects.create(
         label=label,
         product=product
     )
+    update_product_search_vector(product_ids=[product.id])
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[product.id])
+    return product_label
 
 
 def update_product_label(*, product_label_id: int, label: Label, product: Product) -> ProductLabel:
     product_label = ProductLabel.objects.get(id=product_label_id)
+    old_product_id = product_label.product_id
     product_label.label = label
     product_label.product = product
     product_label.save()
+    update_product_search_vector(product_ids=[old_product_id, product.id])
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[old_product_id, product.id])
     return product_label
 
 
 def delete_product_label(*, product_label_id: int) -> None:
-    ProductLabel.objects.get(id=product_label_id).delete()
+    product_label = ProductLabel.objects.get(id=product_label_id)
+    product_label.delete()
+    update_product_search_vector(product_ids=[product_label.product_id])
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[product_label.product_id])
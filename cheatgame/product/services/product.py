@@ -1,9 +1,33 @@
 import datetime
+from typing import Iterable
 
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
 from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from django.utils.text import slugify
 
-from cheatgame.product.models import Product, ProductNote
+from cheatgame.common.content import delete_file_content
+from cheatgame.product.models import Product, ProductNote, ProductLabel, ProductCategory
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import schedule_product_document_rebuild, delete_product_document, \
+    get_document_dependent_product_ids
+from cheatgame.product.services.image import schedule_product_image_variants
+
+
+def update_product_search_vector(*, product_ids: Iterable[int]) -> None:
+    label_names = ProductLabel.objects.filter(product=OuterRef("pk")).values("product").annotate(
+        names=StringAgg("label__name", delimiter=" ")).values("names")
+    category_names = ProductCategory.objects.filter(product=OuterRef("pk")).values("product").annotate(
+        names=StringAgg("category__name", delimiter=" ")).values("names")
+    Product.objects.filter(id__in=product_ids).update(
+        search_vector=(
+                SearchVector("title", weight="A")
+                + SearchVector("device_model", weight="B")
+                + SearchVector(Subquery(label_names), weight="C")
+                + SearchVector(Subquery(category_names), weight="C")
+        )
+    )
 
 
 @transaction.atomic
@@ -27,6 +51,10 @@ def create_product(*, product_type: int, title: str, main_image: str, price: flo
         product_ids = [product.id for product in included_products]
         included_products = Product.objects.filter(id__in=product_ids)
         product.included_products.add(*included_products)
+    update_product_search_vector(product_ids=[product.id])
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[product.id])
+    schedule_product_image_variants(product_id=product.id)
     return product
 
 
@@ -34,12 +62,21 @@ def check_product_exists(*, product_id: int) -> bool:
     return Product.objects.filter(id=product_id).exists()
 
 def delete_product(*, product_id: int) -> None:
-    Product.objects.filter(id=product_id).delete()
+    product = Product.objects.filter(id=product_id).first()
+    if product is None:
+        return
+    dependent_ids = get_document_dependent_product_ids(product_ids=[product.id]) - {product.id}
+    product.delete()
+    delete_product_document(slug=product.slug)
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=dependent_ids)
 
 def update_product(*, product_id: int, product_type: int, title: str, main_image: str = None, price: float, off_price: float,
                    quantity: int, discount_end_time: datetime = None, description: str =None,
                    order_limit: int = None, device_model: str) -> Product:
     product = Product.objects.select_for_update().get(id=product_id)
+    old_slug = product.slug
+    old_description = product.description.name
     product.product_type = product_type
     product.title = title
     if main_image is not None:
@@ -55,23 +92,53 @@ def update_product(*, product_id: int, product_type: int, title: str, main_image
     product.save(
         update_fields=["product_type", "title", "main_image", "price", "off_price", "quantity", "discount_end_time",
                        "description", "order_limit", "device_model" ,"updated_at"])
+    update_product_search_vector(product_ids=[product.id])
+    bump_catalog_version()
+    if description is not None:
+        delete_file_content(names=[old_description, product.description.name])
+    if product.slug != old_slug:
+        delete_product_document(slug=old_slug)
+    schedule_product_document_rebuild(product_ids=[product.id])
+    if main_image is not None:
+        schedule_product_image_variants(product_id=product.id)
+    return product
+
+
+@transaction.atomic
+def attach_product_file(*, product_id: int, field_name: str, name: str) -> Product:
+    product = Product.objects.select_for_update().get(id=product_id)
+    old_name = getattr(product, field_name).name
+    setattr(product, field_name, name)
+    product.save(update_fields=[field_name, "updated_at"])
+    if field_name == "description":
+        delete_file_content(names=[old_name, name])
+    bump_catalog_version()
+    schedule_product_document_rebuild(product_ids=[product.id])
+    if field_name == "main_image":
+        schedule_product_image_variants(product_id=product.id)
     return product
 
 
 def create_product_note(*, product: Product, title: str) -> ProductNote:
-    return ProductNote.objects.create(
+    product_note = ProductNote.objects.create(
         product=product,
         title=title
     )
+    schedule_product_document_rebuild(product_ids=[product.id])
+    return product_note
 
 
 def update_product_note(*, product_note_id: int, title: str, product: Product) -> ProductNote:
     product_note = ProductNote.objects.get(id=product_note_id)
+    old_product_id = product_note.product_id
     product_note.product = product
     product_note.title = title
     product_note.save()
+    schedule_product_document_rebuild(product_ids=[old_product_id, product.id])
     return product_note
 
 
 def delete_product_note(*, product_note_id: int) -> None:
-    ProductNote.objects.get(id=product_note_id).delete()
+    product_note = ProductNote.objects.get(id=product_note_id)
+    product_note.delete()
+    schedule_product_document_rebuild(product_ids=[product_note.product_id])
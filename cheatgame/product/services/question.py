@@ -1,3 +1,4 @@
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Question, Product
 from cheatgame.users.models import BaseUser
 
@@ -15,8 +16,11 @@ def update_question(*, question_id: int, sender: BaseUser, question: str) -> Que
     question_object.question = question
     question_object.sender = sender
     question_object.save()
+    schedule_product_document_rebuild(product_ids=[question_object.product_id])
     return question_object
 
 
 def delete_question(*, question_id: int) -> None:
-    Question.objects.get(id=question_id).delete()
+    question = Question.objects.get(id=question_id)
+    question.delete()
+    schedule_product_document_rebuild(product_ids=[question.product_id])
@@ -1,18 +1,104 @@
-import decimal
-from decimal import Decimal
+from collections import Counter
+from typing import Optional
 
-from cheatgame.product.models import Product, Reviews
+from django.db import transaction
+from django.db.models import F, Q, Case, When, Value, Count, DecimalField
+from django.db.models.functions import Cast, Greatest
+
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import schedule_product_document_rebuild
+from cheatgame.product.models import Product, Reviews, RATING_COUNT_FIELDS
 from cheatgame.users.models import BaseUser
-from django.db.models import Avg , F
 
-def create_review(*, user: BaseUser, product: Product, rating: int, comment: str) -> Reviews:
-    review = Reviews.objects.create(user=user, product=product, rating=rating, comment=comment)
-    calculate_product_ranting(product= product)
+
+def _rating_avg_expression():
+    rating_total = sum(F(field) * rating for rating, field in RATING_COUNT_FIELDS.items())
+    return Case(
+        When(rating_count=0, then=Value(0)),
+        default=Cast(rating_total, DecimalField(max_digits=15, decimal_places=2)) / F("rating_count"),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def _refresh_rating_avg(*, products) -> None:
+    rating_avg = _rating_avg_expression()
+    products.update(
+        rating_avg=rating_avg,
+        score=Case(When(rating_count=0, then=F("score")), default=rating_avg),
+    )
+
+
+def apply_review_rating_change(*, previous: Optional[Reviews], current: Optional[Reviews]) -> None:
+    """
+    Moves the accepted rating of `previous` out of, and the accepted rating of
+    `current` into, the denormalized rating counters of their products.
+    """
+    deltas = Counter()
+    if previous is not None and previous.accepted:
+        deltas[(previous.product_id, previous.rating)] -= 1
+    if current is not None and current.accepted:
+        deltas[(current.product_id, current.rating)] += 1
+
+    product_ids = set()
+    for (product_id, rating), delta in deltas.items():
+        if not delta:
+            continue
+        # Counters that missed a review (e.g. written before they existed)
+        # stay at 0 instead of breaking the unsigned column check.
+        Product.objects.filter(id=product_id).update(**{
+            "rating_count": Greatest(F("rating_count") + delta, 0),
+            RATING_COUNT_FIELDS[rating]: Greatest(F(RATING_COUNT_FIELDS[rating]) + delta, 0),
+        })
+        product_ids.add(product_id)
+
+    if product_ids:
+        _refresh_rating_avg(products=Product.objects.filter(id__in=product_ids))
+        bump_catalog_version()
+    schedule_product_document_rebuild(
+        product_ids=[review.product_id for review in (previous, current) if review is not None])
+
+
+@transaction.atomic
+def create_review(*, user: BaseUser, product: Product, rating: int, comment: str, accepted: bool = False) -> Reviews:
+    review = Reviews.objects.create(user=user, product=product, rating=rating, comment=comment, accepted=accepted)
+    apply_review_rating_change(previous=None, current=review)
     return review
 
-def calculate_product_ranting(* ,product: Product) -> None:
-    review= Reviews.objects.filter(product=product).aggregate(average_ranting = Avg('rating'))
-    rating_avg = review.get("average_ranting")
-    product.score = Decimal(rating_avg)
-    product.save(update_fields=["score" , "updated_at"])
 
+@transaction.atomic
+def update_review(*, review_id: int, rating: int, comment: str, accepted: bool) -> Reviews:
+    review = Reviews.objects.select_for_update().get(id=review_id)
+    previous = Reviews(product_id=review.product_id, rating=review.rating, accepted=review.accepted)
+    review.rating = rating
+    review.comment = comment
+    review.accepted = accepted
+    review.save(update_fields=["rating", "comment", "accepted", "updated_at"])
+    apply_review_rating_change(previous=previous, current=review)
+    return review
+
+
+@transaction.atomic
+def delete_review(*, review_id: int) -> None:
+    review = Reviews.objects.select_for_update().get(id=review_id)
+    review.delete()
+    apply_review_rating_change(previous=review, current=None)
+
+
+@transaction.atomic
+def rebuild_product_ratings(*, batch_size: int = 500) -> int:
+    counts = {
+        row.pop("product_id"): row
+        for row in Reviews.objects.filter(accepted=True).values("product_id").annotate(
+            rating_count=Count("id"),
+            **{field: Count("id", filter=Q(rating=rating)) for rating, field in RATING_COUNT_FIELDS.items()},
+        )
+    }
+    products = list(Product.objects.only("id"))
+    empty = {"rating_count": 0, **{field: 0 for field in RATING_COUNT_FIELDS.values()}}
+    for product in products:
+        for field, value in counts.get(product.id, empty).items():
+            setattr(product, field, value)
+    Product.objects.bulk_update(products, fields=list(empty), batch_size=batch_size)
+    _refresh_rating_avg(products=Product.objects.all())
+    bump_catalog_version()
+    return len(products)
@@ -1,19 +1,25 @@
+from cheatgame.product.documents import schedule_product_document_rebuild
 from cheatgame.product.models import Product, SuggestionProduct
 
 
 def create_suggestion_product(*, product: Product, suggested: Product) -> SuggestionProduct:
-    return SuggestionProduct.objects.create(
+    suggestion = SuggestionProduct.objects.create(
         product=product,
         suggested=suggested
     )
+    schedule_product_document_rebuild(product_ids=[product.id])
+    return suggestion
 
 
 def update_suggestion_product(*, suggestion_id: int, suggested: Product) -> SuggestionProduct:
     suggestion  = SuggestionProduct.objects.get(id = suggestion_id)
     suggestion.suggested = suggested
     suggestion.save()
+    schedule_product_document_rebuild(product_ids=[suggestion.product_id])
     return suggestion
 
 def delete_suggestion_product(* , suggestion_id:int) -> None:
-    SuggestionProduct.objects.get(id = suggestion_id).delete()
+    suggestion = SuggestionProduct.objects.get(id = suggestion_id)
+    suggestion.delete()
+    schedule_product_document_rebuild(product_ids=[suggestion.product_id])
 
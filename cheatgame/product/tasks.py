@@ -0,0 +1,32 @@
+from celery import shared_task
+
+from cheatgame.common.images import refresh_image_variants
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import build_product_document, get_document_dependent_product_ids, \
+    schedule_product_document_rebuild
+from cheatgame.product.models import Product, Image
+
+PRODUCT_IMAGE_FIELDS = ("main_image",)
+GALLERY_IMAGE_FIELDS = ("file",)
+
+
+@shared_task
+def rebuild_product_documents(product_ids: list[int]) -> None:
+    product_ids = get_document_dependent_product_ids(product_ids=product_ids)
+    for slug in Product.objects.filter(id__in=product_ids).values_list("slug", flat=True):
+        build_product_document(slug=slug)
+
+
+@shared_task
+def generate_product_image_variants(product_id: int) -> None:
+    product = Product.objects.filter(id=product_id).first()
+    if product is not None and refresh_image_variants(instance=product, field_names=PRODUCT_IMAGE_FIELDS):
+        bump_catalog_version()
+        schedule_product_document_rebuild(product_ids=[product.id])
+
+
+@shared_task
+def generate_gallery_image_variants(image_id: int) -> None:
+    image = Image.objects.filter(id=image_id).first()
+    if image is not None and refresh_image_variants(instance=image, field_names=GALLERY_IMAGE_FIELDS):
+        schedule_product_document_rebuild(product_ids=[image.product_id])
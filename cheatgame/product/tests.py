@@ -0,0 +1,275 @@
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import parse_qs, urlparse
+
+from django.apps import apps
+from django.contrib.admin.sites import site
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APIClient
+
+from cheatgame.api.pagination import KeysetPagination
+
+from cheatgame.product.documents import ProductDocumentSerializer, build_product_document, get_product_document
+from cheatgame.product.models import Product, Category, Feature, ValuesList, Reviews, Question, Label, \
+    ProductLabel, SuggestionProduct, Image, Attachment, ProductNote, AttachmentType, ProductCategory, ProductType, \
+    LabelType
+from cheatgame.product.selectors.product import product_detail, product_facets
+from cheatgame.product.services.reviews import delete_review
+from cheatgame.users.models import BaseUser
+
+
+class ProductDetailQueryCountTest(TestCase):
+    # One query for the product and one per prefetched relation.
+    expected_queries = 10
+
+    def create_product(self, *, title: str) -> Product:
+        return Product.objects.create(
+            title=title,
+            main_image="product/main_images/test.jpg",
+            price=1000,
+            off_price=900,
+            description="product/description.html",
+        )
+
+    def serialize_product_detail(self, *, slug: str) -> dict:
+        product = product_detail(slug=slug)
+        return ProductDocumentSerializer(instance=product).data
+
+    def test_product_detail_query_count_does_not_grow_with_relations(self):
+        small_product = self.create_product(title="small product")
+        product = self.create_product(title="large product")
+        suggested = self.create_product(title="suggested product")
+        product.included_products.add(suggested)
+        category = Category.objects.create(name="features", slug="features")
+
+        users = BaseUser.objects.bulk_create(
+            BaseUser(phone_number=f"0912{index:07d}", firstname="first", lastname=f"last{index}")
+            for index in range(100)
+        )
+        Reviews.objects.bulk_create(
+            Reviews(user=user, product=product, rating=5, comment="good", accepted=True) for user in users
+        )
+        Question.objects.bulk_create(
+            Question(product=product, sender=user, question="?", answer="!", accepted=True) for user in users[:20]
+        )
+        features = Feature.objects.bulk_create(
+            Feature(name=f"feature {index}", category=category) for index in range(50)
+        )
+        ValuesList.objects.bulk_create(
+            ValuesList(product=product, feature=feature, value="value") for feature in features
+        )
+        labels = Label.objects.bulk_create(Label(name=f"label {index}") for index in range(10))
+        ProductLabel.objects.bulk_create(ProductLabel(product=product, label=label) for label in labels)
+        SuggestionProduct.objects.create(product=product, suggested=suggested)
+        Image.objects.create(product=product, file="product_images/test.jpg")
+        Attachment.objects.create(product=product, title="guarantee", price=10, attachment_type=AttachmentType.GUARANTEE)
+        ProductNote.objects.create(product=product, title="note")
+
+        with self.assertNumQueries(self.expected_queries):
+            self.serialize_product_detail(slug=small_product.slug)
+
+        with self.assertNumQueries(self.expected_queries):
+            data = self.serialize_product_detail(slug=product.slug)
+
+        self.assertEqual(len(data["reviews"]), 100)
+        self.assertEqual(len(data["valueslist"]), 50)
+        self.assertEqual(data["comments_count"], 20)
+
+    def test_cached_product_detail_is_served_without_queries(self):
+        cache.clear()
+        product = self.create_product(title="cached product")
+        url = reverse("api:product-detail", kwargs={"slug": product.slug})
+        client = APIClient()
+        etag = client.get(url, {"include_content": True})["ETag"]
+
+        # Requests run in a transaction, so only its savepoints may show up.
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, {"include_content": True})
+            not_modified = client.get(url, {"include_content": True}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual([query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]], [])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_admin_bulk_delete_drops_cached_documents(self):
+        products = [self.create_product(title="first product"), self.create_product(title="second product")]
+        for product in products:
+            build_product_document(slug=product.slug)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            queryset = Product.objects.filter(id__in=[product.id for product in products])
+            site._registry[Product].delete_queryset(None, queryset)
+
+        self.assertEqual([get_product_document(slug=product.slug) for product in products], [None, None])
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        # Few distinct sales counts, so page boundaries fall inside ties.
+        Product.objects.bulk_create(
+            Product(title=f"product {index}", slug=f"product-{index}", main_image="product/main_images/test.jpg",
+                    price=1000, off_price=900, description="product/description.html", sales_count=index % 3)
+            for index in range(25)
+        )
+
+    def paginate(self, queryset, **params):
+        request = Request(APIRequestFactory().get("/products/", params))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        return page, paginator.get_paginated_response([product.id for product in page]).data
+
+    def cursor(self, link):
+        return parse_qs(urlparse(link).query)["cursor"][0]
+
+    def walk(self, queryset):
+        seen, params = [], {"limit": 4, "cursor": ""}
+        while True:
+            page, data = self.paginate(queryset, **params)
+            seen.extend(product.id for product in page)
+            if data["next"] is None:
+                return seen
+            params["cursor"] = self.cursor(data["next"])
+
+    def test_walks_every_row_once_across_ties(self):
+        queryset = Product.objects.order_by("-sales_count")
+        expected = list(queryset.order_by("-sales_count", "-id").values_list("id", flat=True))
+
+        seen, params = [], {"limit": 4, "cursor": ""}
+        while True:
+            page, data = self.paginate(queryset, **params)
+            seen.extend(product.id for product in page)
+            if data["next"] is None:
+                break
+            params["cursor"] = self.cursor(data["next"])
+
+        self.assertEqual(seen, expected)
+        self.assertNotIn("offset", data)
+
+        page, data = self.paginate(queryset, limit=4, cursor=self.cursor(data["previous"]))
+        self.assertEqual([product.id for product in page], expected[20:24])
+
+    def test_falls_back_to_offset_for_annotated_ordering(self):
+        query = SearchQuery("product")
+        queryset = Product.objects.annotate(rank=SearchRank(F("search_vector"), query)).order_by("-rank")
+
+        page, data = self.paginate(queryset, limit=5, cursor="")
+
+        self.assertEqual(len(page), 5)
+        self.assertEqual(data["offset"], 0)
+        self.assertEqual(data["count"], 25)
+
+    def test_falls_back_to_offset_for_expression_ordering(self):
+        queryset = Product.objects.order_by(F("sales_count").desc(), "-id")
+
+        page, data = self.paginate(queryset, limit=5, offset=5, cursor="")
+
+        expected = list(Product.objects.order_by("-sales_count", "-id").values_list("id", flat=True))
+        self.assertEqual([product.id for product in page], expected[5:10])
+        self.assertEqual(data["offset"], 5)
+
+    def test_walks_created_at_within_the_same_millisecond(self):
+        # Microseconds differ only below the millisecond, so a truncated
+        # cursor would skip or repeat the rows next to each page boundary.
+        created_at = timezone.now().replace(microsecond=123000)
+        for index, product in enumerate(Product.objects.order_by("id")):
+            Product.objects.filter(id=product.id).update(
+                created_at=created_at + timedelta(microseconds=index % 5 * 100))
+        queryset = Product.objects.order_by("-created_at")
+        expected = list(queryset.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        self.assertEqual(self.walk(queryset), expected)
+        self.assertEqual(self.walk(Product.objects.order_by("created_at")), expected[::-1])
+
+
+class ProductRatingTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(title="rated product", main_image="product/main_images/test.jpg",
+                                              price=1000, off_price=900, description="product/description.html")
+        self.users = BaseUser.objects.bulk_create(
+            BaseUser(phone_number=f"0913{index:07d}", firstname="first", lastname=f"last{index}")
+            for index in range(3)
+        )
+
+    def create_reviews(self, *ratings: int) -> list[Reviews]:
+        # Written directly, as reviews accepted before the counters existed.
+        return Reviews.objects.bulk_create(
+            Reviews(user=user, product=self.product, rating=rating, comment="ok", accepted=True)
+            for user, rating in zip(self.users, ratings)
+        )
+
+    def test_migration_backfills_rating_aggregates(self):
+        self.create_reviews(5, 4, 4)
+        migration = import_module("cheatgame.product.migrations.0019_product_rating_aggregates")
+
+        migration.populate_rating_aggregates(apps, None)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 3)
+        self.assertEqual((self.product.rating_4_count, self.product.rating_5_count), (2, 1))
+        self.assertEqual(self.product.rating_avg, Decimal("4.33"))
+
+    def test_deleting_a_review_missing_from_the_counters_keeps_them_at_zero(self):
+        review, = self.create_reviews(5)
+
+        delete_review(review_id=review.id)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertEqual(self.product.rating_5_count, 0)
+
+
+class ProductFacetsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.brand = Label.objects.create(name="brand", label_type=LabelType.BRAND)
+        self.console = Label.objects.create(name="console", label_type=LabelType.CONSOLE)
+        self.consoles = Category.objects.create(name="consoles", slug="consoles")
+        self.accessories = Category.objects.create(name="accessories", slug="accessories")
+
+        cheap = self.create_product(title="cheap", off_price=500_000, product_type=ProductType.PHYSCIAL)
+        console = self.create_product(title="console", off_price=3_000_000, product_type=ProductType.PHYSCIAL)
+        game = self.create_product(title="game", off_price=3_000_000, product_type=ProductType.GAME)
+        ProductLabel.objects.bulk_create([
+            ProductLabel(product=cheap, label=self.brand),
+            ProductLabel(product=console, label=self.brand),
+            ProductLabel(product=console, label=self.console),
+            ProductLabel(product=game, label=self.console),
+        ])
+        ProductCategory.objects.bulk_create([
+            ProductCategory(product=cheap, category=self.accessories),
+            ProductCategory(product=console, category=self.consoles),
+            ProductCategory(product=console, category=self.accessories),
+            ProductCategory(product=game, category=self.consoles),
+        ])
+
+    def create_product(self, *, title: str, off_price: int, product_type: ProductType) -> Product:
+        return Product.objects.create(title=title, main_image="product/main_images/test.jpg", price=off_price,
+                                      off_price=off_price, description="product/description.html",
+                                      product_type=product_type)
+
+    def test_counts_only_filtered_products(self):
+        facets = product_facets(filters={"product_type": str(ProductType.PHYSCIAL.value)})
+
+        self.assertEqual(facets["labels"], [
+            {"id": self.brand.id, "name": "brand", "label_type": LabelType.BRAND, "count": 2},
+            {"id": self.console.id, "name": "console", "label_type": LabelType.CONSOLE, "count": 1},
+        ])
+        self.assertEqual(facets["categories"], [
+            {"id": self.accessories.id, "name": "accessories", "category_type": self.accessories.category_type,
+             "count": 2},
+            {"id": self.consoles.id, "name": "consoles", "category_type": self.consoles.category_type, "count": 1},
+        ])
+        self.assertEqual(facets["prices"], [
+            {"min": 0, "max": 1_000_000, "count": 1},
+            {"min": 1_000_000, "max": 5_000_000, "count": 1},
+        ])
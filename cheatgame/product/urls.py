@@ -3,14 +3,15 @@ from django.urls.converters import SlugConverter
 
 from cheatgame.product.apis.attachment import AttachmentAdminApi, AttachmentDetailApi, AttachmentListProductApi
 from cheatgame.product.apis.category import CategoryAdminApi, ProductCategoryAdminApi, CategoryListApi, \
-    CategoryDetailApi, ProductCategoryDetailApi, CategoryListAdminApi
+    CategoryDetailApi, ProductCategoryDetailApi, CategoryListAdminApi, CategoryTreeApi
 from cheatgame.product.apis.feature import FeatureAdminApi, ProductFeatureAdminApi, FeatureDetailAdminApi, \
     ProductFeatureDetailApi, FeatureListAdminApi
 from cheatgame.product.apis.image import ImageAdminApi, ImageDetailAdminApi
 from cheatgame.product.apis.label import LabelAdminApi, ProductLabelAdminApi, LabelDetailAdminApi, \
     ProductLabelDetailAdminApi, LabelListApi, CosoleLabelListApi, CapacityLabelListApi, LabelListAdminApi
 from cheatgame.product.apis.product import ProductAdminApi, ProudctApi, ProductNoteAdminApi, \
-    ProductNoteDetailApi, ProductDetailApi, ProductDetailAdminApi
+    ProductNoteDetailApi, ProductDetailApi, ProductDetailAdminApi, ProductAutocompleteApi, \
+    ProductFacetsApi
 from cheatgame.product.apis.question import QuestionApi, QuestionDetailAdminApi, QuestionListAPIView
 from cheatgame.product.apis.rating import ReviewListAPIView
 from cheatgame.product.apis.reviews import ReviewsCreateAPIView
@@ -29,6 +30,8 @@ urlpatterns = [
     path("product-deatil/<int:id>/" , ProductDetailAdminApi.as_view() , name="product-detail-admin-api"),
     path("product-detail/<custom_slug:slug>/", ProductDetailApi.as_view(), name="product-detail"),
     path("get-product/", ProudctApi.as_view(), name="product-customer"),
+    path("autocomplete/", ProductAutocompleteApi.as_view(), name="product-autocomplete"),
+    path("facets/", ProductFacetsApi.as_view(), name="product-facets"),
     path("image/", ImageAdminApi.as_view(), name="image-admin"),
     path("image-detail/<int:id>/", ImageDetailAdminApi.as_view(), name="image-detail-admin"),
     path("question/", QuestionApi.as_view(), name="question-admin"),
@@ -36,6 +39,7 @@ urlpatterns = [
     path("category/<int:id>/", CategoryDetailApi.as_view(), name="category-detail-admin"),
     path("category/", CategoryAdminApi.as_view(), name="category-create-admin"),
     path("category-list/<int:category_type>/", CategoryListApi.as_view(), name="category-list"),
+    path("category-tree/<int:category_type>/", CategoryTreeApi.as_view(), name="category-tree"),
     path("category-list-admin/" , CategoryListAdminApi.as_view() , name="category-list-admin"),
     path("product-category/", ProductCategoryAdminApi.as_view(), name="product-category-create-admin"),
     path("product-category/<int:id>/", ProductCategoryDetailApi.as_view(), name="product-category-admin"),
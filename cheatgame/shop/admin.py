@@ -2,6 +2,9 @@ from django.contrib import admin
 
 from cheatgame.shop.models import Order, OrderItem, OrderItemAttachment, Cart, CartItem, CartItemAttachment, Discount, \
     UserDiscount, DeliverySchedule, DeliveryType, DeliveryData
+from cheatgame.shop.services.delivery_schedule import invalidate_delivery_calendar
+from cheatgame.shop.services.discount import invalidate_discount_cache, invalidate_user_discount_cache
+from cheatgame.shop.services.order import apply_order_payment_status_change
 
 
 @admin.register(Order)
@@ -11,6 +14,12 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id","user", "discount", "payment_status", "user_status", "total_price",
                     "total_price_discount", "schedule",)
 
+    def save_model(self, request, obj, form, change):
+        previous_status = form.initial.get("payment_status") if change else None
+        super().save_model(request, obj, form, change)
+        apply_order_payment_status_change(order_id=obj.id, previous_status=previous_status,
+                                          payment_status=obj.payment_status)
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -52,18 +61,66 @@ class DiscountAdmin(admin.ModelAdmin):
         "percent", "admin_user", "usage_number"
     )
 
+    def save_model(self, request, obj, form, change):
+        previous_code = form.initial.get("code") if change else None
+        super().save_model(request, obj, form, change)
+        invalidate_discount_cache(codes=[previous_code, obj.code])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_discount_cache(codes=[obj.code])
+
+    def delete_queryset(self, request, queryset):
+        codes = list(queryset.values_list("code", flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_discount_cache(codes=codes)
+
 
 @admin.register(UserDiscount)
 class UserDiscountAdmin(admin.ModelAdmin):
     fields = ("discount", "user", "is_used")
     list_display = ("discount", "user", "is_used")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            invalidate_user_discount_cache(discount_id=form.initial.get("discount"),
+                                           user_ids=[form.initial.get("user")])
+        invalidate_user_discount_cache(discount_id=obj.discount_id, user_ids=[obj.user_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_discount_cache(discount_id=obj.discount_id, user_ids=[obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        assignments = list(queryset.values_list("discount_id", "user_id"))
+        super().delete_queryset(request, queryset)
+        for discount_id, user_id in assignments:
+            invalidate_user_discount_cache(discount_id=discount_id, user_ids=[user_id])
+
 
 @admin.register(DeliverySchedule)
 class DeliveryScheduleAdmin(admin.ModelAdmin):
     fields = ("start", "end", "type", "capacity")
     list_display = ("start", "end", "type", "capacity")
 
+    def save_model(self, request, obj, form, change):
+        schedules = [obj]
+        if change:
+            schedules.append(DeliverySchedule(id=obj.id, type=form.initial.get("type"), start=form.initial.get("start")))
+        super().save_model(request, obj, form, change)
+        invalidate_delivery_calendar(schedules=schedules)
+
+    def delete_model(self, request, obj):
+        schedule = DeliverySchedule(id=obj.id, type=obj.type, start=obj.start)
+        super().delete_model(request, obj)
+        invalidate_delivery_calendar(schedules=[schedule])
+
+    def delete_queryset(self, request, queryset):
+        schedules = list(queryset.only("id", "type", "start"))
+        super().delete_queryset(request, queryset)
+        invalidate_delivery_calendar(schedules=schedules)
+
 
 @admin.register(DeliveryType)
 class DeliveryTypeAdmin(admin.ModelAdmin):
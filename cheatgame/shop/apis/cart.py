@@ -4,15 +4,17 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from cheatgame.api.mixins import ApiAuthMixin
-from cheatgame.api.utils import inline_serializer
-from cheatgame.common.utils import reformat_url
+from cheatgame.api.utils import inline_serializer, MediaUrlField
+from cheatgame.common.utils import media_url
+from cheatgame.core.exceptions import ApplicationError
 from cheatgame.product.apis.product import ProductDetailProductSerializer
 from cheatgame.product.models import Attachment, Product, ProductType
-from cheatgame.product.permissions import CustomerPermission, CartItemIsOwnerCustomer
 from cheatgame.product.selectors.product import suggestions_product
-from cheatgame.shop.models import CartItem, Order, Discount, DeliveryData, OrderItem, CartItemAttachment
-from cheatgame.shop.selectors.cart import cart_item_list_user, cart_item_attachment_list, order_list_user, \
-    check_order_exists, get_order, sell_report, bought_order_item
+from cheatgame.product.permissions import CustomerPermission, CartItemIsOwnerCustomer, AdminOrManagerPermission
+from cheatgame.shop.models import CartItem, Order, Discount, DeliveryData, OrderItem
+from cheatgame.shop.selectors.cart import order_list_user, \
+    check_order_exists, get_order, sell_report, bought_order_item, cart_item_list_priced, \
+    SELL_REPORT_PERIODS, sales_series
 from cheatgame.shop.selectors.discount import check_discount_code, check_coupon_code
 from cheatgame.shop.services.cart import check_product_limit, check_product_avaliablity, check_attachment, \
     check_cart_item_exists, add_to_cart, update_cart_item, delete_cart_item, check_attachment_order
@@ -35,12 +37,17 @@ class ProductDetailCartSerializer(serializers.ModelSerializer):
 
 
     def get_main_image(self, obj):
-        return reformat_url(url=obj.main_image.url)
+        return media_url(file=obj.main_image)
 
 
 
     def get_suggestion(self, product: Product) -> dict:
-        suggestions = suggestions_product(product=product)
+        # `product.suggestions` is prefetched by `cart_item_list_priced` for cart listings;
+        # single cart items load them in one query instead of one per suggestion.
+        if "suggestions" in getattr(product, "_prefetched_objects_cache", {}):
+            suggestions = [suggestion.suggested for suggestion in product.suggestions.all()]
+        else:
+            suggestions = suggestions_product(product=product)
         return ProductDetailProductSerializer(suggestions, many=True).data
 
     class Meta:
@@ -138,9 +145,7 @@ class CartItemListApi(ApiAuthMixin, APIView):
         attachment = serializers.SerializerMethodField()
 
         def get_attachment(self, obj):
-            attchment_list = CartItemAttachment.objects.filter(cart_item_id=obj.id).values_list("attachment", flat=True)
-            items = Attachment.objects.filter(id__in= attchment_list)
-            return CartItemAttachmentInPutSerializer(items, many=True).data
+            return CartItemAttachmentInPutSerializer(obj.attachments, many=True).data
 
         class Meta:
             model = CartItem
@@ -149,7 +154,7 @@ class CartItemListApi(ApiAuthMixin, APIView):
     @extend_schema(responses=CartItemListOutPutSerializer)
     def get(self, request):
         try:
-            cart_items = cart_item_list_user(user=request.user)
+            cart_items = cart_item_list_priced(user=request.user)
             return Response(self.CartItemListOutPutSerializer(cart_items, many=True).data, status=status.HTTP_200_OK)
         except Exception as error:
             return Response({"error": "مشکل در دریافت اطلاعات سبد پیش آمد"}, status=status.HTTP_400_BAD_REQUEST)
@@ -165,18 +170,11 @@ class SubmitOrderApi(ApiAuthMixin, APIView):
 
     @extend_schema(request=None, responses=OrderOutPutSerializer)
     def post(self, request):
-        product = []
-        game = []
-        cart_item_list = cart_item_list_user(user=request.user)
-        type(cart_item_list)
+        cart_item_list = cart_item_list_priced(user=request.user)
         if len(cart_item_list) <= 0:
             return Response({"error": "کاربر سبد محصولات شما خالی است."}, status=status.HTTP_400_BAD_REQUEST)
         for cart_item in cart_item_list:
-            if cart_item.product.product_type == ProductType.GAME or cart_item.product.product_type == ProductType.PACKAGE:
-                game.append(cart_item)
-            else:
-                product.append(cart_item)
-            attachments = cart_item_attachment_list(cart_item=cart_item)
+            attachments = cart_item.attachments
             if not check_product_limit(product=cart_item.product,
                                        quantity=cart_item.quantity):
                 return Response({"error": "تعداد بیش از حد مجاز می باشد."}, status=status.HTTP_400_BAD_REQUEST)
@@ -185,12 +183,10 @@ class SubmitOrderApi(ApiAuthMixin, APIView):
                 return Response({"error": "این تعداد محصول موجود نمی باشد"}, status=status.HTTP_400_BAD_REQUEST)
             if not check_attachment_order(attachments=attachments):
                 return Response({"error": "بیمه یا گارانتی یا ظرفیت تکراری است "}, status=status.HTTP_400_BAD_REQUEST)
-        orders = submit_order(user=request.user,
-                              total_price=0,
-                              product=product,
-                              game=game,
-                              cart_items=cart_item_list
-                              )
+        try:
+            orders = submit_order(user=request.user, cart_items=cart_item_list)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.OrderOutPutSerializer(orders, many=True).data, status=status.HTTP_200_OK)
 
 
@@ -227,16 +223,9 @@ class OrderListCustomerAPIView(ApiAuthMixin, APIView):
         class ProductImageOutPutSerializer(serializers.Serializer):
             product = inline_serializer(fields={
                 "id": serializers.IntegerField(),
-                "main_image": serializers.FileField()
+                "main_image": MediaUrlField()
             })
 
-            def to_representation(self, instance):
-                representation = super().to_representation(instance)
-                products_data = representation["product"]
-                products_data["main_image"] = reformat_url(url=products_data["main_image"])
-                representation["product"] = products_data
-                return representation
-
 
             
             
@@ -298,8 +287,10 @@ class OrderDetailUserApi(ApiAuthMixin, APIView):
             coupon_code_result = check_coupon_code(total_price=order.total_price, code=discount.code)
             if dicount_code_result == False and coupon_code_result == False:
                 return Response({"error": "کد تخفیف  معتبر نیست."}, status=status.HTTP_400_BAD_REQUEST)
-        order = update_order(order_id=id,
-                             schedule=delivery_data, discount=discount)
+        try:
+            order = update_order(order_id=id, schedule=delivery_data, discount=discount)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.OrderDetailOutPutSerializer(order).data, status=status.HTTP_200_OK)
         # except Exception as e:
         #     return Response({"error": "مشکلی پیش آمده است."}, status=status.HTTP_400_BAD_REQUEST)
@@ -315,16 +306,9 @@ class GameListCustomerAPIView(ApiAuthMixin, APIView):
         class ProductImageOutPutSerializer(serializers.Serializer):
             product = inline_serializer(fields={
                 "id": serializers.IntegerField(),
-                "main_image": serializers.FileField()
+                "main_image": MediaUrlField()
             })
 
-            def to_representation(self, instance):
-                representation = super().to_representation(instance)
-                products_data = representation["product"]
-                products_data["main_image"] = reformat_url(url=products_data["main_image"])
-                representation["product"] = products_data
-                return representation
-
         def get_product_images(self, order: Order):
             order_items = OrderItem.objects.filter(order=order).prefetch_related('product')
             return self.ProductImageOutPutSerializer(order_items, many=True).data
@@ -354,7 +338,7 @@ class OrderDetailCustomerAPIView(ApiAuthMixin, APIView):
         class OrderProductDetailOutPutSerializer(serializers.Serializer):
             product = inline_serializer(fields={
                 "id": serializers.IntegerField(),
-                "main_image": serializers.FileField(),
+                "main_image": MediaUrlField(),
                 "product_type": serializers.IntegerField(),
                 "title": serializers.CharField(),
                 "slug": serializers.CharField(),
@@ -367,8 +351,6 @@ class OrderDetailCustomerAPIView(ApiAuthMixin, APIView):
         def to_representation(self, instance):
             representation = super().to_representation(instance)
             product_data = representation["product_data"]
-            for product in product_data:
-                product['product']["main_image"] = reformat_url(url = product['product']["main_image"])
             representation["product"] = product_data
             return representation
 
@@ -402,16 +384,52 @@ class SellReport(APIView):
 
     class OrderReportFitler(serializers.Serializer):
         updated_at__range = serializers.CharField(max_length=200 , required=False)
+        group_by = serializers.ChoiceField(choices=tuple(SELL_REPORT_PERIODS), required=False)
 
     @extend_schema(parameters=[OrderReportFitler] , responses={200 : dict })
     def get(self , request):
         filter_serializer = self.OrderReportFitler(data = request.query_params)
         filter_serializer.is_valid(raise_exception=True)
-        # try:
-        report = sell_report(filters=filter_serializer.validated_data.get("updated_at__range"))
+        try:
+            report = sell_report(filters=filter_serializer.validated_data.get("updated_at__range"),
+                                 group_by=filter_serializer.validated_data.get("group_by"))
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         return Response(report, status=status.HTTP_200_OK)
-        # except Exception as e:
-        #     return Response({"error": "مشکلی پیش آمده است."}, status=status.HTTP_400_BAD_REQUEST)
+
+class SalesSeriesApi(ApiAuthMixin, APIView):
+    permission_classes = (AdminOrManagerPermission,)
+
+    class SalesSeriesFilterSerializer(serializers.Serializer):
+        from_date = serializers.DateField()
+        to_date = serializers.DateField()
+        group_by = serializers.ChoiceField(choices=tuple(SELL_REPORT_PERIODS), default="day")
+        product_type = serializers.ChoiceField(choices=ProductType.choices(), required=False)
+        is_game = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+        def validate(self, data):
+            if data["from_date"] > data["to_date"]:
+                raise serializers.ValidationError("تاریخ شروع باید قبل از تاریخ پایان باشد.")
+            return data
+
+    class SalesSeriesOutPutSerializer(serializers.Serializer):
+        period = serializers.DateField()
+        product_type = serializers.IntegerField(allow_null=True)
+        order_count = serializers.IntegerField()
+        item_count = serializers.IntegerField()
+        gross = serializers.DecimalField(max_digits=16, decimal_places=0)
+        revenue = serializers.DecimalField(max_digits=16, decimal_places=0)
+
+    @extend_schema(parameters=[SalesSeriesFilterSerializer], responses=SalesSeriesOutPutSerializer(many=True))
+    def get(self, request):
+        filter_serializer = self.SalesSeriesFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        try:
+            series = sales_series(**filter_serializer.validated_data)
+            return Response(self.SalesSeriesOutPutSerializer(series, many=True).data, status=status.HTTP_200_OK)
+        except Exception:
+            return Response({"error": "مشکلی پیش آمده است."}, status=status.HTTP_400_BAD_REQUEST)
+
 
 class IsBoughtProductAPIView(APIView):
 
@@ -8,9 +8,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from cheatgame.api.mixins import ApiAuthMixin
+from cheatgame.core.exceptions import ApplicationError
 from cheatgame.product.permissions import AdminOrManagerPermission, CustomerPermission
 from cheatgame.shop.models import DeliveryScheduleType, DeliverySchedule, DeliveryType, DeliveryData, DeliverySide
-from cheatgame.shop.selectors.delivery_schedule import get_list_of_delivery_schedule
+from cheatgame.shop.selectors.delivery_schedule import get_delivery_calendar
 from cheatgame.shop.services.delivery_schedule import create_delivery_schedule, update_delivery_schedule, \
     delete_delivery_schedule, create_schedule_data
 from cheatgame.users.models import Address
@@ -135,7 +136,7 @@ class DeliveryScheduleList(APIView):
             from_date = serializer.validated_data.get("from_date")
             to_date = serializer.validated_data.get("to_date")
             type = serializer.validated_data.get("type")
-            schedule_delivery = get_list_of_delivery_schedule(from_date=from_date, to_date=to_date, type=type)
+            schedule_delivery = get_delivery_calendar(from_date=from_date, to_date=to_date, type=type)
             return Response(self.DeliveryScheduleListOutPutSerializer(schedule_delivery, many=True).data,
                             status=status.HTTP_200_OK)
         except Exception as error:
@@ -177,7 +178,10 @@ class DeliveryDataApi(ApiAuthMixin, APIView):
             if schedule.start.date() < (timezone.now() + timedelta(days=4)).date():
                 return Response({"error": "زمان انتخابی برای ارسال باید حداقل سه روز بعد از زمان رزرو باشد."},
                                 status=status.HTTP_400_BAD_REQUEST)
-        delivery_data = create_schedule_data(type=type_schedule, address=address, schedule=schedule)
+        try:
+            delivery_data = create_schedule_data(type=type_schedule, address=address, schedule=schedule)
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.DeliveryDataOutPutSerializer(delivery_data).data, status=status.HTTP_200_OK)
         # except Exception as error:
         #     return Response({"error": "مشکلی در رزرو زمان پیش آمد است"}, status=status.HTTP_400_BAD_REQUEST)
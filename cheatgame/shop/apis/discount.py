@@ -5,13 +5,16 @@ from rest_framework.views import APIView
 
 from cheatgame.api.mixins import ApiAuthMixin
 from cheatgame.api.pagination import get_paginated_response, LimitOffsetPagination, PaginatedSerializer
+from cheatgame.core.exceptions import ApplicationError
 from cheatgame.product.models import DeliveryOption
 from cheatgame.product.permissions import ManagerPermission, CustomerPermission
-from cheatgame.shop.models import DiscountType, DiscountValueType, Discount, DeliverySide, DeliveryType, UserDiscount
+from cheatgame.shop.models import DiscountType, DiscountValueType, Discount, DeliverySide, DeliveryType, UserDiscount, \
+    DiscountCampaign
 from cheatgame.shop.selectors.discount import discount_list_admin, check_discount_code, check_coupon_code, \
     discount_list_user
 from cheatgame.shop.services.delivery_type import create_delivery_type
-from cheatgame.shop.services.discount import create_discount, update_discount, delete_discount
+from cheatgame.shop.services.discount import create_discount, update_discount, delete_discount, create_discounts, \
+    create_discount_campaign
 
 
 class DiscountAdminApi(ApiAuthMixin, APIView):
@@ -57,6 +60,89 @@ class DiscountAdminApi(ApiAuthMixin, APIView):
             return Response({"error": "مشکلی در ساخت کد پیش آمد"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class DiscountBatchAdminApi(ApiAuthMixin, APIView):
+    permission_classes = (ManagerPermission,)
+
+    class DiscountBatchInPutSerializer(DiscountAdminApi.DiscountInPutSerializer):
+        count = serializers.IntegerField(min_value=1, max_value=10000)
+
+    class DiscountBatchOutPutSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Discount
+            fields = ("id", "code")
+
+    @extend_schema(request=DiscountBatchInPutSerializer, responses=DiscountBatchOutPutSerializer(many=True))
+    def post(self, request):
+        serializer = self.DiscountBatchInPutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            discounts = create_discounts(
+                count=serializer.validated_data.get("count"),
+                name=serializer.validated_data.get("name"),
+                type=serializer.validated_data.get("type"),
+                value_type=serializer.validated_data.get("value_type"),
+                valid_from=serializer.validated_data.get("valid_from"),
+                valid_until=serializer.validated_data.get("valid_until"),
+                is_active=serializer.validated_data.get("is_active"),
+                min_purchase_amount=serializer.validated_data.get("min_purchase_amount"),
+                amount=serializer.validated_data.get("amount"),
+                percent=serializer.validated_data.get("percent"),
+                admin_user=request.user,
+                usage_number=serializer.validated_data.get("usage_number")
+            )
+            return Response(self.DiscountBatchOutPutSerializer(discounts, many=True).data,
+                            status=status.HTTP_201_CREATED)
+        except Exception:
+            return Response({"error": "مشکلی در ساخت کد پیش آمد"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserSegmentFilterSerializer(serializers.Serializer):
+    search = serializers.CharField(required=False, max_length=100)
+    created_at__range = serializers.CharField(required=False, max_length=200)
+    birthdate__range = serializers.CharField(required=False, max_length=200)
+    phone_number = serializers.CharField(required=False, max_length=13)
+    email = serializers.CharField(required=False, max_length=100)
+
+
+class DiscountCampaignOutPutSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DiscountCampaign
+        fields = ("id", "discount", "filters", "status", "total_users", "assigned_users", "created_at", "updated_at")
+
+
+class DiscountCampaignAdminApi(ApiAuthMixin, APIView):
+    permission_classes = (ManagerPermission,)
+
+    class DiscountCampaignInPutSerializer(serializers.Serializer):
+        discount = serializers.PrimaryKeyRelatedField(queryset=Discount.objects.all())
+        filters = UserSegmentFilterSerializer(required=False)
+
+    @extend_schema(request=DiscountCampaignInPutSerializer, responses=DiscountCampaignOutPutSerializer)
+    def post(self, request):
+        serializer = self.DiscountCampaignInPutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            campaign = create_discount_campaign(
+                discount=serializer.validated_data.get("discount"),
+                filters=serializer.validated_data.get("filters", {}),
+                admin_user=request.user,
+            )
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(DiscountCampaignOutPutSerializer(campaign).data, status=status.HTTP_202_ACCEPTED)
+
+
+class DiscountCampaignDetailAdminApi(ApiAuthMixin, APIView):
+    permission_classes = (ManagerPermission,)
+
+    @extend_schema(responses=DiscountCampaignOutPutSerializer)
+    def get(self, request, id: int):
+        campaign = DiscountCampaign.objects.filter(id=id).first()
+        if campaign is None:
+            return Response({"error": "کمپین یافت نشد."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(DiscountCampaignOutPutSerializer(campaign).data, status=status.HTTP_200_OK)
+
+
 class DiscountDetailSerializer(ApiAuthMixin, APIView):
     permission_classes = (ManagerPermission,)
 
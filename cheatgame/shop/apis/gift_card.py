@@ -0,0 +1,42 @@
+import csv
+
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from cheatgame.api.mixins import ApiAuthMixin
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.product.models import Product, ProductType
+from cheatgame.product.permissions import AdminOrManagerPermission
+from cheatgame.shop.services.gift_card import import_gift_card_codes, check_gift_card_stock
+
+
+class GiftCardCodeImportApi(ApiAuthMixin, APIView):
+    permission_classes = (AdminOrManagerPermission,)
+    parser_classes = (MultiPartParser, FormParser)
+
+    class GiftCardCodeImportInPutSerializer(serializers.Serializer):
+        product = serializers.PrimaryKeyRelatedField(
+            queryset=Product.objects.filter(product_type=ProductType.GIFTCART))
+        file = serializers.FileField()
+
+    class GiftCardCodeImportOutPutSerializer(serializers.Serializer):
+        created = serializers.IntegerField()
+        remaining = serializers.IntegerField()
+
+    @extend_schema(request=GiftCardCodeImportInPutSerializer, responses=GiftCardCodeImportOutPutSerializer)
+    def post(self, request):
+        serializer = self.GiftCardCodeImportInPutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = serializer.validated_data.get("product")
+        try:
+            created = import_gift_card_codes(product=product, file=serializer.validated_data.get("file"))
+        except ApplicationError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
+        except (UnicodeDecodeError, ValueError, csv.Error):
+            return Response({"error": "فایل کدها معتبر نیست."}, status=status.HTTP_400_BAD_REQUEST)
+        remaining = check_gift_card_stock(product_ids=[product.id])[product.id]
+        return Response(self.GiftCardCodeImportOutPutSerializer({"created": created, "remaining": remaining}).data,
+                        status=status.HTTP_201_CREATED)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cheatgame.shop'
+
+    def ready(self):
+        from cheatgame.shop import receivers  # noqa: F401
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cheatgame.shop.services.sales_rollup import backfill_daily_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollup of every day with orders and start the refresh watermark."
+
+    def handle(self, *args, **options):
+        count = backfill_daily_sales_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the sales rollup of {count} days."))
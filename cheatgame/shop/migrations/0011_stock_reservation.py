@@ -0,0 +1,34 @@
+# Generated by Django 4.0.7 on 2026-10-18 18:56
+
+import cheatgame.shop.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0021_image_variants'),
+        ('shop', '0010_alter_cartitem_price_alter_discount_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.IntegerField(choices=[(1, 'HELD'), (2, 'COMMITTED'), (3, 'RELEASED')], default=cheatgame.shop.models.StockReservationStatus['HELD'])),
+                ('expires_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='shop.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='product.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(condition=models.Q(('status', cheatgame.shop.models.StockReservationStatus['HELD'])), fields=['expires_at'], name='stock_reservation_held_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.7 on 2026-10-18 19:02
+
+import cheatgame.shop.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shop', '0013_discount_redemption'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscountCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('status', models.IntegerField(choices=[(1, 'PENDING'), (2, 'RUNNING'), (3, 'DONE'), (4, 'FAILED')], default=cheatgame.shop.models.DiscountCampaignStatus['PENDING'])),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('assigned_users', models.PositiveIntegerField(default=0)),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('admin_user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+                ('discount', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='shop.discount')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
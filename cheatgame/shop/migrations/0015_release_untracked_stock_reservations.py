@@ -0,0 +1,33 @@
+# Generated by Django 4.0.7 on 2026-10-18 21:10
+
+from django.db import migrations
+from django.db.models import F
+
+PHYSCIAL = 3
+HELD = 1
+COMMITTED = 2
+RELEASED = 3
+
+
+def release_untracked_stock_reservations(apps, schema_editor):
+    # Only physical products have their stock reserved; give back what earlier
+    # checkouts took from the quantity of games, packages and gift cards.
+    Product = apps.get_model("product", "Product")
+    StockReservation = apps.get_model("shop", "StockReservation")
+    reservations = StockReservation.objects.filter(status__in=[HELD, COMMITTED]).exclude(
+        product__product_type=PHYSCIAL)
+    for reservation in reservations:
+        Product.objects.filter(id=reservation.product_id).update(quantity=F("quantity") + reservation.quantity)
+    reservations.update(status=RELEASED)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0022_giftcart_pool'),
+        ('shop', '0014_discount_campaign'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_untracked_stock_reservations, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,7 @@ from django.db import models
 from enum import IntEnum
 
 from cheatgame.common.models import BaseModel
-from cheatgame.product.models import DeliveryOption
+from cheatgame.product.models import DeliveryOption, ProductType
 
 
 class OrderStatus(IntEnum):
@@ -56,6 +56,17 @@ class DiscountValueType(IntEnum):
         return [(key.value, key.name) for key in cls]
 
 
+class DiscountCampaignStatus(IntEnum):
+    PENDING = 1
+    RUNNING = 2
+    DONE = 3
+    FAILED = 4
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
 class DeliverySide(IntEnum):
     RECIEVEFROMUSER = 1
     SENDTOUSER = 2
@@ -65,6 +76,16 @@ class DeliverySide(IntEnum):
         return [(key.value, key.name) for key in cls]
 
 
+class StockReservationStatus(IntEnum):
+    HELD = 1
+    COMMITTED = 2
+    RELEASED = 3
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
 class Cart(BaseModel):
     user = models.OneToOneField("users.BaseUser", on_delete=models.CASCADE)
 
@@ -91,6 +112,11 @@ class Order(BaseModel):
     schedule = models.ForeignKey("DeliveryData", on_delete=models.PROTECT, null=True, blank=True)
     is_game = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="order_updated_at_idx"),
+        ]
+
 
 class OrderItem(BaseModel):
     product = models.ForeignKey("product.Product", on_delete=models.PROTECT)
@@ -104,6 +130,44 @@ class OrderItemAttachment(BaseModel):
     attachment = models.ForeignKey("product.Attachment", on_delete=models.PROTECT)
 
 
+class StockReservation(BaseModel):
+    order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="stock_reservations")
+    product = models.ForeignKey("product.Product", on_delete=models.CASCADE, related_name="stock_reservations")
+    quantity = models.PositiveIntegerField()
+    status = models.IntegerField(choices=StockReservationStatus.choices(), default=StockReservationStatus.HELD)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="stock_reservation_held_idx",
+                         condition=models.Q(status=StockReservationStatus.HELD)),
+        ]
+
+
+class DailySalesRollup(BaseModel):
+    # Rows without a product type hold the totals of the day's orders across
+    # all their product types, so orders mixing types are counted once there.
+    date = models.DateField()
+    product_type = models.IntegerField(choices=ProductType.choices(), null=True, blank=True)
+    is_game = models.BooleanField(default=False)
+    order_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(max_digits=16, decimal_places=0, default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=0, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "product_type", "is_game"], name="daily_sales_rollup_unique"),
+            models.UniqueConstraint(fields=["date", "is_game"], name="daily_sales_rollup_total_unique",
+                                    condition=models.Q(product_type__isnull=True)),
+        ]
+
+
+class RollupWatermark(BaseModel):
+    name = models.CharField(max_length=100, unique=True)
+    watermark = models.DateTimeField()
+
+
 class Discount(BaseModel):
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=100, unique=True)
@@ -128,6 +192,22 @@ class UserDiscount(BaseModel):
         unique_together = ("discount", "user")
 
 
+class DiscountCampaign(BaseModel):
+    discount = models.ForeignKey("Discount", on_delete=models.CASCADE, related_name="campaigns")
+    admin_user = models.ForeignKey("users.BaseUser", on_delete=models.PROTECT)
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.IntegerField(choices=DiscountCampaignStatus.choices(), default=DiscountCampaignStatus.PENDING)
+    total_users = models.PositiveIntegerField(default=0)
+    assigned_users = models.PositiveIntegerField(default=0)
+    last_user_id = models.BigIntegerField(default=0)
+
+
+class DiscountRedemption(BaseModel):
+    discount = models.ForeignKey("Discount", on_delete=models.CASCADE, related_name="redemptions")
+    user = models.ForeignKey("users.BaseUser", on_delete=models.CASCADE)
+    order = models.OneToOneField("Order", on_delete=models.CASCADE, related_name="discount_redemption")
+
+
 class DeliverySchedule(BaseModel):
     type = models.IntegerField(choices=DeliveryScheduleType.choices())
     start = models.DateTimeField()
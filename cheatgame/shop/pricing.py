@@ -0,0 +1,47 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Sequence
+
+from django.utils import timezone
+
+from cheatgame.product.models import Product, Attachment, ProductType
+from cheatgame.shop.models import Discount, DiscountValueType
+
+
+def product_unit_price(*, product: Product, now: datetime = None) -> Decimal:
+    now = now or timezone.now()
+    if not product.discount_end_time or product.discount_end_time < now:
+        return product.price
+    return product.off_price
+
+
+def attachments_price(*, product: Product, attachments: Sequence[Attachment]) -> Decimal:
+    # A game is sold per capacity, so only its (single) capacity attachment is
+    # charged, while every attachment of other products adds to the price.
+    if not attachments:
+        return Decimal("0")
+    if product.product_type == ProductType.GAME:
+        return attachments[-1].price
+    return sum((attachment.price for attachment in attachments), Decimal("0"))
+
+
+def line_price(*, product: Product, quantity: int, attachment_price: Decimal, now: datetime = None) -> Decimal:
+    """
+    Price of `quantity` of `product` with attachments costing `attachment_price`
+    (see `attachments_price`), the one pricing rule of carts and orders.
+    """
+    if product.product_type == ProductType.GAME:
+        return attachment_price * quantity
+    return product_unit_price(product=product, now=now) * quantity + attachment_price
+
+
+def total_price(*, line_prices: Iterable[Decimal]) -> Decimal:
+    return sum(line_prices, Decimal("0"))
+
+
+def discounted_price(*, total_price: Decimal, discount: Discount) -> Decimal:
+    if discount.value_type == DiscountValueType.AMOUNT:
+        return max(total_price - discount.amount, Decimal("0"))
+    if discount.value_type == DiscountValueType.PERCENT:
+        return total_price * (100 - min(discount.percent, 100)) // 100
+    return total_price
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from cheatgame.shop.models import Order
+from cheatgame.shop.services.sales_rollup import schedule_order_day_rebuild
+
+
+@receiver(post_delete, sender=Order)
+def rebuild_sales_rollup_of_deleted_order(sender, instance: Order, **kwargs) -> None:
+    schedule_order_day_rebuild(order=instance)
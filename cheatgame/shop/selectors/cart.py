@@ -1,18 +1,54 @@
+import datetime
+from decimal import Decimal
+
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from typing import List
 
 from billiard.five import values
-from django.db.models import QuerySet, Sum
-from rest_framework.exceptions import APIException
+from django.db.models import QuerySet, Sum, Prefetch, Q, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek, TruncMonth
 
-from cheatgame.product.models import Attachment, ProductType
-from cheatgame.shop.models import CartItem, CartItemAttachment, Order, OrderStatus, OrderItem
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.product.models import Attachment, ProductType, SuggestionProduct
+from cheatgame.shop.models import CartItem, CartItemAttachment, Order, OrderStatus, OrderItem, DailySalesRollup
+from cheatgame.shop.pricing import attachments_price, line_price, total_price
 from cheatgame.users.models import BaseUser
 
 
 def cart_item_list_user(* , user:BaseUser) ->QuerySet[BaseUser]:
     return CartItem.objects.filter(cart__user = user)
 
+
+def cart_item_list_priced(*, user: BaseUser) -> List[CartItem]:
+    """
+    The cart items of `user` with products, attachments and product
+    suggestions loaded in a fixed number of queries, and every line priced
+    in memory: each item gets `attachments` and an up to date `price`.
+    """
+    cart_items = list(
+        CartItem.objects.filter(cart__user=user).select_related("product").prefetch_related(
+            Prefetch("cartitemattachment_set",
+                     queryset=CartItemAttachment.objects.select_related("attachment").order_by("id")),
+            Prefetch("product__suggestions", queryset=SuggestionProduct.objects.select_related("suggested")),
+        ).order_by("id")
+    )
+    now = timezone.now()
+    for cart_item in cart_items:
+        cart_item.attachments = [
+            cart_item_attachment.attachment for cart_item_attachment in cart_item.cartitemattachment_set.all()]
+        cart_item.price = line_price(
+            product=cart_item.product,
+            quantity=cart_item.quantity,
+            attachment_price=attachments_price(product=cart_item.product, attachments=cart_item.attachments),
+            now=now,
+        )
+    return cart_items
+
+
+def cart_total_price(*, cart_items: List[CartItem]) -> Decimal:
+    return total_price(line_prices=[cart_item.price for cart_item in cart_items])
+
 def cart_item_attachment_list(* , cart_item:CartItem) -> List[Attachment]:
     cart_item_attachments = CartItemAttachment.objects.filter(cart_item = cart_item).prefetch_related("attachment")
     attachments = [cart_item_attachment.attachment for cart_item_attachment in cart_item_attachments]
@@ -43,85 +79,96 @@ def bought_order_item(* , user:BaseUser , product_id : int) -> bool:
     return OrderItem.objects.filter(order__payment_status = OrderStatus.PAID.value , order__user = user, product_id = product_id).exists()
 
 
-def sell_report(filters = None) -> dict:
+SELL_REPORT_PERIODS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+def _parse_report_date(*, value: str) -> datetime.date:
+    # The range used to filter order timestamps, so datetimes are accepted
+    # too and stand for their local day.
+    try:
+        date = parse_date(value)
+        if date is None:
+            moment = parse_datetime(value)
+            if moment is not None:
+                date = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+    except ValueError:
+        date = None
+    if date is None:
+        raise ApplicationError("تاریخ وارد شده معتبر نیست.", extra={"date": value})
+    return date
+
+
+def _sales_rollup_queryset(*, filters: str = None) -> QuerySet[DailySalesRollup]:
+    queryset = DailySalesRollup.objects.all()
     if filters is None:
-        game_amount = Order.objects.filter(payment_status = OrderStatus.PAID ,is_game=True,).aggregate(Sum("total_price_discount")).get("total_price_discount__sum", 0)
-        game_number = Order.objects.filter(payment_status = OrderStatus.PAID , is_game=True).count()
-        physical_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                             payment_status=OrderStatus.PAID).aggregate(Sum("total_price_discount")).get("total_price_discount__sum")
-        physical_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                             payment_status=OrderStatus.PAID).count()
-        giftcart_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                             payment_status=OrderStatus.PAID).aggregate(Sum("total_price_discount")).get("total_price_discount__sum")
-        giftcart_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                             payment_status=OrderStatus.PAID).count()
-        informaton = {
-            "game_amount": game_amount,
-            "game_number": game_number,
-            "physical_amount": physical_amount,
-            "physical_number": physical_number,
-            "giftcart_amount": giftcart_amount,
-            "giftcart_number": giftcart_number,
-        }
-        return informaton
-    else:
-        limit = 2
-        created_at__in = filters.split(",")
-        if len(created_at__in) > limit:
-            raise APIException("please just add two created_at with , in the middle")
-        created_at_0, created_at_1 = created_at__in
-
-        if not created_at_1:
-            created_at_1 = timezone.now()
-
-
-        if not created_at_0:
-            queryset = Order.objects.filter(created_at__date__lt=created_at_1)
-            game_amount = queryset.filter(payment_status=OrderStatus.PAID, is_game=True, ).aggregate(
-                Sum("total_price_discount")).get("total_price_discount", 0)
-            game_number = queryset.filter(payment_status=OrderStatus.PAID, is_game=True).count()
-            physical_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                                                   payment_status=OrderStatus.PAID).aggregate(
-                Sum("total_price_discount")).get("total_price_discount__sum")
-            physical_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                                                   payment_status=OrderStatus.PAID).count()
-            giftcart_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                                                   payment_status=OrderStatus.PAID).aggregate(
-                Sum("total_price_discount")).get("total_price_discount__sum")
-            giftcart_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                                                   payment_status=OrderStatus.PAID).count()
-
-            informaton = {
-                "game_amount": game_amount,
-                "game_number": game_number,
-                "physical_amount": physical_amount,
-                "physical_number": physical_number,
-                "giftcart_amount": giftcart_amount,
-                "giftcart_number": giftcart_number,
-            }
-            return informaton
-
-        queryset = Order.objects.filter(created_at__range=(created_at_0, created_at_1))
-        game_amount = queryset.filter(payment_status=OrderStatus.PAID, is_game=True, ).aggregate(
-            Sum("total_price_discount")).get("total_price_discount", 0)
-        game_number = queryset.filter(payment_status=OrderStatus.PAID, is_game=True).count()
-        physical_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                                               payment_status=OrderStatus.PAID).aggregate(
-            Sum("total_price_discount")).get("total_price_discount__sum")
-        physical_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.PHYSCIAL],
-                                               payment_status=OrderStatus.PAID).count()
-        giftcart_amount = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                                               payment_status=OrderStatus.PAID).aggregate(
-            Sum("total_price_discount")).get("total_price_discount__sum")
-        giftcart_number = Order.objects.filter(order_items__product__product_type__in=[ProductType.GIFTCART],
-                                               payment_status=OrderStatus.PAID).count()
-
-        informaton = {
-            "game_amount": game_amount,
-            "game_number": game_number,
-            "physical_amount": physical_amount,
-            "physical_number": physical_number,
-            "giftcart_amount": giftcart_amount,
-            "giftcart_number": giftcart_number,
-        }
-        return informaton
+        return queryset
+    created_at__in = filters.split(",")
+    if len(created_at__in) != 2:
+        raise ApplicationError("please just add two created_at with , in the middle")
+    created_at_0, created_at_1 = (value.strip() for value in created_at__in)
+    created_at_1 = _parse_report_date(value=created_at_1) if created_at_1 else timezone.localdate()
+    if not created_at_0:
+        return queryset.filter(date__lt=created_at_1)
+    return queryset.filter(date__range=(_parse_report_date(value=created_at_0), created_at_1))
+
+
+def _sell_report_aggregates() -> dict:
+    zero = Value(Decimal("0"), output_field=DecimalField(max_digits=16, decimal_places=0))
+    game = Q(product_type__isnull=True, is_game=True)
+    physical = Q(product_type=ProductType.PHYSCIAL)
+    giftcart = Q(product_type=ProductType.GIFTCART)
+    return {
+        "game_amount": Coalesce(Sum("revenue", filter=game), zero),
+        "game_number": Coalesce(Sum("order_count", filter=game), 0),
+        "physical_amount": Coalesce(Sum("revenue", filter=physical), zero),
+        "physical_number": Coalesce(Sum("order_count", filter=physical), 0),
+        "giftcart_amount": Coalesce(Sum("revenue", filter=giftcart), zero),
+        "giftcart_number": Coalesce(Sum("order_count", filter=giftcart), 0),
+    }
+
+
+def sell_report(*, filters: str = None, group_by: str = None) -> dict:
+    """
+    Paid order totals per kind of order, read from the daily sales rollup so
+    the cost does not grow with the order history. With `group_by` (a key of
+    `SELL_REPORT_PERIODS`) the totals are also broken down into a `series` of
+    periods, computed in the same query.
+    """
+    queryset = _sales_rollup_queryset(filters=filters)
+    if group_by is None:
+        return queryset.aggregate(**_sell_report_aggregates())
+
+    series = list(
+        queryset.annotate(period=SELL_REPORT_PERIODS[group_by]("date"))
+        .values("period")
+        .annotate(**_sell_report_aggregates())
+        .order_by("period")
+    )
+    information = {key: sum((row[key] for row in series), 0) for key in _sell_report_aggregates()}
+    information["series"] = series
+    return information
+
+
+def sales_series(*, from_date: datetime.date, to_date: datetime.date, group_by: str,
+                 product_type: int = None, is_game: bool = None) -> list[dict]:
+    """
+    Order and item counts, gross and discounted revenue per period and product
+    type between the two dates; rows without a product type are the totals of
+    each period.
+    """
+    queryset = DailySalesRollup.objects.filter(date__range=(from_date, to_date))
+    if product_type is not None:
+        queryset = queryset.filter(product_type=product_type)
+    if is_game is not None:
+        queryset = queryset.filter(is_game=is_game)
+    return list(
+        queryset.annotate(period=SELL_REPORT_PERIODS[group_by]("date"))
+        .values("period", "product_type")
+        .annotate(order_count=Sum("order_count"), item_count=Sum("item_count"),
+                  gross=Sum("gross"), revenue=Sum("revenue"))
+        .order_by("period", "product_type")
+    )
@@ -1,8 +1,57 @@
-from django.db.models import QuerySet
+import datetime
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
 
 from cheatgame.shop.models import DeliverySchedule
 
+DELIVERY_CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def delivery_calendar_day_key(*, type: int, day: datetime.date) -> str:
+    return f"shop:delivery:calendar:{type}:{day.isoformat()}"
+
+
+def delivery_capacity_key(*, schedule_id: int) -> str:
+    return f"shop:delivery:capacity:{schedule_id}"
+
+
+def get_delivery_calendar(*, from_date: datetime.date, to_date: datetime.date, type: int) -> list[dict]:
+    """
+    Delivery slots of `type` between the two dates. The slots of each day are
+    cached, and the remaining capacity of each slot lives in its own counter
+    that bookings decrement in place, so the calendar is never re-queried
+    just because seats were taken.
+    """
+    days = [from_date + datetime.timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
+    day_keys = {delivery_calendar_day_key(type=type, day=day): day for day in days}
+    cached_days = cache.get_many(day_keys)
 
-def get_list_of_delivery_schedule(* , from_date ,to_date, type) -> QuerySet[DeliverySchedule]:
-    return DeliverySchedule.objects.filter(start__date__range= (from_date ,to_date), type = type)
+    missing_days = [day for key, day in day_keys.items() if key not in cached_days]
+    if missing_days:
+        slots_by_day = defaultdict(list)
+        capacities = {}
+        schedules = DeliverySchedule.objects.filter(
+            start__date__range=(min(missing_days), max(missing_days)), type=type).order_by("start", "id")
+        for schedule in schedules:
+            slots_by_day[timezone.localdate(schedule.start)].append(
+                {"id": schedule.id, "type": schedule.type, "start": schedule.start, "end": schedule.end})
+            capacities[delivery_capacity_key(schedule_id=schedule.id)] = schedule.capacity
+        new_days = {delivery_calendar_day_key(type=type, day=day): slots_by_day[day] for day in missing_days}
+        cache.set_many(new_days, DELIVERY_CALENDAR_CACHE_TIMEOUT)
+        for key, capacity in capacities.items():
+            # Counters already in the cache are live; never overwrite them.
+            cache.add(key, capacity, DELIVERY_CALENDAR_CACHE_TIMEOUT)
+        cached_days.update(new_days)
 
+    slots = [slot for key in day_keys for slot in cached_days[key]]
+    capacity_keys = {delivery_capacity_key(schedule_id=slot["id"]): slot for slot in slots}
+    capacities = cache.get_many(capacity_keys)
+    missing_ids = [slot["id"] for key, slot in capacity_keys.items() if key not in capacities]
+    if missing_ids:
+        for schedule_id, capacity in DeliverySchedule.objects.filter(id__in=missing_ids).values_list("id", "capacity"):
+            key = delivery_capacity_key(schedule_id=schedule_id)
+            cache.add(key, capacity, DELIVERY_CALENDAR_CACHE_TIMEOUT)
+            capacities[key] = capacity
+    return [{**slot, "capacity": max(capacities.get(key, 0), 0)} for key, slot in capacity_keys.items()]
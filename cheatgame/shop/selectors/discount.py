@@ -1,12 +1,20 @@
 from datetime import datetime
 import decimal
+from typing import Optional
 
+from django.core.cache import cache
 from django.db.models import QuerySet
+from django.utils import timezone
 
 from cheatgame.shop.models import Discount, UserDiscount, DiscountType
 from cheatgame.users.models import BaseUser
 from cheatgame.users.selectors import user_address_list
 
+DISCOUNT_CACHE_TIMEOUT = 60 * 10
+DISCOUNT_MISSING_CACHE_TIMEOUT = 30
+DISCOUNT_MISSING = "missing"
+USER_DISCOUNT_CACHE_TIMEOUT = 60 * 10
+
 
 def discount_list_admin() -> QuerySet[Discount]:
     return Discount.objects.filter(is_active=True).order_by("-id")
@@ -18,20 +26,73 @@ def discount_list_user(*, user: BaseUser) -> QuerySet[UserDiscount]:
                                        discount__is_active=True , discount__type = DiscountType.DIRECT , is_used = False)
 
 
+def discount_cache_key(*, code: str) -> str:
+    return f"shop:discount:{code}"
+
+
+def user_discount_cache_key(*, discount_id: int, user_id: int) -> str:
+    return f"shop:discount:{discount_id}:user:{user_id}"
+
+
+def _discount_snapshot(*, discount: Discount) -> dict:
+    return {
+        "id": discount.id,
+        "type": discount.type,
+        "value_type": discount.value_type,
+        "valid_from": discount.valid_from,
+        "valid_until": discount.valid_until,
+        "is_active": discount.is_active,
+        "min_purchase_amount": discount.min_purchase_amount,
+        "usage_number": discount.usage_number,
+    }
+
+
+def get_discount_snapshot(*, code: str) -> Optional[dict]:
+    """
+    The cached validity window, minimum purchase, value type and remaining
+    uses of the discount with `code`, or None if there is none. Unknown codes
+    are cached too, briefly, so probing codes does not reach the database.
+    """
+    key = discount_cache_key(code=code)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        discount = Discount.objects.filter(code=code).first()
+        if discount is None:
+            cache.set(key, DISCOUNT_MISSING, DISCOUNT_MISSING_CACHE_TIMEOUT)
+            return None
+        snapshot = _discount_snapshot(discount=discount)
+        cache.set(key, snapshot, DISCOUNT_CACHE_TIMEOUT)
+    if snapshot == DISCOUNT_MISSING:
+        return None
+    return snapshot
+
+
+def _is_applicable(*, snapshot: Optional[dict], total_price: decimal) -> bool:
+    now = timezone.now()
+    return (snapshot is not None and snapshot["is_active"] and snapshot["valid_from"] < now < snapshot["valid_until"]
+            and snapshot["min_purchase_amount"] <= total_price)
+
+
+def has_unused_user_discount(*, discount_id: int, user_id: int) -> bool:
+    """
+    Whether the user holds an unused assignment of the discount, cached either
+    way so repeated checks of a direct code do not reach the database.
+    """
+    key = user_discount_cache_key(discount_id=discount_id, user_id=user_id)
+    unused = cache.get(key)
+    if unused is None:
+        unused = UserDiscount.objects.filter(discount_id=discount_id, user_id=user_id, is_used=False).exists()
+        cache.set(key, unused, USER_DISCOUNT_CACHE_TIMEOUT)
+    return unused
+
+
 def check_discount_code(*, code: str, total_price: decimal, user: BaseUser) -> bool:
-    now = datetime.now()
-    discount = Discount.objects.get(valid_from__lt=now, valid_until__gt=now, code=code)
-    if discount:
-        user_discount = UserDiscount.objects.filter(discount=discount, user=user)
-        if not user_discount.first():
-            return False
-        return discount.min_purchase_amount <= total_price and not user_discount.first().is_used
-    return False
+    snapshot = get_discount_snapshot(code=code)
+    if not _is_applicable(snapshot=snapshot, total_price=total_price):
+        return False
+    return has_unused_user_discount(discount_id=snapshot["id"], user_id=user.id)
 
 
 def check_coupon_code(*, code: str, total_price: decimal) -> bool:
-    now = datetime.now()
-    discount = Discount.objects.get(valid_from__lt=now, valid_until__gt=now, code=code)
-    if discount:
-        return discount.min_purchase_amount <= total_price and discount.usage_number > 0
-    return False
+    snapshot = get_discount_snapshot(code=code)
+    return _is_applicable(snapshot=snapshot, total_price=total_price) and snapshot["usage_number"] > 0
@@ -1,36 +1,77 @@
-from typing import List
+from functools import partial
+from typing import List, Iterable
 
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import QuerySet, F
+from django.utils import timezone
 
+from cheatgame.core.exceptions import ApplicationError
 from cheatgame.shop.models import DeliverySchedule, DeliveryType, DeliveryData
+from cheatgame.shop.selectors.delivery_schedule import delivery_calendar_day_key, delivery_capacity_key, \
+    DELIVERY_CALENDAR_CACHE_TIMEOUT
 from cheatgame.users.models import Address
 
 
+def invalidate_delivery_calendar(*, schedules: Iterable[DeliverySchedule]) -> None:
+    keys = set()
+    for schedule in schedules:
+        keys.add(delivery_calendar_day_key(type=schedule.type, day=timezone.localdate(schedule.start)))
+        keys.add(delivery_capacity_key(schedule_id=schedule.id))
+    transaction.on_commit(partial(cache.delete_many, list(keys)))
+
+
 def create_delivery_schedule(*, delivery_schedule: List[DeliverySchedule]) -> QuerySet[DeliverySchedule]:
-    return DeliverySchedule.objects.bulk_create(delivery_schedule)
+    schedules = DeliverySchedule.objects.bulk_create(delivery_schedule)
+    invalidate_delivery_calendar(schedules=schedules)
+    return schedules
 
 
 def update_delivery_schedule(*, id, type: int, start, end, capacity) -> DeliverySchedule:
     delivery_schedule = DeliverySchedule.objects.get(id=id)
+    previous = DeliverySchedule(id=delivery_schedule.id, type=delivery_schedule.type, start=delivery_schedule.start)
     delivery_schedule.type = type
     delivery_schedule.start = start
     delivery_schedule.end = end
     delivery_schedule.capacity = capacity
     delivery_schedule.save()
+    invalidate_delivery_calendar(schedules=[previous, delivery_schedule])
     return delivery_schedule
 
 
 def delete_delivery_schedule(*, delivery_schedule_id: id) -> None:
-    DeliverySchedule.objects.get(id=delivery_schedule_id).delete()
+    delivery_schedule = DeliverySchedule.objects.get(id=delivery_schedule_id)
+    delivery_schedule.delete()
+    delivery_schedule.id = delivery_schedule_id
+    invalidate_delivery_calendar(schedules=[delivery_schedule])
 
 
-def decrease_capacity_delivery_schedule(delivery_schedule: DeliverySchedule) -> None:
-    delivery_schedule.capacity = F("capacity") - 1
-    delivery_schedule.save()
+def _decrement_cached_capacity(*, schedule_id: int) -> None:
+    key = delivery_capacity_key(schedule_id=schedule_id)
+    try:
+        cache.decr(key)
+    except ValueError:
+        # Not cached. A calendar read racing this booking may seed the counter
+        # with the capacity it read before the booking; storing the committed
+        # capacity overwrites such a seed, or turns a later one into a no-op.
+        capacity = DeliverySchedule.objects.filter(id=schedule_id).values_list("capacity", flat=True).first()
+        if capacity is not None:
+            cache.set(key, capacity, DELIVERY_CALENDAR_CACHE_TIMEOUT)
+
+
+def book_delivery_schedule(*, schedule_id: int) -> bool:
+    """
+    Takes one seat of a delivery slot in a single conditional UPDATE; returns
+    False if the slot is already full.
+    """
+    booked = DeliverySchedule.objects.filter(id=schedule_id, capacity__gt=0).update(capacity=F("capacity") - 1)
+    if booked:
+        transaction.on_commit(partial(_decrement_cached_capacity, schedule_id=schedule_id))
+    return bool(booked)
 
 
 @transaction.atomic
 def create_schedule_data(*, type: DeliveryType, schedule: DeliverySchedule, address: Address) -> DeliveryData:
-    decrease_capacity_delivery_schedule(delivery_schedule=schedule)
+    if not book_delivery_schedule(schedule_id=schedule.id):
+        raise ApplicationError("زمان انتخاب شده پر شده است ")
     return DeliveryData.objects.create(type=type, schedule=schedule, address=address)
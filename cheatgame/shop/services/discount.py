@@ -1,40 +1,97 @@
 import datetime
 import decimal
 import secrets
+from functools import partial
+from typing import Iterable
 
-from django.db import transaction
+from django.core.cache import cache
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
 
-from cheatgame.shop.models import Discount
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.shop.models import Discount, DiscountRedemption, DiscountType, Order, UserDiscount, DiscountCampaign, \
+    DiscountCampaignStatus
+from cheatgame.shop.selectors.discount import discount_cache_key, user_discount_cache_key
 from cheatgame.users.models import BaseUser
+from cheatgame.users.selectors import user_list
 
 
-def generate_code(discount_id: str) -> str:
-    upper_alpha = "ABCDEFGHJKLMNPQRSTVWXYZ"
-    random_str = "".join(secrets.choice(upper_alpha) for i in range(8))
-    code = (random_str + discount_id)[-8:]
-    return code
+def invalidate_discount_cache(*, codes: Iterable[str]) -> None:
+    keys = [discount_cache_key(code=code) for code in codes if code]
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def invalidate_user_discount_cache(*, discount_id: int, user_ids: Iterable[int]) -> None:
+    keys = [user_discount_cache_key(discount_id=discount_id, user_id=user_id) for user_id in user_ids if user_id]
+    if keys:
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+DISCOUNT_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTVWXYZ"
+DISCOUNT_CODE_LENGTH = 8
+DISCOUNT_BATCH_SIZE = 1000
+DISCOUNT_CAMPAIGN_CHUNK_SIZE = 2000
+
+
+def generate_code() -> str:
+    return "".join(secrets.choice(DISCOUNT_CODE_ALPHABET) for i in range(DISCOUNT_CODE_LENGTH))
+
+
+def generate_unique_codes(*, count: int) -> list[str]:
+    """
+    `count` random codes that no discount uses yet, checking each round of
+    candidates against the database in one query.
+    """
+    codes = set()
+    while len(codes) < count:
+        candidates = set()
+        while len(codes) + len(candidates) < count:
+            candidates.add(generate_code())
+        candidates -= codes
+        taken = set(Discount.objects.filter(code__in=candidates).values_list("code", flat=True))
+        codes |= candidates - taken
+    return list(codes)
 
 
 @transaction.atomic
 def create_discount(*, name: str, type: int, value_type: int, valid_from: datetime, valid_until: datetime,
                     is_active: bool, min_purchase_amount: decimal, amount: decimal, percent: int,
                     admin_user: BaseUser, usage_number: int) -> Discount:
-    discount = Discount.objects.create(
-        name=name,
-        type=type,
-        value_type=value_type,
-        valid_from=valid_from,
-        valid_until=valid_until,
-        is_active=is_active,
-        min_purchase_amount=min_purchase_amount,
-        amount=amount,
-        percent=percent,
-        admin_user=admin_user,
-        usage_number=usage_number
-    )
-    discount.code = generate_code(str(discount.id))
-    discount.save()
-    return discount
+    return create_discounts(count=1, name=name, type=type, value_type=value_type, valid_from=valid_from,
+                            valid_until=valid_until, is_active=is_active, min_purchase_amount=min_purchase_amount,
+                            amount=amount, percent=percent, admin_user=admin_user, usage_number=usage_number)[0]
+
+
+@transaction.atomic
+def create_discounts(*, count: int, name: str, type: int, value_type: int, valid_from: datetime,
+                     valid_until: datetime, is_active: bool, min_purchase_amount: decimal, amount: decimal,
+                     percent: int, admin_user: BaseUser, usage_number: int) -> list[Discount]:
+    """
+    Issues `count` discounts with the same terms and unique codes, inserted
+    in batches of `DISCOUNT_BATCH_SIZE`.
+    """
+    codes = generate_unique_codes(count=count)
+    discounts = Discount.objects.bulk_create([
+        Discount(
+            name=name,
+            code=code,
+            type=type,
+            value_type=value_type,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            is_active=is_active,
+            min_purchase_amount=min_purchase_amount,
+            amount=amount,
+            percent=percent,
+            admin_user=admin_user,
+            usage_number=usage_number
+        )
+        for code in codes
+    ], batch_size=DISCOUNT_BATCH_SIZE)
+    # The new codes may have been probed, and negatively cached, before.
+    invalidate_discount_cache(codes=codes)
+    return discounts
 
 
 def update_discount(*, discount_id: int, name: str, type: int, value_type: int, valid_from: datetime,
@@ -54,10 +111,142 @@ def update_discount(*, discount_id: int, name: str, type: int, value_type: int,
         admin_user=admin_user,
         usage_number=usage_number
     )
+    invalidate_discount_cache(codes=Discount.objects.filter(id=discount_id).values_list("code", flat=True))
     return discount
 
 
 def delete_discount(*, discount_id: int) -> None:
-    Discount.objects.get(id=discount_id).delete()
+    discount = Discount.objects.get(id=discount_id)
+    discount.delete()
+    invalidate_discount_cache(codes=[discount.code])
 
 
+
+
+def _claim_user_discount(*, discount: Discount, user: BaseUser) -> bool:
+    claimed = UserDiscount.objects.filter(discount=discount, user=user, is_used=False).update(is_used=True)
+    invalidate_user_discount_cache(discount_id=discount.id, user_ids=[user.id])
+    return bool(claimed)
+
+
+def _claim_coupon_use(*, discount: Discount) -> bool:
+    return bool(Discount.objects.filter(id=discount.id, usage_number__gt=0).update(
+        usage_number=F("usage_number") - 1))
+
+
+@transaction.atomic
+def redeem_discount(*, discount: Discount, order: Order) -> DiscountRedemption:
+    """
+    Records the use of `discount` by the owner of `order`: a direct discount
+    marks the UserDiscount of the user used, a coupon takes one of its
+    remaining uses with a conditional UPDATE, whoever uses it. Redeeming the
+    same discount for an order again returns the existing redemption; raises
+    ApplicationError if no use can be claimed.
+    """
+    try:
+        with transaction.atomic():
+            redemption = DiscountRedemption.objects.create(discount=discount, user_id=order.user_id, order=order)
+    except IntegrityError:
+        redemption = DiscountRedemption.objects.get(order=order)
+        if redemption.discount_id != discount.id:
+            raise ApplicationError("برای این سفارش قبلا کد تخفیف ثبت شده است.")
+        return redemption
+
+    if discount.type == DiscountType.DIRECT:
+        if not _claim_user_discount(discount=discount, user=order.user):
+            raise ApplicationError("کد تخفیف قبلا استفاده شده است.")
+    # The counter update comes last so the discount row stays locked only
+    # until this transaction commits, not for the rest of the checkout.
+    elif discount.type == DiscountType.COUPON:
+        if not _claim_coupon_use(discount=discount):
+            raise ApplicationError("ظرفیت استفاده از کد تخفیف به پایان رسیده است.")
+        invalidate_discount_cache(codes=[discount.code])
+    return redemption
+
+
+@transaction.atomic
+def release_discount_redemption(*, order_id: int) -> bool:
+    """
+    Gives the discount use of a failed or cancelled order back; returns False
+    if the order had none (or it was already released).
+    """
+    redemption = DiscountRedemption.objects.filter(order_id=order_id).select_related("discount").first()
+    if redemption is None or not DiscountRedemption.objects.filter(id=redemption.id).delete()[0]:
+        return False
+    if redemption.discount.type == DiscountType.DIRECT:
+        UserDiscount.objects.filter(discount_id=redemption.discount_id, user_id=redemption.user_id).update(
+            is_used=False)
+        invalidate_user_discount_cache(discount_id=redemption.discount_id, user_ids=[redemption.user_id])
+    elif redemption.discount.type == DiscountType.COUPON:
+        Discount.objects.filter(id=redemption.discount_id).update(usage_number=F("usage_number") + 1)
+        invalidate_discount_cache(codes=[redemption.discount.code])
+    return True
+
+
+def create_discount_campaign(*, discount: Discount, filters: dict, admin_user: BaseUser) -> DiscountCampaign:
+    """
+    Starts giving `discount` to every user matching `filters` (see UserFilter)
+    in the background; the campaign reports its progress as it goes.
+    """
+    from cheatgame.shop.tasks import assign_discount_campaign_chunk
+
+    if discount.type != DiscountType.DIRECT:
+        raise ApplicationError("فقط کدهای تخفیف مستقیم را می توان به کاربران اختصاص داد.")
+    campaign = DiscountCampaign.objects.create(
+        discount=discount,
+        admin_user=admin_user,
+        filters=filters,
+        total_users=user_list(filters=filters).count(),
+    )
+    transaction.on_commit(partial(assign_discount_campaign_chunk.delay, campaign.id))
+    return campaign
+
+
+# bulk_create(ignore_conflicts=True) hands back every object it was given;
+# RETURNING only yields the rows that were actually inserted, so users who
+# already held the discount are not counted again.
+_ASSIGN_USER_DISCOUNTS_SQL = """
+INSERT INTO {table} (discount_id, user_id, is_used, created_at, updated_at)
+SELECT %s, user_id, false, %s, %s FROM unnest(%s::bigint[]) AS user_id
+ON CONFLICT (discount_id, user_id) DO NOTHING
+RETURNING id
+"""
+
+
+def _assign_user_discounts(*, discount_id: int, user_ids: list[int]) -> int:
+    if not user_ids:
+        return 0
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(_ASSIGN_USER_DISCOUNTS_SQL.format(table=UserDiscount._meta.db_table),
+                       [discount_id, now, now, user_ids])
+        return len(cursor.fetchall())
+
+
+def assign_discount_campaign_chunk(*, campaign_id: int, chunk_size: int = DISCOUNT_CAMPAIGN_CHUNK_SIZE) -> bool:
+    """
+    Gives the campaign discount to the next `chunk_size` users of its segment,
+    walking them in id order from where the last chunk stopped. Returns
+    whether users are left.
+    """
+    campaign = DiscountCampaign.objects.get(id=campaign_id)
+    if campaign.status in [DiscountCampaignStatus.DONE, DiscountCampaignStatus.FAILED]:
+        return False
+
+    user_ids = list(
+        user_list(filters=campaign.filters).filter(id__gt=campaign.last_user_id).order_by("id")
+        .values_list("id", flat=True)[:chunk_size]
+    )
+    with transaction.atomic():
+        assigned = _assign_user_discounts(discount_id=campaign.discount_id, user_ids=user_ids)
+        # Users of the segment may have probed the code, and been cached as
+        # not holding it, before this chunk reached them.
+        invalidate_user_discount_cache(discount_id=campaign.discount_id, user_ids=user_ids)
+        has_more = len(user_ids) == chunk_size
+        DiscountCampaign.objects.filter(id=campaign.id).update(
+            status=DiscountCampaignStatus.RUNNING if has_more else DiscountCampaignStatus.DONE,
+            assigned_users=F("assigned_users") + assigned,
+            last_user_id=user_ids[-1] if user_ids else campaign.last_user_id,
+            updated_at=timezone.now(),
+        )
+    return has_more
@@ -0,0 +1,137 @@
+import csv
+import io
+import logging
+from collections import defaultdict
+from typing import Dict, IO, Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.product.models import GiftCartData, Product, ProductType
+from cheatgame.shop.models import OrderItem
+from cheatgame.shop.signals import gift_card_stock_low
+
+logger = logging.getLogger(__name__)
+
+GIFT_CARD_LOW_STOCK_THRESHOLD = 10
+GIFT_CARD_IMPORT_BATCH_SIZE = 1000
+
+# Each slot (product, n, order item) asks for the n-th code of a product that
+# the order needs. The codes are picked per product with SKIP LOCKED, so
+# concurrent orders take different codes instead of queueing on the same
+# "first free" rows, and the n-th picked code goes to the n-th slot. Codes
+# handed out before order items were recorded only carry their order.
+_ALLOCATE_GIFT_CARDS_SQL = """
+WITH slots (product_id, slot, order_item_id) AS (VALUES {slots}),
+needed AS (
+    SELECT product_id, count(*) AS quantity FROM slots GROUP BY product_id
+),
+picked AS (
+    SELECT free.id, needed.product_id,
+           row_number() OVER (PARTITION BY needed.product_id ORDER BY free.id) AS slot
+    FROM needed
+    CROSS JOIN LATERAL (
+        SELECT id FROM {table}
+        WHERE product_id = needed.product_id AND order_item_id IS NULL AND order_id IS NULL
+        ORDER BY id
+        LIMIT needed.quantity
+        FOR UPDATE SKIP LOCKED
+    ) AS free
+)
+UPDATE {table} AS code
+SET order_item_id = slots.order_item_id, order_id = %s, updated_at = %s
+FROM picked JOIN slots ON slots.product_id = picked.product_id AND slots.slot = picked.slot
+WHERE code.id = picked.id
+RETURNING code.product_id
+"""
+
+
+def _gift_card_slots(*, order_id: int) -> list[tuple]:
+    items = list(OrderItem.objects.filter(order_id=order_id, product__product_type=ProductType.GIFTCART)
+                 .annotate(assigned=Count("gift_cart_codes")).order_by("id")
+                 .values_list("id", "product_id", "quantity", "assigned"))
+    slots = []
+    counters = defaultdict(int)
+    for order_item_id, product_id, quantity, assigned in items:
+        for _ in range(quantity - assigned):
+            counters[product_id] += 1
+            slots.append((product_id, counters[product_id], order_item_id))
+    return slots
+
+
+def check_gift_card_stock(*, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Counts the unassigned codes of the products and sends
+    `gift_card_stock_low` for each one at or below the threshold.
+    """
+    product_ids = set(product_ids)
+    remaining = dict.fromkeys(product_ids, 0)
+    remaining.update(
+        GiftCartData.objects.filter(product_id__in=product_ids, order_item__isnull=True, order__isnull=True)
+        .values("product_id").annotate(count=Count("id")).values_list("product_id", "count")
+    )
+    for product_id, count in remaining.items():
+        if count <= GIFT_CARD_LOW_STOCK_THRESHOLD:
+            gift_card_stock_low.send(sender=GiftCartData, product_id=product_id, remaining=count)
+    return remaining
+
+
+@transaction.atomic
+def allocate_order_gift_cards(*, order_id: int) -> int:
+    """
+    Assigns free codes to the gift card items of a paid order that do not have
+    all of theirs yet, in a single statement. Returns the number of codes
+    assigned; items left short are logged for the shop to fill.
+    """
+    slots = _gift_card_slots(order_id=order_id)
+    if not slots:
+        return 0
+
+    sql = _ALLOCATE_GIFT_CARDS_SQL.format(
+        table=connection.ops.quote_name(GiftCartData._meta.db_table),
+        slots=", ".join(["(%s::bigint, %s::bigint, %s::bigint)"] * len(slots)),
+    )
+    params = [value for slot in slots for value in slot] + [order_id, timezone.now()]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        allocated = [product_id for product_id, in cursor.fetchall()]
+
+    if len(allocated) < len(slots):
+        logger.warning("Order %s is short of %s gift card codes.", order_id, len(slots) - len(allocated))
+    product_ids = {product_id for product_id, _, _ in slots}
+    transaction.on_commit(lambda: check_gift_card_stock(product_ids=product_ids))
+    return len(allocated)
+
+
+def _read_codes(*, file: IO) -> list[str]:
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    codes = []
+    for row in csv.reader(io.StringIO(content)):
+        code = row[0].strip() if row else ""
+        if code and code.lower() != "code":
+            codes.append(code)
+    return codes
+
+
+@transaction.atomic
+def import_gift_card_codes(*, product: Product, file: IO) -> int:
+    """
+    Adds the codes in the first column of a CSV file to the pool of `product`,
+    skipping ones it already has, and returns how many were added.
+    """
+    if product.product_type != ProductType.GIFTCART:
+        raise ApplicationError("این محصول گیفت کارت نیست.")
+    codes = list(dict.fromkeys(_read_codes(file=file)))
+    max_length = GiftCartData._meta.get_field("code").max_length
+    if any(len(code) > max_length for code in codes):
+        raise ApplicationError("طول کد گیفت کارت بیش از حد مجاز است.")
+    existing = set(GiftCartData.objects.filter(product=product, code__in=codes).values_list("code", flat=True))
+    created = GiftCartData.objects.bulk_create(
+        [GiftCartData(product=product, code=code) for code in codes if code not in existing],
+        batch_size=GIFT_CARD_IMPORT_BATCH_SIZE,
+    )
+    return len(created)
@@ -0,0 +1,123 @@
+import datetime
+import logging
+from collections import Counter
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.product.cache import bump_catalog_version
+from cheatgame.product.documents import schedule_product_document_rebuild
+from cheatgame.product.models import Product, ProductType
+from cheatgame.shop.models import Order, StockReservation, StockReservationStatus
+
+logger = logging.getLogger(__name__)
+
+STOCK_RESERVATION_TTL = datetime.timedelta(minutes=15)
+# Games and packages are delivered digitally and gift cards come out of their
+# code pool, so their `quantity` is not a stock count and is never reserved.
+STOCK_TRACKED_PRODUCT_TYPES = (ProductType.PHYSCIAL,)
+
+
+def take_stock(*, product_id: int, quantity: int) -> bool:
+    """
+    Decrements the stock of a product in one conditional UPDATE, so concurrent
+    checkouts can never take more than is left; returns False if too few are left.
+    """
+    return bool(Product.objects.filter(id=product_id, quantity__gte=quantity).update(
+        quantity=F("quantity") - quantity))
+
+
+def return_stock(*, product_id: int, quantity: int) -> None:
+    Product.objects.filter(id=product_id).update(quantity=F("quantity") + quantity)
+
+
+def stock_changed(*, product_ids: Iterable[int]) -> None:
+    # Listings filter on availability and product documents show the quantity.
+    product_ids = set(product_ids)
+    if product_ids:
+        bump_catalog_version()
+        schedule_product_document_rebuild(product_ids=product_ids)
+
+
+@transaction.atomic
+def reserve_order_stock(*, order: Order, quantities: Dict[int, int]) -> list[StockReservation]:
+    """
+    Takes `quantities` (product id -> quantity) out of stock for a pending order
+    and records them as reservations that expire after `STOCK_RESERVATION_TTL`.
+    Raises ApplicationError, undoing every decrement, if one product runs short.
+    """
+    # A fixed product order keeps concurrent checkouts of the same products
+    # from deadlocking on their row locks.
+    for product_id in sorted(quantities):
+        if not take_stock(product_id=product_id, quantity=quantities[product_id]):
+            raise ApplicationError("این تعداد محصول موجود نمی باشد", extra={"product": product_id})
+    stock_changed(product_ids=quantities)
+
+    expires_at = timezone.now() + STOCK_RESERVATION_TTL
+    return StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    ])
+
+
+def _release_reservation(*, reservation: StockReservation, statuses: Iterable[int]) -> bool:
+    # Moving the reservation to RELEASED is the guard against releasing it twice.
+    released = StockReservation.objects.filter(id=reservation.id, status__in=statuses).update(
+        status=StockReservationStatus.RELEASED, updated_at=timezone.now())
+    if released:
+        return_stock(product_id=reservation.product_id, quantity=reservation.quantity)
+    return bool(released)
+
+
+@transaction.atomic
+def release_order_stock(*, order_id: int) -> int:
+    """
+    Gives the stock of a failed or cancelled order back, whether it was still
+    held for payment or already committed by an earlier payment.
+    """
+    statuses = [StockReservationStatus.HELD, StockReservationStatus.COMMITTED]
+    released = [
+        reservation.product_id
+        for reservation in StockReservation.objects.filter(order_id=order_id, status__in=statuses)
+        if _release_reservation(reservation=reservation, statuses=statuses)
+    ]
+    stock_changed(product_ids=released)
+    return len(released)
+
+
+@transaction.atomic
+def commit_order_stock(*, order_id: int) -> None:
+    """
+    Makes the reservations of a paid order permanent. Reservations that already
+    expired gave their stock back, so it is taken again where still possible.
+    """
+    now = timezone.now()
+    StockReservation.objects.filter(order_id=order_id, status=StockReservationStatus.HELD).update(
+        status=StockReservationStatus.COMMITTED, updated_at=now)
+    released = Counter()
+    for reservation in StockReservation.objects.filter(order_id=order_id, status=StockReservationStatus.RELEASED):
+        released[reservation.product_id] += reservation.quantity
+    for product_id, quantity in sorted(released.items()):
+        if not take_stock(product_id=product_id, quantity=quantity):
+            # The order is paid for either way; the negative stock flags the
+            # oversell for the shop to resolve.
+            logger.warning("Paid order %s oversold product %s by up to %s.", order_id, product_id, quantity)
+            Product.objects.filter(id=product_id).update(quantity=F("quantity") - quantity)
+    stock_changed(product_ids=released)
+    StockReservation.objects.filter(order_id=order_id, status=StockReservationStatus.RELEASED).update(
+        status=StockReservationStatus.COMMITTED, updated_at=now)
+
+
+def release_expired_stock_reservations(*, batch_size: int = 500) -> int:
+    expired = StockReservation.objects.filter(
+        status=StockReservationStatus.HELD, expires_at__lte=timezone.now()).order_by("expires_at")[:batch_size]
+    released = []
+    for reservation in expired:
+        with transaction.atomic():
+            if _release_reservation(reservation=reservation, statuses=[StockReservationStatus.HELD]):
+                released.append(reservation.product_id)
+    stock_changed(product_ids=released)
+    return len(released)
@@ -1,30 +1,28 @@
 from _decimal import Decimal
-from typing import List
+from collections import defaultdict, Counter
+from typing import List, Dict
 
 from django.db import transaction
-from django.db.models import QuerySet
+from django.db.models import F, Sum
 from django.utils import timezone
 
-from cheatgame.product.models import ProductType
-from cheatgame.shop.models import Order, CartItem, OrderItem, DeliveryData, Discount, DiscountValueType
-from cheatgame.shop.selectors.cart import cart_item_attachment_list
-from cheatgame.shop.services.cart import calculate_attchment_price_order
+from cheatgame.product.models import ProductType, Product, Attachment
+from cheatgame.shop.models import Order, CartItem, OrderItem, DeliveryData, Discount, OrderStatus, \
+    OrderItemAttachment
+from cheatgame.shop.pricing import attachments_price, line_price, total_price, discounted_price
+from cheatgame.shop.services.discount import redeem_discount, release_discount_redemption
+from cheatgame.shop.services.gift_card import allocate_order_gift_cards
+from cheatgame.shop.services.inventory import reserve_order_stock, commit_order_stock, release_order_stock, \
+    STOCK_TRACKED_PRODUCT_TYPES
 from cheatgame.users.models import BaseUser
 
 
-def create_order(*, user: BaseUser, total_price: int) -> Order:
+def create_order(*, user: BaseUser, total_price: Decimal, is_game: bool) -> Order:
     return Order.objects.create(
         user=user,
         total_price=total_price,
-        total_price_discount=total_price
-    )
-
-
-def create_order_item(*, cart_item: CartItem, order: Order) -> OrderItem:
-    return OrderItem.objects.create(
-        product=cart_item.product,
-        price=Decimal("0"),
-        order=order
+        total_price_discount=total_price,
+        is_game=is_game,
     )
 
 
@@ -32,100 +30,94 @@ def remove_user_cart_items(*, user: BaseUser) -> None:
     CartItem.objects.filter(cart__user=user).delete()
 
 
+def is_game_cart_item(*, cart_item: CartItem) -> bool:
+    return cart_item.product.product_type in [ProductType.GAME, ProductType.PACKAGE]
+
+
+def _forced_attachments(*, cart_items: List[CartItem]) -> Dict[int, List[Attachment]]:
+    product_ids = {cart_item.product_id for cart_item in cart_items if not cart_item.attachments}
+    forced = defaultdict(list)
+    if product_ids:
+        for attachment in Attachment.objects.filter(product_id__in=product_ids, is_force_attachment=True):
+            forced[attachment.product_id].append(attachment)
+    return forced
+
+
 @transaction.atomic
-def submit_order(*, user: BaseUser, total_price: int, product: List[CartItem], game: List[CartItem],
-                 cart_items: QuerySet[CartItem]):
-    order_price_product = Decimal("0")
-    order_price_game = Decimal("0")
+def submit_order(*, user: BaseUser, cart_items: List[CartItem]) -> List[Order]:
+    """
+    Turns the cart of `user` into one order for games and packages and one
+    for other products. `cart_items` come from `cart_item_list_priced`, so
+    every price is known up front and each order is written with one INSERT
+    per table, whatever the cart size.
+    """
+    now = timezone.now()
+    forced_attachments = _forced_attachments(cart_items=cart_items)
+    groups = defaultdict(list)
+    for cart_item in cart_items:
+        attachments = cart_item.attachments or forced_attachments[cart_item.product_id]
+        price = line_price(
+            product=cart_item.product,
+            quantity=cart_item.quantity,
+            attachment_price=attachments_price(product=cart_item.product, attachments=attachments),
+            now=now,
+        )
+        groups[is_game_cart_item(cart_item=cart_item)].append((cart_item, attachments, price))
+
     order_list = []
-    if product and game:
-        game_order = create_order(user=user, total_price=total_price)
-        product_order = create_order(user=user, total_price=total_price)
-        for game_cart_item in game:
-            quantity = game_cart_item.quantity
-            order_item = create_order_item(cart_item=game_cart_item, order=game_order)
-            attachements = cart_item_attachment_list(cart_item=game_cart_item)
-            total_attachment_price = calculate_attchment_price_order(
-                product=game_cart_item.product,
-                attachments=attachements,
-                order_item=order_item
-            )
-            final_price = total_attachment_price * quantity
-            order_price_game += final_price
-            order_item.price = final_price
-            order_item.quantity = quantity
-            order_item.save()
-        game_order.total_price = order_price_game
-        game_order.total_price_discount = order_price_game
-        game_order.is_game = True
-        game_order.save()
-        order_list.append(game_order)
-        for product_cart_item in product:
-            quantity = product_cart_item.quantity
-            price = product_cart_item.product.price if not product_cart_item.product.discount_end_time or product_cart_item.product.discount_end_time < timezone.now() else product_cart_item.product.off_price
-            order_item = create_order_item(cart_item=product_cart_item, order=product_order)
-            attachements = cart_item_attachment_list(cart_item=product_cart_item)
-            total_attachment_price = calculate_attchment_price_order(
-                product=product_cart_item.product,
-                attachments=attachements,
-                order_item=order_item
-            )
-            final_price = price * quantity + total_attachment_price
-            order_price_product += final_price
-            order_item.price = final_price
-            order_item.quantity = quantity
-            order_item.save()
-        product_order.total_price = order_price_product
-        product_order.total_price_discount = order_price_product
-        product_order.is_game = False
-        product_order.save()
-        order_list.append(product_order)
-        remove_user_cart_items(user=user)
-        return order_list
-    else:
-        order = create_order(user=user, total_price=total_price)
-        is_game = bool
-        for cart_item in cart_items:
-            quantity = cart_item.quantity
-            order_item = create_order_item(cart_item=cart_item, order=order)
-            attachements = cart_item_attachment_list(cart_item=cart_item)
-            total_attachment_price = calculate_attchment_price_order(
-                product=cart_item.product,
-                attachments=attachements,
-                order_item=order_item
-            )
-            if cart_item.product.product_type in [ProductType.GAME , ProductType.PACKAGE]:
-                is_game = True
-            else:
-                is_game = False
-            if cart_item.product.product_type == ProductType.GAME:
-                final_price = total_attachment_price * quantity
-                order_price_product += final_price
-            else:
-                price = cart_item.product.price if not cart_item.product.discount_end_time or cart_item.product.discount_end_time < timezone.now() else cart_item.product.off_price
-                final_price = price * quantity + total_attachment_price
-                order_price_product += final_price
-            order_item.price = final_price
-            order_item.quantity = quantity
-            order_item.save()
-        order.total_price = order_price_product
-        order.total_price_discount = order_price_product
-        order.is_game = is_game
-        order.save()
-        remove_user_cart_items(user=user)
+    for is_game in (True, False):
+        lines = groups.get(is_game)
+        if not lines:
+            continue
+        order = create_order(user=user, total_price=total_price(line_prices=[price for _, _, price in lines]),
+                             is_game=is_game)
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=cart_item.product_id, quantity=cart_item.quantity, price=price)
+            for cart_item, _, price in lines
+        ])
+        OrderItemAttachment.objects.bulk_create([
+            OrderItemAttachment(order_item=order_item, attachment=attachment)
+            for order_item, (_, attachments, _) in zip(order_items, lines)
+            for attachment in attachments
+        ])
+        quantities = Counter()
+        for cart_item, _, _ in lines:
+            if cart_item.product.product_type in STOCK_TRACKED_PRODUCT_TYPES:
+                quantities[cart_item.product_id] += cart_item.quantity
+        if quantities:
+            reserve_order_stock(order=order, quantities=quantities)
         order_list.append(order)
-        return order_list
+    remove_user_cart_items(user=user)
+    return order_list
 
 
+@transaction.atomic
 def update_order(*, order_id: int, schedule: DeliveryData, discount: Discount = None) -> Order:
     order = Order.objects.get(id=order_id)
     order.schedule = schedule
     if discount is not None:
+        redeem_discount(discount=discount, order=order)
         order.discount = discount
-        if discount.value_type == DiscountValueType.AMOUNT.value:
-            order.total_price_discount = order.total_price - discount.amount
-
-        elif discount.value_type == DiscountValueType.PERCENT.value:
-            order.total_price_discount = order.total_price * (1 - discount.percent)
+        order.total_price_discount = discounted_price(total_price=order.total_price, discount=discount)
     order.save(update_fields=["schedule", "discount", "updated_at", "total_price_discount"])
     return order
+
+
+def update_products_sales_count(*, order_id: int, sign: int) -> None:
+    quantities = OrderItem.objects.filter(order_id=order_id).values("product_id").annotate(
+        total=Sum("quantity")).order_by("product_id")
+    for item in quantities:
+        Product.objects.filter(id=item["product_id"]).update(sales_count=F("sales_count") + sign * item["total"])
+
+
+def apply_order_payment_status_change(*, order_id: int, previous_status: int, payment_status: int) -> None:
+    was_paid = previous_status == OrderStatus.PAID
+    is_paid = payment_status == OrderStatus.PAID
+    if was_paid != is_paid:
+        update_products_sales_count(order_id=order_id, sign=1 if is_paid else -1)
+    if is_paid:
+        commit_order_stock(order_id=order_id)
+        allocate_order_gift_cards(order_id=order_id)
+    elif payment_status in [OrderStatus.FAIDED, OrderStatus.CANCELD]:
+        release_order_stock(order_id=order_id)
+        release_discount_redemption(order_id=order_id)
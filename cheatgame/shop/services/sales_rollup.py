@@ -0,0 +1,125 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from cheatgame.shop.models import DailySalesRollup, Order, OrderItem, OrderStatus, RollupWatermark
+
+SALES_ROLLUP_WATERMARK = "daily_sales_rollup"
+# Orders committed by long transactions can carry an updated_at slightly older
+# than the watermark; re-reading this much overlap catches them, and rebuilding
+# a day is idempotent.
+SALES_ROLLUP_OVERLAP = datetime.timedelta(minutes=5)
+# Bounds the work of one refresh so it stays well inside the task time limit.
+SALES_ROLLUP_BATCH_SIZE = 500
+SALES_ROLLUP_MAX_DAYS = 60
+
+
+def _day_bounds(*, day: datetime.date) -> tuple:
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+@transaction.atomic
+def rebuild_daily_sales_rollup(*, day: datetime.date) -> list[DailySalesRollup]:
+    """
+    Recomputes the rollup rows of `day` from its paid orders. An order is
+    counted once under every product type it contains, with the order totals
+    and the quantity of its items of that type, and once in the total row.
+    """
+    start, end = _day_bounds(day=day)
+    orders = {
+        order["id"]: order
+        for order in Order.objects.filter(payment_status=OrderStatus.PAID, created_at__gte=start, created_at__lt=end)
+        .values("id", "is_game", "total_price", "total_price_discount")
+    }
+    item_counts = defaultdict(int)
+    items = OrderItem.objects.filter(order_id__in=orders).values_list("order_id", "product__product_type", "quantity")
+    for order_id, product_type, quantity in items:
+        item_counts[order_id, product_type] += quantity
+        item_counts[order_id, None] += quantity
+
+    rows = {}
+    for (order_id, product_type), quantity in item_counts.items():
+        order = orders[order_id]
+        key = (product_type, order["is_game"])
+        if key not in rows:
+            rows[key] = DailySalesRollup(date=day, product_type=product_type, is_game=order["is_game"],
+                                         gross=Decimal("0"), revenue=Decimal("0"))
+        row = rows[key]
+        row.order_count += 1
+        row.item_count += quantity
+        row.gross += order["total_price"]
+        row.revenue += order["total_price_discount"]
+
+    DailySalesRollup.objects.filter(date=day).delete()
+    return DailySalesRollup.objects.bulk_create(rows.values())
+
+
+def _order_days(*, orders: QuerySet[Order]) -> list[datetime.date]:
+    return list(orders.annotate(day=TruncDate("created_at")).values_list("day", flat=True).distinct().order_by("day"))
+
+
+def _set_watermark(*, watermark: datetime.datetime) -> None:
+    RollupWatermark.objects.update_or_create(name=SALES_ROLLUP_WATERMARK, defaults={"watermark": watermark})
+
+
+def refresh_daily_sales_rollup(*, batch_size: int = SALES_ROLLUP_BATCH_SIZE,
+                               max_days: int = SALES_ROLLUP_MAX_DAYS) -> int:
+    """
+    Rebuilds the rollup of every day with an order changed since the
+    watermark. Changed orders are taken `batch_size` at a time by `updated_at`
+    and the watermark moves past each batch as soon as its days are rebuilt,
+    so a run cut short keeps its progress; a run stops after about `max_days`
+    days and the next one carries on. Returns the number of days rebuilt.
+    """
+    now = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=SALES_ROLLUP_WATERMARK).values_list(
+        "watermark", flat=True).first()
+    rebuilt = 0
+    while rebuilt < max_days:
+        pending = Order.objects.filter(updated_at__lte=now)
+        if watermark is not None:
+            pending = pending.filter(updated_at__gt=watermark)
+        updated = pending.order_by("updated_at").values_list("updated_at", flat=True)
+        boundary = next(iter(updated[batch_size - 1:batch_size]), None)
+        batch_end = boundary or now
+        changed = Order.objects.filter(updated_at__lte=batch_end)
+        if watermark is not None:
+            changed = changed.filter(updated_at__gt=watermark - SALES_ROLLUP_OVERLAP)
+        for day in _order_days(orders=changed):
+            rebuild_daily_sales_rollup(day=day)
+            rebuilt += 1
+        watermark = batch_end
+        _set_watermark(watermark=watermark)
+        if boundary is None:
+            break
+    return rebuilt
+
+
+def backfill_daily_sales_rollup() -> int:
+    """
+    Rebuilds the rollup of every day with orders or rollup rows, each day in
+    its own transaction, and moves the watermark up to the start of the
+    backfill. Run once from the `backfill_daily_sales_rollup` command before
+    the periodic refresh takes over. Returns the number of days rebuilt.
+    """
+    now = timezone.now()
+    days = set(_order_days(orders=Order.objects.all()))
+    days.update(DailySalesRollup.objects.values_list("date", flat=True).distinct())
+    for day in sorted(days):
+        rebuild_daily_sales_rollup(day=day)
+    if not RollupWatermark.objects.filter(name=SALES_ROLLUP_WATERMARK, watermark__gte=now).exists():
+        _set_watermark(watermark=now)
+    return len(days)
+
+
+def schedule_order_day_rebuild(*, order: Order) -> None:
+    # Deleted orders leave no changed row behind for the refresh to find.
+    if order.payment_status == OrderStatus.PAID:
+        transaction.on_commit(partial(rebuild_daily_sales_rollup, day=timezone.localdate(order.created_at)))
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with `product_id` and `remaining` when a gift card product has
+# `GIFT_CARD_LOW_STOCK_THRESHOLD` or fewer unassigned codes left.
+gift_card_stock_low = Signal()
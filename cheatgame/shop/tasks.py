@@ -0,0 +1,27 @@
+from celery import shared_task
+
+from cheatgame.shop.models import DiscountCampaign, DiscountCampaignStatus
+from cheatgame.shop.services import inventory, sales_rollup, discount
+
+
+@shared_task
+def release_expired_stock_reservations() -> int:
+    return inventory.release_expired_stock_reservations()
+
+
+@shared_task
+def refresh_daily_sales_rollup() -> int:
+    return sales_rollup.refresh_daily_sales_rollup()
+
+
+@shared_task
+def assign_discount_campaign_chunk(campaign_id: int) -> None:
+    # Each chunk is its own task so a large segment never runs into the task
+    # time limit; the next one is queued once this one is stored.
+    try:
+        has_more = discount.assign_discount_campaign_chunk(campaign_id=campaign_id)
+    except Exception:
+        DiscountCampaign.objects.filter(id=campaign_id).update(status=DiscountCampaignStatus.FAILED)
+        raise
+    if has_more:
+        assign_discount_campaign_chunk.delay(campaign_id)
@@ -1,3 +1,434 @@
-from django.test import TestCase
+import datetime
+import threading
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cheatgame.core.exceptions import ApplicationError
+from cheatgame.product.models import Product, ProductType, GiftCartData
+from cheatgame.shop.models import Order, Cart, CartItem, StockReservation, StockReservationStatus, \
+    DeliverySchedule, DeliveryScheduleType, OrderItem, OrderStatus, DailySalesRollup, RollupWatermark, Discount, \
+    DiscountType, DiscountValueType, UserDiscount, DiscountRedemption, DiscountCampaign, DiscountCampaignStatus
+from cheatgame.shop.selectors.cart import cart_item_list_priced
+from cheatgame.shop.selectors.delivery_schedule import get_delivery_calendar, delivery_capacity_key
+from cheatgame.shop.selectors.discount import check_discount_code
+from cheatgame.shop.services.delivery_schedule import book_delivery_schedule
+from cheatgame.shop.services.discount import redeem_discount, release_discount_redemption, \
+    assign_discount_campaign_chunk
+from cheatgame.shop.services.gift_card import allocate_order_gift_cards, check_gift_card_stock
+from cheatgame.shop.services.inventory import reserve_order_stock, release_order_stock, commit_order_stock, \
+    release_expired_stock_reservations
+from cheatgame.shop.services.order import submit_order
+from cheatgame.shop.services.sales_rollup import refresh_daily_sales_rollup, SALES_ROLLUP_WATERMARK
+from cheatgame.users.models import BaseUser
+
+
+class ShopTestMixin:
+    def create_user(self, *, phone_number: str = "09120000000") -> BaseUser:
+        return BaseUser.objects.create_user(phone_number=phone_number, firstname="test", lastname="test")
+
+    def create_product(self, *, title: str, quantity: int = 1,
+                       product_type: ProductType = ProductType.PHYSCIAL) -> Product:
+        return Product.objects.create(
+            title=title,
+            main_image="product/main_images/test.jpg",
+            price=1000,
+            off_price=900,
+            description="product/description.html",
+            quantity=quantity,
+            product_type=product_type,
+        )
+
+    def create_order(self, *, user: BaseUser, is_game: bool = False) -> Order:
+        return Order.objects.create(user=user, total_price=1000, total_price_discount=1000, is_game=is_game)
+
+
+class StockReservationTest(ShopTestMixin, TestCase):
+    def setUp(self):
+        self.user = self.create_user()
+        self.console = self.create_product(title="console", quantity=3)
+        self.controller = self.create_product(title="controller", quantity=1)
+
+    def assertQuantity(self, product: Product, quantity: int):
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, quantity)
+
+    def test_reserving_takes_stock_and_holds_it(self):
+        order = self.create_order(user=self.user)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            reserve_order_stock(order=order, quantities={self.console.id: 2, self.controller.id: 1})
+
+        # One catalog version bump and one product document rebuild.
+        self.assertEqual(len(callbacks), 2)
+        self.assertQuantity(self.console, 1)
+        self.assertQuantity(self.controller, 0)
+        self.assertEqual(
+            set(order.stock_reservations.values_list("status", flat=True)), {StockReservationStatus.HELD})
+
+    def test_reserving_more_than_is_left_takes_nothing(self):
+        order = self.create_order(user=self.user)
+
+        with self.assertRaises(ApplicationError):
+            reserve_order_stock(order=order, quantities={self.console.id: 1, self.controller.id: 2})
+
+        self.assertQuantity(self.console, 3)
+        self.assertQuantity(self.controller, 1)
+        self.assertFalse(order.stock_reservations.exists())
+
+    def test_releasing_gives_stock_back_once(self):
+        order = self.create_order(user=self.user)
+        reserve_order_stock(order=order, quantities={self.console.id: 2})
+
+        self.assertEqual(release_order_stock(order_id=order.id), 1)
+        self.assertEqual(release_order_stock(order_id=order.id), 0)
+
+        self.assertQuantity(self.console, 3)
+
+    def test_expired_reservations_are_released(self):
+        order = self.create_order(user=self.user)
+        reserve_order_stock(order=order, quantities={self.console.id: 2})
+        order.stock_reservations.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        self.assertEqual(release_expired_stock_reservations(), 1)
+
+        self.assertQuantity(self.console, 3)
+        self.assertEqual(order.stock_reservations.get().status, StockReservationStatus.RELEASED)
+
+    def test_paying_after_expiry_takes_the_stock_again(self):
+        order = self.create_order(user=self.user)
+        reserve_order_stock(order=order, quantities={self.console.id: 2})
+        order.stock_reservations.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        release_expired_stock_reservations()
+
+        commit_order_stock(order_id=order.id)
+
+        self.assertQuantity(self.console, 1)
+        self.assertEqual(order.stock_reservations.get().status, StockReservationStatus.COMMITTED)
+
+    def test_submitting_an_order_only_reserves_stock_tracked_products(self):
+        game = self.create_product(title="game", quantity=1, product_type=ProductType.GAME)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.console, quantity=2, price=0)
+        CartItem.objects.create(cart=cart, product=game, quantity=1, price=0)
+
+        submit_order(user=self.user, cart_items=cart_item_list_priced(user=self.user))
+
+        self.assertQuantity(self.console, 1)
+        self.assertQuantity(game, 1)
+        self.assertEqual(list(StockReservation.objects.values_list("product_id", flat=True)), [self.console.id])
+
+
+class DeliveryBookingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.schedule = self.create_schedule(day=self.today, capacity=2)
+
+    def create_schedule(self, *, day: datetime.date, capacity: int) -> DeliverySchedule:
+        start = timezone.make_aware(datetime.datetime.combine(day, datetime.time(10)))
+        return DeliverySchedule.objects.create(type=DeliveryScheduleType.ORDER, start=start,
+                                               end=start + datetime.timedelta(hours=2), capacity=capacity)
+
+    def book(self) -> bool:
+        with self.captureOnCommitCallbacks(execute=True):
+            return book_delivery_schedule(schedule_id=self.schedule.id)
+
+    def calendar_capacity(self) -> int:
+        calendar = get_delivery_calendar(from_date=self.today, to_date=self.today, type=DeliveryScheduleType.ORDER)
+        return calendar[0]["capacity"]
+
+    def test_booking_refuses_a_full_slot(self):
+        self.assertTrue(self.book())
+        self.assertTrue(self.book())
+        self.assertFalse(self.book())
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.capacity, 0)
+
+    def test_booking_decrements_the_cached_counter(self):
+        self.assertEqual(self.calendar_capacity(), 2)
+
+        self.book()
+
+        self.assertEqual(self.calendar_capacity(), 1)
+
+    def test_booking_without_a_cached_counter_is_not_lost_to_a_stale_seed(self):
+        self.book()
+        # A calendar read that loaded the capacity before the booking seeds
+        # the counter after it.
+        cache.add(delivery_capacity_key(schedule_id=self.schedule.id), 2)
+
+        self.assertEqual(self.calendar_capacity(), 1)
+
+    def test_calendar_covers_ranges_longer_than_two_months(self):
+        last = self.create_schedule(day=self.today + datetime.timedelta(days=120), capacity=1)
+
+        response = APIClient().get(reverse("api:delivery-list"), {
+            "from_date": self.today.isoformat(),
+            "to_date": (self.today + datetime.timedelta(days=120)).isoformat(),
+            "type": DeliveryScheduleType.ORDER.value,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([slot["id"] for slot in response.data], [self.schedule.id, last.id])
+
+    def test_admin_changes_clear_the_cached_calendar(self):
+        admin = site._registry[DeliverySchedule]
+        self.assertEqual(self.calendar_capacity(), 2)
+
+        self.schedule.capacity = 5
+        form = admin.get_form(None, self.schedule)(instance=self.schedule)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.save_model(None, self.schedule, form, change=True)
+        self.assertEqual(self.calendar_capacity(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.delete_queryset(None, DeliverySchedule.objects.filter(id=self.schedule.id))
+        calendar = get_delivery_calendar(from_date=self.today, to_date=self.today, type=DeliveryScheduleType.ORDER)
+        self.assertEqual(calendar, [])
+
+
+class SalesRollupTest(ShopTestMixin, TestCase):
+    def setUp(self):
+        self.user = self.create_user()
+        self.product = self.create_product(title="console")
+        self.today = timezone.localdate()
+
+    def create_paid_order(self, *, days_ago: int, total: int = 1000) -> Order:
+        order = Order.objects.create(user=self.user, total_price=total, total_price_discount=total,
+                                     payment_status=OrderStatus.PAID)
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=total)
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - datetime.timedelta(days=days_ago))
+        order.refresh_from_db()
+        return order
+
+    def day_revenue(self, *, days_ago: int):
+        row = DailySalesRollup.objects.filter(
+            date=self.today - datetime.timedelta(days=days_ago), product_type__isnull=True).first()
+        return row.revenue if row else None
+
+    def test_refresh_rolls_up_paid_orders_per_day(self):
+        self.create_paid_order(days_ago=1, total=1000)
+        self.create_paid_order(days_ago=1, total=500)
+        Order.objects.create(user=self.user, total_price=700, total_price_discount=700)
+
+        refresh_daily_sales_rollup()
+
+        self.assertEqual(self.day_revenue(days_ago=1), 1500)
+        self.assertEqual(DailySalesRollup.objects.filter(product_type__isnull=True).count(), 1)
+
+    def test_refresh_moves_the_watermark_per_batch(self):
+        orders = [self.create_paid_order(days_ago=days_ago) for days_ago in (3, 2, 1)]
+
+        self.assertEqual(refresh_daily_sales_rollup(batch_size=1, max_days=1), 1)
+
+        watermark = RollupWatermark.objects.get(name=SALES_ROLLUP_WATERMARK).watermark
+        self.assertEqual(watermark, orders[0].updated_at)
+        self.assertIsNotNone(self.day_revenue(days_ago=3))
+        self.assertIsNone(self.day_revenue(days_ago=1))
+
+        refresh_daily_sales_rollup(batch_size=1)
+
+        self.assertIsNotNone(self.day_revenue(days_ago=1))
+
+    def test_deleting_a_paid_order_rebuilds_its_day(self):
+        order = self.create_paid_order(days_ago=1, total=1000)
+        self.create_paid_order(days_ago=1, total=500)
+        refresh_daily_sales_rollup()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+
+        self.assertEqual(self.day_revenue(days_ago=1), 500)
+
+    def test_backfill_command_rebuilds_history_and_starts_the_watermark(self):
+        self.create_paid_order(days_ago=400)
+
+        call_command("backfill_daily_sales_rollup", stdout=open("/dev/null", "w"))
+
+        self.assertIsNotNone(self.day_revenue(days_ago=400))
+        self.assertTrue(RollupWatermark.objects.filter(name=SALES_ROLLUP_WATERMARK).exists())
+
+    def test_sell_report_accepts_datetimes_and_rejects_bad_dates(self):
+        self.create_paid_order(days_ago=1, total=1000)
+        refresh_daily_sales_rollup()
+        client = APIClient()
+        start = (timezone.now() - datetime.timedelta(days=2)).isoformat()
+
+        response = client.get(reverse("api:sell-order-report"), {"updated_at__range": f"{start},"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["physical_amount"], 1000)
+
+        response = client.get(reverse("api:sell-order-report"), {"updated_at__range": "2024-13-40,"})
+        self.assertEqual(response.status_code, 400)
+
+
+class DiscountRedemptionTest(ShopTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user()
+        self.other_user = self.create_user(phone_number="09120000001")
+
+    def create_discount(self, *, code: str, type: DiscountType, usage_number: int = 1) -> Discount:
+        now = timezone.now()
+        return Discount.objects.create(
+            name=code, code=code, type=type, value_type=DiscountValueType.AMOUNT,
+            valid_from=now - datetime.timedelta(days=1), valid_until=now + datetime.timedelta(days=1),
+            is_active=True, min_purchase_amount=0, amount=100, percent=0, admin_user=self.user,
+            usage_number=usage_number,
+        )
+
+    def test_direct_discount_is_used_once_per_user(self):
+        discount = self.create_discount(code="DIRECT", type=DiscountType.DIRECT)
+        UserDiscount.objects.create(discount=discount, user=self.user)
+
+        redeem_discount(discount=discount, order=self.create_order(user=self.user))
+
+        self.assertTrue(UserDiscount.objects.get(discount=discount, user=self.user).is_used)
+        with self.assertRaises(ApplicationError):
+            redeem_discount(discount=discount, order=self.create_order(user=self.user))
+        with self.assertRaises(ApplicationError):
+            redeem_discount(discount=discount, order=self.create_order(user=self.other_user))
+
+    def test_redeeming_again_for_the_same_order_is_idempotent(self):
+        discount = self.create_discount(code="COUPON", type=DiscountType.COUPON, usage_number=5)
+        order = self.create_order(user=self.user)
+
+        first = redeem_discount(discount=discount, order=order)
+        second = redeem_discount(discount=discount, order=order)
+
+        self.assertEqual(first.id, second.id)
+        discount.refresh_from_db()
+        self.assertEqual(discount.usage_number, 4)
+        with self.assertRaises(ApplicationError):
+            redeem_discount(discount=self.create_discount(code="OTHER", type=DiscountType.COUPON), order=order)
+
+    def test_coupon_is_limited_by_its_uses_not_per_user(self):
+        discount = self.create_discount(code="COUPON", type=DiscountType.COUPON, usage_number=2)
+
+        redeem_discount(discount=discount, order=self.create_order(user=self.user))
+        redeem_discount(discount=discount, order=self.create_order(user=self.user))
+
+        self.assertFalse(UserDiscount.objects.filter(discount=discount).exists())
+        with self.assertRaises(ApplicationError):
+            redeem_discount(discount=discount, order=self.create_order(user=self.other_user))
+
+    def test_releasing_gives_the_use_back_once(self):
+        coupon = self.create_discount(code="COUPON", type=DiscountType.COUPON, usage_number=1)
+        direct = self.create_discount(code="DIRECT", type=DiscountType.DIRECT)
+        UserDiscount.objects.create(discount=direct, user=self.user)
+        coupon_order = self.create_order(user=self.user)
+        direct_order = self.create_order(user=self.user)
+        redeem_discount(discount=coupon, order=coupon_order)
+        redeem_discount(discount=direct, order=direct_order)
+
+        self.assertTrue(release_discount_redemption(order_id=coupon_order.id))
+        self.assertFalse(release_discount_redemption(order_id=coupon_order.id))
+        self.assertTrue(release_discount_redemption(order_id=direct_order.id))
+
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_number, 1)
+        self.assertFalse(UserDiscount.objects.get(discount=direct, user=self.user).is_used)
+        self.assertFalse(DiscountRedemption.objects.exists())
+
+    def test_direct_code_checks_are_cached_until_the_code_is_redeemed(self):
+        discount = self.create_discount(code="DIRECT", type=DiscountType.DIRECT)
+        UserDiscount.objects.create(discount=discount, user=self.user)
+        self.assertTrue(check_discount_code(code="DIRECT", total_price=1000, user=self.user))
+        self.assertFalse(check_discount_code(code="DIRECT", total_price=1000, user=self.other_user))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(check_discount_code(code="DIRECT", total_price=1000, user=self.user))
+            self.assertFalse(check_discount_code(code="DIRECT", total_price=1000, user=self.other_user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            redeem_discount(discount=discount, order=self.create_order(user=self.user))
+
+        self.assertFalse(check_discount_code(code="DIRECT", total_price=1000, user=self.user))
+
+    def test_campaign_counts_only_newly_assigned_users(self):
+        discount = self.create_discount(code="DIRECT", type=DiscountType.DIRECT)
+        UserDiscount.objects.create(discount=discount, user=self.user)
+        campaign = DiscountCampaign.objects.create(discount=discount, admin_user=self.user, total_users=2)
+
+        self.assertFalse(assign_discount_campaign_chunk(campaign_id=campaign.id))
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, DiscountCampaignStatus.DONE)
+        self.assertEqual(campaign.assigned_users, 1)
+        self.assertEqual(UserDiscount.objects.filter(discount=discount).count(), 2)
+
+
+class GiftCardAllocationTest(ShopTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.user = self.create_user()
+        self.gift_card = self.create_product(title="gift card", product_type=ProductType.GIFTCART)
+
+    def create_codes(self, *, count: int) -> list[GiftCartData]:
+        return [GiftCartData.objects.create(product=self.gift_card, code=f"CODE{index}") for index in range(count)]
+
+    def create_gift_card_order(self, *, quantity: int) -> Order:
+        order = self.create_order(user=self.user)
+        OrderItem.objects.create(order=order, product=self.gift_card, quantity=quantity, price=1000)
+        return order
+
+    def test_allocation_assigns_free_codes_once(self):
+        legacy, *free = self.create_codes(count=4)
+        legacy_order = self.create_gift_card_order(quantity=1)
+        GiftCartData.objects.filter(id=legacy.id).update(order=legacy_order)
+        order = self.create_gift_card_order(quantity=2)
+
+        self.assertEqual(allocate_order_gift_cards(order_id=order.id), 2)
+        self.assertEqual(allocate_order_gift_cards(order_id=order.id), 0)
+
+        self.assertEqual(set(order.gift_cart_codes.values_list("id", flat=True)), {free[0].id, free[1].id})
+        self.assertEqual(check_gift_card_stock(product_ids=[self.gift_card.id]), {self.gift_card.id: 1})
+
+    def test_allocation_skips_codes_locked_by_another_order(self):
+        first, second = self.create_codes(count=2)
+        order = self.create_gift_card_order(quantity=1)
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_first_code():
+            try:
+                with transaction.atomic():
+                    GiftCartData.objects.select_for_update().get(id=first.id)
+                    locked.set()
+                    release.wait(timeout=10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_first_code)
+        holder.start()
+        try:
+            self.assertTrue(locked.wait(timeout=10))
+            with connection.cursor() as cursor:
+                # Fail instead of hanging if the allocation waits for the lock.
+                cursor.execute("SET lock_timeout = '2s'")
+            self.assertEqual(allocate_order_gift_cards(order_id=order.id), 1)
+        finally:
+            release.set()
+            holder.join()
+            with connection.cursor() as cursor:
+                cursor.execute("RESET lock_timeout")
+
+        self.assertEqual(list(order.gift_cart_codes.values_list("id", flat=True)), [second.id])
+
+    def test_import_rejects_malformed_csv(self):
+        manager = BaseUser.objects.create_superuser(phone_number="09120000009")
+        client = APIClient()
+        client.force_authenticate(user=manager)
+        file = SimpleUploadedFile("codes.csv", b'"' + b"A" * 200000 + b'"\n', content_type="text/csv")
+
+        response = client.post(reverse("api:gift-card-codes-import"), {"product": self.gift_card.id, "file": file})
+
+        self.assertEqual(response.status_code, 400)
@@ -1,15 +1,21 @@
 from django.urls import path
 
 from cheatgame.shop.apis.cart import AddToCart, CartItemDetail, CartItemListApi, SubmitOrderApi, \
-    OrderListCustomerAPIView, GameListCustomerAPIView, OrderDetailUserApi, OrderDetailCustomerAPIView, SellReport
+    OrderListCustomerAPIView, GameListCustomerAPIView, OrderDetailUserApi, OrderDetailCustomerAPIView, SellReport, \
+    SalesSeriesApi
 from cheatgame.shop.apis.delivery_schedule import DeliveryScheduleAdminApi, DeliveryScheduleDetailAdminApi, \
     DeliveryScheduleList, DeliveryDataApi
 from cheatgame.shop.apis.delivery_type import DeliveryTypeAdminApi, DeliveryTypeDetailApi, DeliveryTypeListApi
-from cheatgame.shop.apis.discount import DiscountAdminApi, DiscountDetailSerializer, DiscountListAdmin, \
+from cheatgame.shop.apis.discount import DiscountAdminApi, DiscountBatchAdminApi, DiscountCampaignAdminApi, \
+    DiscountCampaignDetailAdminApi, DiscountDetailSerializer, DiscountListAdmin, \
     CheckUserDiscountApi, CheckCouponApi, DiscountListUser
+from cheatgame.shop.apis.gift_card import GiftCardCodeImportApi
 
 urlpatterns = [
     path("create-discount-code/", DiscountAdminApi.as_view(), name="create-discount"),
+    path("create-discount-codes/", DiscountBatchAdminApi.as_view(), name="create-discounts"),
+    path("discount-campaign/", DiscountCampaignAdminApi.as_view(), name="discount-campaign"),
+    path("discount-campaign/<int:id>/", DiscountCampaignDetailAdminApi.as_view(), name="discount-campaign-detail"),
     path("discount-detail/<int:id>/", DiscountDetailSerializer.as_view(), name="discount-detail-manager"),
     path("discount-list-manager/", DiscountListAdmin.as_view(), name="discount-list-manager"),
     path("check-user-discount-code/", CheckUserDiscountApi.as_view(), name="check-discount-admin"),
@@ -30,7 +36,9 @@ urlpatterns = [
     path("order-list-user/" , OrderListCustomerAPIView.as_view(), name="order-list-user"),
     path("game-list-user/"  , GameListCustomerAPIView.as_view() ,name="game-list-user"),
     path("get-order-detail/<int:id>/" , OrderDetailCustomerAPIView.as_view() , name="get-order-detail"),
-    path("sell-order-report/" ,SellReport.as_view() , name="sell-order-report")
+    path("sell-order-report/" ,SellReport.as_view() , name="sell-order-report"),
+    path("sell-order-report/series/", SalesSeriesApi.as_view(), name="sell-order-report-series"),
+    path("gift-card-codes/import/", GiftCardCodeImportApi.as_view(), name="gift-card-codes-import")
 
 
 
@@ -21,8 +21,8 @@ from drf_spectacular.utils import extend_schema
 from cheatgame.utils.notification.sms import send_sms
 from config.django.base import IS_SEND_SMS, VERIFY_PATTERN, FORGET_PASSWORD_PATTERN
 from ..api.mixins import ApiAuthMixin
-from ..api.pagination import PaginatedSerializer, get_paginated_response, LimitOffsetPagination
-from ..common.utils import reformat_url
+from ..api.pagination import PaginatedSerializer, get_paginated_response, LimitOffsetPagination, KeysetPagination
+from ..common.utils import media_url
 from ..general.models import ContactForm
 from ..product.models import Product
 from ..product.permissions import CustomerPermission, AddressIsOwnerCustomer, FavoriteProductIsOwnerCustomer, \
@@ -438,7 +438,7 @@ class favoriteProductDetailSerializer(serializers.ModelSerializer):
     main_image = serializers.SerializerMethodField()
 
     def get_main_image(self , obj):
-        return reformat_url(url = obj.main_image.url)
+        return media_url(file=obj.main_image)
     class Meta:
         model = Product
         fields = ("id", "product_type", "title", "slug", "main_image", "price", "off_price", "quantity", "device_model")
@@ -535,6 +535,9 @@ class UserListApi(ApiAuthMixin, APIView):
     class Pagination(LimitOffsetPagination):
         default_limit = 10
 
+    class CursorPagination(KeysetPagination):
+        default_limit = 10
+
 
     class UserListFilterSerializer(serializers.Serializer):
         search = serializers.CharField(required=False , max_length=100)
@@ -555,8 +558,10 @@ class UserListApi(ApiAuthMixin, APIView):
             users = user_list(filters = filter_serializer.validated_data)
         except Exception as e:
             return Response({"error": "مشکلی رخ داده است."}, status=status.HTTP_400_BAD_REQUEST)
+        pagination_class = self.CursorPagination if KeysetPagination.cursor_query_param in request.query_params \
+            else self.Pagination
         return get_paginated_response(
-            pagination_class=self.Pagination,
+            pagination_class=pagination_class,
             serializer_class=UserListOutPutSerializer,
             queryset=users,
             view = self,
@@ -1,3 +1,6 @@
+from django.db import transaction
+from django.db.models import F
+
 from .models import BaseUser, Address, FavoriteProduct
 import pyotp
 
@@ -66,12 +69,19 @@ def create_address(*, province: str, city: str, postal_code: str, address_detail
     )
 
 
+@transaction.atomic
 def create_favorite_product(*, user: BaseUser, product: Product) -> FavoriteProduct:
-    return FavoriteProduct.objects.create(user=user, product=product)
+    favorite_product = FavoriteProduct.objects.create(user=user, product=product)
+    Product.objects.filter(id=product.id).update(favorite_count=F("favorite_count") + 1)
+    return favorite_product
 
 
+@transaction.atomic
 def delete_favorite_product(*, user: BaseUser, id: int) -> None:
-    FavoriteProduct.objects.get(user=user, id=id).delete()
+    favorite_product = FavoriteProduct.objects.get(user=user, id=id)
+    favorite_product.delete()
+    Product.objects.filter(id=favorite_product.product_id, favorite_count__gt=0).update(
+        favorite_count=F("favorite_count") - 1)
 
 
 def update_address(*, address_id: int, province: str, city: str, postal_code: str, address_detail: str) -> Address:
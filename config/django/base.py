@@ -36,6 +36,8 @@ THIRD_PARTY_APPS = [
     'django_extensions',
     'storages',
     'mptt',
+    'django_celery_results',
+    'django_celery_beat',
 ]
 
 INSTALLED_APPS = [
@@ -47,6 +49,7 @@ INSTALLED_APPS = [
     # http://whitenoise.evans.io/en/stable/django.html#using-whitenoise-in-development
     'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     *THIRD_PARTY_APPS,
     *LOCAL_APPS,
 ]
@@ -163,6 +166,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 # DEFAULT_FILE_STORAGE = 'storages.backends.3sbot3.3SBoto3Storage'
 # from config.settings.cors import *  # noqa
+from config.settings.cache import *  # noqa
+from config.settings.celery import *  # noqa
 from config.settings.jwt import *  # noqa
 # from config.settings.sessions import *  # noqa
 from config.settings.swagger import *  # noqa
@@ -15,9 +15,5 @@ CACHES = {
     }
 }
 
-DATABASES = {
-        "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": "db.sqlite3",
-        }
-    }
+# The catalog relies on PostgreSQL (search vectors, trigram indexes), so the
+# tests run against the database configured in base.
@@ -12,9 +12,12 @@ CELERT_TASK_TIME_LIMIT = 30  # seconds
 CELERY_TASK_MAX_RETRIES = 3
 
 CELERY_BEAT_SCHEDULE = {
-    'notify_customers': {
-        'task': 'config.tasks.notify_customers',
-        'schedule': 500,
-        'args': ['Hello World'],
-    }
+    'release_expired_stock_reservations': {
+        'task': 'cheatgame.shop.tasks.release_expired_stock_reservations',
+        'schedule': 60,
+    },
+    'refresh_daily_sales_rollup': {
+        'task': 'cheatgame.shop.tasks.refresh_daily_sales_rollup',
+        'schedule': 300,
+    },
 }
\ No newline at end of file
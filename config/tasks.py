@@ -1,8 +0,0 @@
-from time import sleep
-from celery import shared_task
-
-
-@shared_task
-def notify_customers(message):
-    print(message)
-    sleep(10)
\ No newline at end of file